@@ -3,6 +3,8 @@
 from __future__ import annotations
 import sys
 import os
+import io
+import time
 import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
@@ -17,14 +19,18 @@ from sqlalchemy import delete
 from sqlalchemy import MetaData
 from alpha_vantage.timeseries import TimeSeries
 from collections import defaultdict
-from datetime import date
+import datetime as dt
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from DBintegration.models import BetaCalculation  # → ORM model that maps to beta_calculation
 from sqlalchemy.dialects.postgresql import insert
 from itertools import islice 
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from sqlalchemy import text
+from sqlalchemy import select
 from contextlib import contextmanager
-from typing import List, Dict, Iterable
+from typing import List, Dict, Iterable, Iterator, Optional
 
 API_KEY = os.getenv("ALPHAVANTAGE_API_KEY")
 if not API_KEY:
@@ -70,6 +76,8 @@ def update_data(model, df):
     - Existing rows are updated if any field has changed.
     - New rows are inserted.
     - Rows not in df but present in DB are left untouched.
+
+    Issues one query per row; prefer :func:`update_data_bulk` for large frames.
     """
     session = SessionLocal()
     Base.metadata.create_all(bind=engine)  # Ensure tables are created
@@ -132,6 +140,93 @@ def update_data(model, df):
     finally:
         session.close()
 #########################################################################################################
+def update_data_bulk(model, df: pd.DataFrame) -> Dict[str, int]:
+    """
+    Set-based replacement for :func:`update_data`.
+
+    The DataFrame is COPY-ed into a temporary staging table and diffed against
+    the target inside one transaction:
+    - Existing rows are updated only if a column IS DISTINCT FROM the new value.
+    - Missing keys are inserted.
+    - Rows not in df but present in DB are left untouched.
+
+    Works for any model whose primary key is the composite (symbol, date),
+    e.g. DailyStockData and BetaCalculation.
+
+    Returns
+    -------
+    dict
+        ``{"updated": n, "inserted": n, "unchanged": n}``
+    """
+    keys = [c.name for c in model.__table__.primary_key.columns]
+    if sorted(keys) != ["date", "symbol"]:
+        raise ValueError(f"{model.__name__} must have a (symbol, date) primary key, got {keys}")
+
+    df = df.copy()
+
+    # Detect date column
+    date_column = next((col for col in df.columns if col.lower() in ['date', 'datetime']), None)
+    if date_column is None:
+        raise ValueError("No date column found in DataFrame.")
+    df = df.rename(columns={date_column: "date"})
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+
+    counts = {"updated": 0, "inserted": 0, "unchanged": 0}
+    if df.empty:
+        print("❌ DataFrame is empty.")
+        return counts
+
+    table = model.__tablename__
+    staging = f"{table}_staging"
+    columns = [col.name for col in model.__table__.columns if col.name in df.columns]
+    value_cols = [c for c in columns if c not in keys]
+
+    # Last occurrence wins, like repeated setattr in update_data
+    df = df.drop_duplicates(subset=keys, keep="last")
+    for col in model.__table__.columns:
+        if col.name in value_cols and col.type.python_type is int:
+            df[col.name] = pd.to_numeric(df[col.name], errors="coerce").round().astype("Int64")
+
+    Base.metadata.create_all(bind=engine)  # Ensure tables are created
+    join_sql = " AND ".join(f"t.{k} = s.{k}" for k in keys)
+
+    raw_conn = engine.raw_connection()
+    try:
+        cur = raw_conn.cursor()
+        _create_staging_table(cur, table, staging)
+        _copy_to_staging(cur, df, staging, columns)
+
+        if value_cols:
+            cur.execute(f"""
+                UPDATE {table} AS t
+                   SET {', '.join(f'{c} = s.{c}' for c in value_cols)}
+                  FROM {staging} AS s
+                 WHERE {join_sql}
+                   AND ({' OR '.join(f't.{c} IS DISTINCT FROM s.{c}' for c in value_cols)})
+            """)
+            counts["updated"] = cur.rowcount
+
+        cur.execute(f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            SELECT {', '.join(f's.{c}' for c in columns)}
+              FROM {staging} AS s
+             WHERE NOT EXISTS (SELECT 1 FROM {table} AS t WHERE {join_sql})
+        """)
+        counts["inserted"] = cur.rowcount
+
+        raw_conn.commit()
+    except Exception as e:
+        raw_conn.rollback()
+        print(f"❌ Bulk update of {table} failed: {e}")
+        raise
+    finally:
+        raw_conn.close()
+
+    counts["unchanged"] = len(df) - counts["updated"] - counts["inserted"]
+    print(f"✅ Update complete. {counts['updated']} updated, "
+          f"{counts['inserted']} inserted, {counts['unchanged']} unchanged.")
+    return counts
+#########################################################################################################
 def model_to_dataframe(model_class): ###input: model, output: 
     """
     Given a SQLAlchemy model class, return a Pandas DataFrame of all its rows.
@@ -156,6 +251,113 @@ def model_to_dataframe(model_class): ###input: model, output:
     finally:
         session.close()
 ##########################################################################################################
+def _arrow_schema(columns, compact: bool = False):
+    """Map SQLAlchemy columns to a fixed pyarrow schema (so chunks always concat)."""
+    import pyarrow as pa
+
+    fields = []
+    for col in columns:
+        py_type = col.type.python_type
+        if py_type is float:
+            typ = pa.float32() if compact else pa.float64()
+        elif py_type is int:
+            typ = pa.int64()
+        elif py_type is bool:
+            typ = pa.bool_()
+        elif py_type is dt.date:
+            typ = pa.date32()
+        elif compact:
+            typ = pa.dictionary(pa.int32(), pa.string())
+        else:
+            typ = pa.string()
+        fields.append(pa.field(col.name, typ))
+    return pa.schema(fields)
+
+
+def iter_model_chunks(
+    model_class,
+    columns: Optional[List[str]] = None,
+    start=None,
+    end=None,
+    symbols: Optional[Iterable[str]] = None,
+    chunk_size: int = 100_000,
+    as_arrow: bool = False,
+    compact: bool = False,
+) -> Iterator:
+    """
+    Stream a table through a server-side cursor, one chunk at a time.
+
+    Only the requested columns are selected and no ORM objects are built, so
+    memory stays bounded by *chunk_size* rows.
+
+    Args:
+        model_class: SQLAlchemy model class (e.g., DailyStockData, SP500Index).
+        columns:     Column names to select (default: all columns).
+        start, end:  Inclusive date bounds on the ``date`` column.
+        symbols:     Restrict to these symbols (requires a ``symbol`` column).
+        chunk_size:  Rows fetched per round-trip (``yield_per``).
+        as_arrow:    Yield ``pyarrow.Table`` chunks instead of DataFrames.
+        compact:     float32 numbers and dictionary-encoded strings.
+
+    Yields:
+        pd.DataFrame | pyarrow.Table: One chunk of rows.
+    """
+    import pyarrow as pa
+
+    table = model_class.__table__
+    cols = [table.c[c] for c in columns] if columns else list(table.c)
+    schema = _arrow_schema(cols, compact)
+
+    stmt = select(*cols)
+    if start is not None:
+        stmt = stmt.where(table.c.date >= start)
+    if end is not None:
+        stmt = stmt.where(table.c.date <= end)
+    if symbols is not None:
+        if "symbol" not in table.c:
+            raise ValueError(f"{table.name} has no 'symbol' column to filter on")
+        stmt = stmt.where(table.c.symbol.in_(list(symbols)))
+
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=chunk_size).execute(stmt)
+        for rows in result.partitions():
+            arrays = [pa.array(values, type=field.type)
+                      for values, field in zip(zip(*rows), schema)]
+            chunk = pa.Table.from_arrays(arrays, schema=schema)
+            yield chunk if as_arrow else chunk.to_pandas(date_as_object=not compact)
+
+
+def model_to_dataframe_streamed(
+    model_class,
+    columns: Optional[List[str]] = None,
+    start=None,
+    end=None,
+    symbols: Optional[Iterable[str]] = None,
+    chunk_size: int = 100_000,
+    compact: bool = False,
+) -> pd.DataFrame:
+    """
+    Memory-lean drop-in for :func:`model_to_dataframe`.
+
+    Chunks from :func:`iter_model_chunks` are kept as Arrow tables and
+    converted to pandas once, releasing Arrow buffers as each column is
+    converted, so peak memory stays close to the size of the final frame.
+
+    Returns:
+        pd.DataFrame: DataFrame with the selected rows/columns.
+    """
+    import pyarrow as pa
+
+    chunks = list(iter_model_chunks(model_class, columns, start, end, symbols,
+                                    chunk_size, as_arrow=True, compact=compact))
+    if not chunks:
+        return pd.DataFrame()  # empty table
+
+    merged = pa.concat_tables(chunks)
+    del chunks
+    return merged.to_pandas(date_as_object=not compact,
+                            split_blocks=True, self_destruct=True)
+##########################################################################################################
 def delete_all_rows(model: DeclarativeMeta):
     """
     Deletes all rows from the table associated with the given SQLAlchemy model class.
@@ -428,30 +630,102 @@ def update_score_from_csv(csv_path: str):
         if session:
             session.close()
 
+def _create_staging_table(cur, target: str, staging: str) -> None:
+    """
+    Create (once per connection) a temporary table shaped like *target*.
+
+    The table lives until the connection closes and is emptied on every
+    commit, so it can be reused chunk after chunk.
+    """
+    cur.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+        f"(LIKE {target} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+
+
+def _copy_to_staging(cur, df: pd.DataFrame, staging: str, columns: List[str]) -> None:
+    """
+    Stream *df[columns]* into *staging* with ``COPY … FROM STDIN`` (CSV).
+
+    NaN / None values are written as empty fields and arrive as SQL NULL.
+    """
+    buf = io.StringIO()
+    df[columns].to_csv(buf, index=False, header=False, na_rep="")
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY {staging} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+        buf,
+    )
+
+
+def _merge_staging(cur, target: str, staging: str,
+                   columns: List[str], keys: List[str]) -> int:
+    """
+    Upsert every staged row into *target* with one set-based statement.
+
+    Returns
+    -------
+    int
+        Number of rows inserted or updated.
+    """
+    col_sql = ", ".join(columns)
+    set_sql = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c not in keys)
+    cur.execute(f"""
+        INSERT INTO {target} ({col_sql})
+        SELECT {col_sql} FROM {staging}
+        ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {set_sql}
+    """)
+    return cur.rowcount
+
+
 def bulk_load_stocks_optimized(
     csv_path: str,
     chunk_size: int  = 50_000,  
     batch_size: int  = 5_000,   
+    method: str      = "insert",
 ):
     """
     Efficiently loads a large CSV file containing stock data into the database
     in safe, deduplicated chunks, supporting re-runnable operation.
+
+    Parameters
+    ----------
+    method : {"insert", "copy"}
+        * ``"insert"`` – multi-row ``INSERT … ON CONFLICT`` in *batch_size* batches.
+        * ``"copy"``   – stream each chunk into a temp staging table with
+          ``COPY FROM STDIN`` and merge it with a single set-based upsert.
     """
+    if method not in ("insert", "copy"):
+        raise ValueError("method must be either 'insert' or 'copy'.")
+
     csv_path = Path(csv_path).expanduser().resolve()
     if not csv_path.exists():
         print(f"❌ CSV not found: {csv_path}")
         return
 
-    print(f"⚡ Loading {csv_path} in chunks of {chunk_size:,} rows…")
+    print(f"⚡ Loading {csv_path} in chunks of {chunk_size:,} rows ({method})…")
 
     required_cols = {
         "date", "Ticker", "Open", "High", "Low",
         "Close", "Volume", "Return", "SP_return"
     }
 
+    used_fields = [
+        "symbol", "date", "open", "high", "low", "close",
+        "volume", "return_daily", "sp_return"
+    ]
+    table = DailyStockData.__tablename__
+    staging = f"{table}_staging"
+
     total_rows = inserted_rows = 0
     chunk_no = 0
 
+    # COPY needs the DBAPI connection; one connection keeps the temp table alive
+    raw_conn = cur = None
+    if method == "copy":
+        raw_conn = engine.raw_connection()
+        cur = raw_conn.cursor()
+
     # Helper to split list into fixed-size batches
     def grouper(seq, n):
         it = iter(seq)
@@ -461,88 +735,107 @@ def bulk_load_stocks_optimized(
                 break
             yield batch
 
-    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
-        chunk_no += 1
-        total_rows += len(chunk)
-        print(f"📦  Chunk {chunk_no}: {len(chunk):,} rows")
-
-        # Skip chunks missing required columns
-        if missing := (required_cols - set(chunk.columns)):
-            print(f"⚠️  Chunk {chunk_no} skipped – missing columns: {missing}")
-            continue
-
-        # Rename CSV columns to match DB model field names
-        chunk = chunk.rename(columns={
-            "Ticker":     "symbol",
-            "Return":     "return_daily",
-            "SP_return":  "sp_return",
-            "Open":       "open",
-            "High":       "high",
-            "Low":        "low",
-            "Close":      "close",
-            "Volume":     "volume",
-            "date":       "date",
-        })
-        chunk.columns = [c.lower() for c in chunk.columns]
-
-        # Clean rows missing key fields
-        chunk = chunk.dropna(subset=["symbol", "date"])
-        chunk["date"] = pd.to_datetime(
-            chunk["date"], format="%d%b%Y", errors="coerce"
-        ).dt.date
-        chunk = chunk.dropna(subset=["date"])
-
-        # Convert numeric columns, coerce bad values to NaN
-        numeric_cols = [
-            "open", "high", "low", "close",
-            "volume", "return_daily", "sp_return"
-        ]
-        chunk[numeric_cols] = chunk[numeric_cols].apply(
-            pd.to_numeric, errors="coerce"
-        )
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            chunk_no += 1
+            total_rows += len(chunk)
+            print(f"📦  Chunk {chunk_no}: {len(chunk):,} rows")
+
+            # Skip chunks missing required columns
+            if missing := (required_cols - set(chunk.columns)):
+                print(f"⚠️  Chunk {chunk_no} skipped – missing columns: {missing}")
+                continue
 
-        # Drop duplicates within each chunk to prevent redundant upserts
-        before = len(chunk)
-        chunk = (
-            chunk.sort_values("date")
-                  .drop_duplicates(
-                     subset=["symbol", "date"],
-                     keep="last"
-                  )
-        )
-        duplicates_dropped = before - len(chunk)
-        if duplicates_dropped:
-            print(f"   ↪️  {duplicates_dropped:,} intra-chunk duplicates removed")
-
-        # Convert DataFrame to list of dicts for DB insertion
-        used_fields = [
-            "symbol", "date", "open", "high", "low", "close",
-            "volume", "return_daily", "sp_return"
-        ]
-        records = chunk[used_fields].to_dict(orient="records")
-        if not records:
-            continue
+            # Rename CSV columns to match DB model field names
+            chunk = chunk.rename(columns={
+                "Ticker":     "symbol",
+                "Return":     "return_daily",
+                "SP_return":  "sp_return",
+                "Open":       "open",
+                "High":       "high",
+                "Low":        "low",
+                "Close":      "close",
+                "Volume":     "volume",
+                "date":       "date",
+            })
+            chunk.columns = [c.lower() for c in chunk.columns]
+
+            # Clean rows missing key fields
+            chunk = chunk.dropna(subset=["symbol", "date"])
+            chunk["date"] = pd.to_datetime(
+                chunk["date"], format="%d%b%Y", errors="coerce"
+            ).dt.date
+            chunk = chunk.dropna(subset=["date"])
+
+            # Convert numeric columns, coerce bad values to NaN
+            numeric_cols = [
+                "open", "high", "low", "close",
+                "volume", "return_daily", "sp_return"
+            ]
+            chunk[numeric_cols] = chunk[numeric_cols].apply(
+                pd.to_numeric, errors="coerce"
+            )
+
+            # Drop duplicates within each chunk to prevent redundant upserts
+            before = len(chunk)
+            chunk = (
+                chunk.sort_values("date")
+                      .drop_duplicates(
+                         subset=["symbol", "date"],
+                         keep="last"
+                      )
+            )
+            duplicates_dropped = before - len(chunk)
+            if duplicates_dropped:
+                print(f"   ↪️  {duplicates_dropped:,} intra-chunk duplicates removed")
+
+            if chunk.empty:
+                continue
 
-        # Insert data in safe batches with upsert logic
-        session = SessionLocal()
-        try:
-            for batch in grouper(records, batch_size):
-                stmt = insert(DailyStockData).values(batch)
-                stmt = stmt.on_conflict_do_update(
-                    index_elements=["symbol", "date"],
-                    set_={k: stmt.excluded[k]
-                          for k in batch[0] if k not in ("symbol", "date")}
-                )
-                session.execute(stmt)
-            session.commit()
-            inserted_rows += len(records)
-            print(f"✅  Chunk {chunk_no} committed ({len(records):,} rows) "
+            t0 = time.perf_counter()
+            if method == "copy":
+                # COPY the cleaned chunk into staging, then merge set-based
+                chunk["volume"] = chunk["volume"].round().astype("Int64")
+                try:
+                    _create_staging_table(cur, table, staging)
+                    _copy_to_staging(cur, chunk, staging, used_fields)
+                    _merge_staging(cur, table, staging, used_fields, ["symbol", "date"])
+                    raw_conn.commit()
+                except Exception as e:
+                    raw_conn.rollback()
+                    print(f"❌  Chunk {chunk_no} failed: {e}")
+                    continue
+            else:
+                # Convert DataFrame to list of dicts for DB insertion
+                records = chunk[used_fields].to_dict(orient="records")
+
+                # Insert data in safe batches with upsert logic
+                session = SessionLocal()
+                try:
+                    for batch in grouper(records, batch_size):
+                        stmt = insert(DailyStockData).values(batch)
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=["symbol", "date"],
+                            set_={k: stmt.excluded[k]
+                                  for k in batch[0] if k not in ("symbol", "date")}
+                        )
+                        session.execute(stmt)
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    print(f"❌  Chunk {chunk_no} failed: {e}")
+                    continue
+                finally:
+                    session.close()
+
+            elapsed = time.perf_counter() - t0
+            inserted_rows += len(chunk)
+            print(f"✅  Chunk {chunk_no} committed ({len(chunk):,} rows, "
+                  f"{len(chunk) / max(elapsed, 1e-9):,.0f} rows/s) "
                   f"— total inserted {inserted_rows:,}/{total_rows:,}")
-        except Exception as e:
-            session.rollback()
-            print(f"❌  Chunk {chunk_no} failed: {e}")
-        finally:
-            session.close()
+    finally:
+        if raw_conn is not None:
+            raw_conn.close()
 
     print("\n🚀 Finished. "
           f"inserted/updated {inserted_rows:,}/{total_rows:,} rows.")
@@ -557,6 +850,9 @@ MIN_POINTS_WIN  = 20
 VAR_EPS         = 1e-6        
 SYMBOL_BATCH    = 250       
 BETA_TABLE      = "beta_calculation"  
+BETA_WORKERS    = max(1, (os.cpu_count() or 2) - 2)   # pipelined mode: compute processes
+BETA_PREFETCH   = 2                                   # pipelined mode: batches read ahead
+BETA_POLL_S     = 0.05                                # pipelined mode: read-queue poll while computing
 
 
 @contextmanager
@@ -712,6 +1008,154 @@ def _rolling_betas(df: pd.DataFrame, windows: Iterable[int]) -> Dict[int, pd.Dat
     """
     return {w: _fast_betas(df, w) for w in windows}
 
+def _window_sums(csum: np.ndarray, win: int) -> np.ndarray:
+    """
+    Trailing *win*-row sums from a prefix-sum array.
+
+    Parameters:
+        csum (np.ndarray): (T+1, N) cumulative sums with a leading zero row.
+        win (int): Window length in rows.
+
+    Returns:
+        np.ndarray: (T, N) sums of rows max(0, t-win+1) … t.
+    """
+    out = csum[1:].copy()
+    if win < len(csum):
+        out[win:] -= csum[1:len(csum) - win]
+    return out
+
+
+def _beta_kernel(mkt: np.ndarray, stk: np.ndarray, windows: Iterable[int]) -> Dict[str, np.ndarray]:
+    """
+    Rolling up/down betas of every window from one set of prefix sums.
+
+    Same results as ``_fast_betas`` per column (up to float rounding): for up
+    (down) days – market return > 0 (< 0) – the masked x = market, y = stock
+    returns are accumulated once as Σn, Σx, Σy, Σxy, Σx²; each window is a
+    difference of two prefix rows. A beta needs ``int(win * 0.2)`` masked
+    observations (and two for the variance) and a variance above VAR_EPS.
+
+    Parameters:
+        mkt (np.ndarray): (T, N) market returns, row t = the column's t-th observation.
+        stk (np.ndarray): (T, N) stock returns; NaN rows (padding) are skipped.
+        windows (Iterable[int]): Rolling window sizes (rows).
+
+    Returns:
+        Dict[str, np.ndarray]: 'beta_up_<w>' / 'beta_down_<w>' → (T, N) float64.
+    """
+    mkt = np.asarray(mkt, dtype=np.float64)
+    stk = np.asarray(stk, dtype=np.float64)
+    valid = ~np.isnan(mkt) & ~np.isnan(stk)
+    zero = np.zeros((1,) + mkt.shape[1:])
+    out: Dict[str, np.ndarray] = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for side, mask in (("up", valid & (mkt > 0)), ("down", valid & (mkt < 0))):
+            x = np.where(mask, mkt, 0.0)
+            y = np.where(mask, stk, 0.0)
+            sums = [np.concatenate((zero, np.cumsum(a, axis=0)))
+                    for a in (mask.astype(np.float64), x, y, x * y, x * x)]
+            for win in windows:
+                n, sx, sy, sxy, sxx = (_window_sums(c, win) for c in sums)
+                min_req = int(win * 0.2)
+                cov = (sxy - sx * sy / n) / (n - 1)
+                var = (sxx - sx * sx / n) / (n - 1)
+                ok = (n >= max(min_req, 2)) & (var > VAR_EPS)
+                out[f'beta_{side}_{win}'] = np.where(ok, cov / var, np.nan)
+    return out
+
+
+def _batch_betas(df: pd.DataFrame, windows: Iterable[int]) -> pd.DataFrame:
+    """
+    Rolling up/down betas for every symbol of a batch – no per-symbol loop.
+
+    Rows with missing returns are dropped; each symbol's remaining rows are
+    left-aligned into a (max rows, n symbols) panel (column j, row k = the
+    k-th observation of symbol j, NaN padding at the end), so the windows run
+    over each symbol's own observations, exactly like the per-symbol
+    ``_rolling_betas`` loop.
+
+    Parameters:
+        df (pd.DataFrame): Columns 'symbol', 'date', 'return_daily', 'sp_return'.
+        windows (Iterable[int]): Rolling window sizes (number of days).
+
+    Returns:
+        pd.DataFrame: 'symbol', 'date', then beta_up_<w> and beta_down_<w> for every window.
+    """
+    windows = list(windows)
+    df = df.dropna(subset=['return_daily', 'sp_return'])
+    df = df.sort_values(['symbol', 'date'], kind='stable')
+    col, symbols = pd.factorize(df['symbol'], sort=False)
+    row = df.groupby(col, sort=False).cumcount().to_numpy()
+    shape = (int(row.max()) + 1 if len(row) else 0, len(symbols))
+
+    mkt = np.full(shape, np.nan)
+    stk = np.full(shape, np.nan)
+    mkt[row, col] = df['sp_return'].to_numpy(dtype=np.float64)
+    stk[row, col] = df['return_daily'].to_numpy(dtype=np.float64)
+    betas = _beta_kernel(mkt, stk, windows)
+
+    out = pd.DataFrame({'symbol': df['symbol'].to_numpy(), 'date': df['date'].to_numpy()})
+    for name in [f'beta_up_{w}' for w in windows] + [f'beta_down_{w}' for w in windows]:
+        out[name] = betas[name][row, col]
+    return out
+
+
+def check_beta_kernel(n_symbols: int = 50, n_days: int = 1500, seed: int = 0,
+                      windows: List[int] = ROLLING_WINDOWS) -> float:
+    """
+    Compare ``_batch_betas`` with the per-symbol pandas ``_rolling_betas`` on
+    random returns (symbols of different lengths, gaps, zero market days).
+
+    Returns:
+        float: Largest absolute beta difference (NaN patterns must match exactly).
+
+    Raises:
+        AssertionError: If the NaN patterns differ.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2000-01-03', periods=n_days)
+    sp = np.round(rng.normal(0, 0.01, n_days), 4)            # rounding → some 0.0 days
+    frames = []
+    for j in range(n_symbols):
+        keep = rng.random(n_days) > 0.05
+        keep[:rng.integers(0, n_days // 2)] = False            # late listings
+        g = pd.DataFrame({'symbol': f'S{j:03d}', 'date': dates[keep], 'sp_return': sp[keep]})
+        g['return_daily'] = rng.uniform(0.2, 2.0) * g['sp_return'] + rng.normal(0, 0.01, len(g))
+        g.loc[rng.random(len(g)) < 0.01, 'return_daily'] = np.nan
+        frames.append(g)
+    df = pd.concat(frames, ignore_index=True)
+
+    t0 = time.perf_counter()
+    ref = []
+    for sym, g in df.groupby('symbol', sort=False):
+        g = g.dropna(subset=['return_daily', 'sp_return']).reset_index(drop=True)
+        betas = _rolling_betas(g[['date', 'return_daily', 'sp_return']], windows)
+        merged = g[['date']].copy()
+        for w in windows:
+            merged = merged.merge(betas[w], on='date')
+        merged.insert(0, 'symbol', sym)
+        ref.append(merged)
+    ref = pd.concat(ref, ignore_index=True)
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = _batch_betas(df, windows)
+    t_new = time.perf_counter() - t0
+
+    cols = list(new.columns[2:])
+    a, b = ref[cols].to_numpy(), new[cols].to_numpy()
+    assert (ref[['symbol', 'date']].to_numpy() == new[['symbol', 'date']].to_numpy()).all()
+    assert (np.isnan(a) == np.isnan(b)).all(), "NaN pattern differs"
+    diff = float(np.nanmax(np.abs(a - b))) if np.isfinite(a).any() else 0.0
+    print(f"✅ {len(new):,} rows × {len(cols)} betas – max |Δ| {diff:.2e} | "
+          f"pandas {t_ref:.2f}s → kernel {t_new:.2f}s")
+    return diff
+
+def _null_records(df: pd.DataFrame) -> List[Dict]:
+    """``to_dict('records')`` with NaN → None, so undefined betas are stored as NULL (as by COPY)."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
 def _bulk_upsert(session, rows: List[Dict], columns: List[str]):
     """
     Perform a bulk upsert (insert or update) into the BetaCalculation table.
@@ -732,8 +1176,168 @@ def _bulk_upsert(session, rows: List[Dict], columns: List[str]):
         )
     )
     
+def _read_beta_batch(symbols: List[str]) -> pd.DataFrame:
+    """Returns of *symbols* ordered by (symbol, date) – the input of ``_batch_betas``."""
+    with session_scope() as s:
+        return pd.read_sql(text("""
+            SELECT symbol, date, return_daily, sp_return
+              FROM daily_stock_data
+             WHERE symbol = ANY(:syms)
+          ORDER BY symbol, date"""), s.bind, params={'syms': symbols})
+
+
+def _copy_beta_batch(raw_conn, betas: pd.DataFrame, columns: List[str]) -> int:
+    """
+    COPY one batch of betas into a staging table and merge it into BETA_TABLE.
+
+    NaN betas arrive as SQL NULL. Returns the number of rows merged.
+    """
+    staging = f"{BETA_TABLE}_staging"
+    cur = raw_conn.cursor()
+    try:
+        _create_staging_table(cur, BETA_TABLE, staging)
+        _copy_to_staging(cur, betas, staging, columns)
+        n = _merge_staging(cur, BETA_TABLE, staging, columns, ['symbol', 'date'])
+        raw_conn.commit()
+        return n
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def _timed_batch_betas(df: pd.DataFrame, windows: List[int]):
+    """``_batch_betas`` plus its CPU wall time (process-pool task)."""
+    t0 = time.perf_counter()
+    betas = _batch_betas(df, windows)
+    return betas, time.perf_counter() - t0
+
+
+def _throughput_report(stats: Dict[str, float]) -> Dict[str, float]:
+    """Add symbols/s and rows/s to *stats* and print them."""
+    wall = max(stats['wall_s'], 1e-9)
+    stats['symbols_per_s'] = stats['symbols'] / wall
+    stats['rows_per_s'] = stats['rows'] / wall
+    print(f"📈 {stats['symbols']:,.0f} symbols, {stats['rows']:,.0f} rows in {wall:,.1f}s – "
+          f"{stats['symbols_per_s']:,.1f} symbols/s, {stats['rows_per_s']:,.0f} rows/s "
+          f"(read {stats['read_s']:,.1f}s · compute {stats['compute_s']:,.1f}s · "
+          f"write {stats['write_s']:,.1f}s)")
+    return stats
+
+
+def _compute_stock_betas_pipelined(symbols: List[str], windows: List[int], col_list: List[str],
+                                   symbol_batch: int, n_workers: int, prefetch: int,
+                                   ) -> Dict[str, float]:
+    """
+    Reader thread → process pool → writer thread, all three busy at once.
+
+    The reader prefetches up to *prefetch* batches ahead; at most
+    *n_workers* + *prefetch* batches are computing; the writer streams every
+    finished batch through COPY + merge on its own connection. Batches may be
+    written out of order (each is an independent upsert).
+    """
+    batches = [symbols[i:i + symbol_batch] for i in range(0, len(symbols), symbol_batch)]
+    stats = dict(symbols=0.0, rows=0.0, read_s=0.0, compute_s=0.0, write_s=0.0, wall_s=0.0)
+    done_marker = object()
+    read_q: queue.Queue = queue.Queue(maxsize=max(prefetch, 1))
+    write_q: queue.Queue = queue.Queue(maxsize=max(prefetch, 1))
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def reader():
+        try:
+            for no, batch in enumerate(batches, 1):
+                if stop.is_set():
+                    return
+                t0 = time.perf_counter()
+                df = _read_beta_batch(batch)
+                stats['read_s'] += time.perf_counter() - t0
+                read_q.put((no, batch, df))
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            read_q.put(done_marker)
+
+    def writer():
+        raw_conn = engine.raw_connection()
+        try:
+            while (item := write_q.get()) is not done_marker:
+                if errors:
+                    continue  # drain so the producer never blocks
+                no, batch, betas = item
+                t0 = time.perf_counter()
+                _copy_beta_batch(raw_conn, betas, col_list)
+                stats['write_s'] += time.perf_counter() - t0
+                stats['symbols'] += len(batch)
+                stats['rows'] += len(betas)
+                print(f"✅ Batch {no}/{len(batches)} written ({len(betas):,} rows) – "
+                      f"{stats['symbols']:,.0f}/{len(symbols):,} symbols done.")
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+            while write_q.get() is not done_marker:
+                pass
+        finally:
+            raw_conn.close()
+
+    t_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        # start the workers before any thread exists (fork + threads do not mix)
+        list(pool.map(int, range(n_workers)))
+        threads = [threading.Thread(target=reader, name="beta-reader", daemon=True),
+                   threading.Thread(target=writer, name="beta-writer", daemon=True)]
+        for t in threads:
+            t.start()
+
+        pending: Dict = {}
+        reading = True
+        try:
+            while (reading or pending) and not errors:
+                # wait on the reader and the pool together: a finished batch goes to
+                # the writer within BETA_POLL_S even while the next read is in flight
+                can_read = reading and len(pending) < n_workers + prefetch
+                if can_read:
+                    try:
+                        item = read_q.get(timeout=BETA_POLL_S if pending else None)
+                    except queue.Empty:
+                        item = None
+                    if item is done_marker:
+                        reading = False
+                    elif item is not None:
+                        no, batch, df = item
+                        print(f"⚡ Batch {no}/{len(batches)}: {len(batch)} symbols → compute")
+                        pending[pool.submit(_timed_batch_betas, df, windows)] = (no, batch)
+                finished, _ = wait(pending, timeout=0 if can_read else None,
+                                   return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    no, batch = pending.pop(fut)
+                    betas, seconds = fut.result()
+                    stats['compute_s'] += seconds
+                    write_q.put((no, batch, betas[col_list]))
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            stop.set()
+            while reading and read_q.get() is not done_marker:  # unblock the reader
+                pass
+            for fut in pending:
+                fut.cancel()
+            write_q.put(done_marker)
+            for t in threads:
+                t.join()
+
+    if errors:
+        raise errors[0]
+    stats['wall_s'] = time.perf_counter() - t_start
+    return stats
+
+
 def compute_stock_betas(windows: List[int] = ROLLING_WINDOWS,
-                         symbol_batch: int = SYMBOL_BATCH) -> None:
+                         symbol_batch: int = SYMBOL_BATCH,
+                         pipelined: bool = False,
+                         n_workers: Optional[int] = None,
+                         prefetch: int = BETA_PREFETCH) -> Dict[str, float]:
     """Calculate rolling up/down betas and persist to *beta_calculation*.
 
     Parameters
@@ -742,6 +1346,21 @@ def compute_stock_betas(windows: List[int] = ROLLING_WINDOWS,
         Rolling window lengths (trading‑days).
     symbol_batch : int
         Number of symbols processed per DB round‑trip.
+    pipelined : bool
+        ``False`` – read, compute and upsert one batch after the other.
+        ``True``  – a reader thread prefetches batches, a process pool
+        computes several batches concurrently and a writer thread streams the
+        results through ``COPY`` into a staging table and merges them.
+    n_workers : int, optional
+        Compute processes in pipelined mode (default ``BETA_WORKERS``).
+    prefetch : int
+        Batches read ahead of the compute stage in pipelined mode.
+
+    Returns
+    -------
+    dict
+        Throughput report: symbols, rows, wall / read / compute / write
+        seconds, symbols_per_s, rows_per_s.
     """
 
     # column order for both pandas → dict and DB insert
@@ -752,6 +1371,17 @@ def compute_stock_betas(windows: List[int] = ROLLING_WINDOWS,
         symbols = [row[0] for row in s.execute(text("SELECT DISTINCT symbol FROM daily_stock_data ORDER BY symbol"))]
 
     total = len(symbols)
+    if pipelined:
+        n_workers = n_workers or BETA_WORKERS
+        print(f"⚡ Pipelined beta calculation: {total:,} symbols, {n_workers} workers, "
+              f"prefetch {prefetch} …")
+        stats = _compute_stock_betas_pipelined(symbols, list(windows), col_list,
+                                               symbol_batch, n_workers, prefetch)
+        print("🚀 Beta calculation complete.")
+        return _throughput_report(stats)
+
+    stats = dict(symbols=0.0, rows=0.0, read_s=0.0, compute_s=0.0, write_s=0.0, wall_s=0.0)
+    t_start = time.perf_counter()
     processed = 0
 
     for i in range(0, total, symbol_batch):
@@ -759,33 +1389,29 @@ def compute_stock_betas(windows: List[int] = ROLLING_WINDOWS,
         print(f"⚡ Processing symbols {i + 1:,} – {i + len(batch):,} / {total:,} …")
 
         # pull once per batch
-        with session_scope() as s:
-            df = pd.read_sql(text("""
-                SELECT symbol, date, return_daily, sp_return
-                  FROM daily_stock_data
-                 WHERE symbol = ANY(:syms)
-              ORDER BY symbol, date"""), s.bind, params={'syms': batch})
-
-        records: List[Dict] = []
-        for sym, g in df.groupby('symbol', sort=False):
-            g = g.dropna(subset=['return_daily', 'sp_return']).reset_index(drop=True)
-            if g.empty:
-                continue
-            betas = _rolling_betas(g[['date', 'return_daily', 'sp_return']], windows)
-            merged = g[['date']].copy()
-            for w in windows:
-                merged = merged.merge(betas[w], on='date')
-            merged.insert(0, 'symbol', sym)
-            records.extend(merged[col_list].to_dict('records'))
+        t0 = time.perf_counter()
+        df = _read_beta_batch(batch)
+        stats['read_s'] += time.perf_counter() - t0
+
+        # all symbols and windows of the batch in one prefix-sum pass
+        t0 = time.perf_counter()
+        records: List[Dict] = _null_records(_batch_betas(df, windows)[col_list])
+        stats['compute_s'] += time.perf_counter() - t0
 
         # single upsert per batch
+        t0 = time.perf_counter()
         with session_scope() as s:
             _bulk_upsert(s, records, col_list)
+        stats['write_s'] += time.perf_counter() - t0
 
         processed += len(batch)
+        stats['symbols'] = processed
+        stats['rows'] += len(records)
         print(f"✅ Batch finished – {processed:,}/{total:,} symbols done.\n")
 
+    stats['wall_s'] = time.perf_counter() - t_start
     print("🚀 Beta calculation complete.")
+    return _throughput_report(stats)
 
 if __name__ == "__main__":
     # compute_stock_betas() 
@@ -2,7 +2,7 @@
 import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # Assuming all user imports are correct and working
 from DBintegration.models import DailyStockData, SP500Index
-from DBintegration.db_utils import model_to_dataframe
+from DBintegration.db_utils import model_to_dataframe_streamed
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -88,7 +88,7 @@ else:
     #stage 0: gets the data from server. (working)
     print("Building data from database…")
     print("Loading daily stock data for all symbols:")
-    df_main = model_to_dataframe(DailyStockData)
+    df_main = model_to_dataframe_streamed(DailyStockData)
     df_train, df_val, df_test = split_dataframe_by_dates(df_main)
     df_train['date'] = pd.to_datetime(df_train['date'])
     df_train.set_index('date', inplace=True)
@@ -98,7 +98,7 @@ else:
     print(stocks_num) #here just to make sure it worked
 
     print("Loading snp data:")
-    df_sp500 = model_to_dataframe(SP500Index)
+    df_sp500 = model_to_dataframe_streamed(SP500Index)
     df_sp500_train, df_sp500_val, df_sp500_test = split_dataframe_by_dates(df_sp500)
     df_sp500_train['date'] = pd.to_datetime(df_sp500_train['date'])
     df_sp500_train.set_index('date', inplace=True)
@@ -46,8 +46,8 @@ if use_cp:
     df_sp500 = pd.read_parquet(CP_SP500)
 else:
     print("Building data from database…")
-    df_main = model_to_dataframe(DailyStockData)
-    df_sp500 = model_to_dataframe(SP500Index)
+    df_main = model_to_dataframe_streamed(DailyStockData)
+    df_sp500 = model_to_dataframe_streamed(SP500Index)
     # Save the raw data for next time
     df_main.to_parquet(CP_MAIN)
     df_sp500.to_parquet(CP_SP500)
@@ -181,7 +181,7 @@ import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from DBintegration.models import DailyStockData, SP500Index
-from DBintegration.db_utils import model_to_dataframe
+from DBintegration.db_utils import model_to_dataframe_streamed
 import backtrader as bt
 import pandas as pd
 import numpy as np
@@ -214,8 +214,8 @@ if use_cp:
     df_sp500 = pd.read_parquet(CP_SP500)
 else:
     print("Building data from database…")
-    df_main  = model_to_dataframe(DailyStockData)
-    df_sp500 = model_to_dataframe(SP500Index)
+    df_main  = model_to_dataframe_streamed(DailyStockData)
+    df_sp500 = model_to_dataframe_streamed(SP500Index)
     df_main.to_parquet(CP_MAIN);  df_sp500.to_parquet(CP_SP500)
 
 # --- split to the desired period ------------------------------------------
@@ -347,7 +347,7 @@ import os, sys, pandas as pd
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from DBintegration.models import DailyStockData, SP500Index
-from DBintegration.db_utils import model_to_dataframe
+from DBintegration.db_utils import model_to_dataframe_streamed
 from pandas.tseries.offsets import BDay
 import backtrader as bt
 import numpy as np
@@ -376,7 +376,7 @@ def load_or_build(name, checkpoint_path, model_class):
         df = pd.read_parquet(checkpoint_path)
     else:
         print(f"Building {name} data from database…")
-        df = model_to_dataframe(model_class)
+        df = model_to_dataframe_streamed(model_class)
         df.to_parquet(checkpoint_path)
 
     # 🔧 תיקון כאן:
@@ -5,8 +5,12 @@ from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
 
-def load_trades(csv_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(csv_path, parse_dates=["entry_date", "exit_date"])
+def load_trades(path: Path) -> pd.DataFrame:
+    # trades.parquet keeps the ledger dtypes – no date parsing needed
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, parse_dates=["entry_date", "exit_date"])
     df = df.sort_values("entry_date").reset_index(drop=True)
     return df
 
@@ -54,11 +58,11 @@ def plot_cumulative(df: pd.DataFrame):
     plt.show()
 
 def main():
-    parser = argparse.ArgumentParser(description="Analyze trades.csv")
-    parser.add_argument("csv", type=Path, help="Path to trades.csv")
+    parser = argparse.ArgumentParser(description="Analyze trades.csv / trades.parquet")
+    parser.add_argument("path", type=Path, help="Path to trades.csv or trades.parquet")
     args = parser.parse_args()
 
-    df = load_trades(args.csv)
+    df = load_trades(args.path)
     closed_df = basic_stats(df)
     plot_histogram(closed_df)
     plot_cumulative(closed_df)
@@ -12,17 +12,35 @@ Key points
    gracefully downgrade to Pickle so the code still works out‑of‑the‑box.
 *  **Identical signature** for all loaders:
        >>> df = load_<table>(*, force_reload=False, **filters)
-
-This module exposes exactly three public helpers – import with:
+*  **Partitioned master caches** – stocks and betas are cached once per table
+   as a hive-partitioned Parquet dataset (``year=/bucket=``). Filtered calls
+   read only matching partitions / row groups and the requested columns
+   (pyarrow predicate pushdown) instead of writing one copy per query.
+*  **Compact mode (opt-in)** – ``compact=True`` (or ``ALGO_COMPACT_DTYPES=1``)
+   writes a separate ``<table>_compact`` cache with float32 prices / betas and
+   returns categorical ``symbol`` and uint32 ``volume``. See ``memory_report``.
+*  **Self-invalidating** – every cache file has a ``.meta.json`` sidecar
+   (row count, max(date), query, DB fingerprint). A cheap fingerprint query
+   detects table changes and refreshes stale caches automatically.
+
+This module exposes three loaders (plus cache / memory helpers) – import with:
     from simulation.loaders import load_sp500, load_stocks, load_betas
 """
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import operator
 import os
+import shutil
+import time
+import zlib
+from functools import reduce
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 
@@ -30,7 +48,7 @@ from sqlalchemy import text
 # Optional Parquet support – fall back to Pickle if engines are missing
 # ---------------------------------------------------------------------------
 try:
-    import pyarrow as _pa  # noqa: F401 – presence only
+    import pyarrow as _pa
     _PARQUET_ENGINE = "pyarrow"
     _HAS_PARQUET = True
 except ModuleNotFoundError:  # pragma: no cover – handled at runtime only
@@ -42,10 +60,16 @@ except ModuleNotFoundError:  # pragma: no cover – handled at runtime only
         _HAS_PARQUET = False
         _PARQUET_ENGINE = None
 
+# Partitioned datasets need pyarrow itself; other setups keep one file per query
+_HAS_DATASET = _PARQUET_ENGINE == "pyarrow"
+if _HAS_DATASET:
+    import pyarrow.dataset as _ds
+
 # ---------------------------------------------------------------------------
 # Project imports (DB session etc.)
 # ---------------------------------------------------------------------------
 from DBintegration.database import SessionLocal, engine  # noqa: E402 – after sys.path gymnastics upstream
+from DBintegration.models import BetaCalculation, DailyStockData  # noqa: E402
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -57,6 +81,21 @@ _CACHE_DIR.mkdir(parents=True, exist_ok=True)
 # Helper utils
 # ---------------------------------------------------------------------------
 
+_FINGERPRINT_TTL = 300  # seconds a fingerprint is trusted within one process
+_fingerprints: Dict[str, tuple] = {}
+
+# Opt-in compact dtypes (float32 / categorical / uint32) – roughly halves RAM
+COMPACT_DTYPES = os.getenv("ALGO_COMPACT_DTYPES", "0") == "1"
+
+_N_BUCKETS = 16            # symbol hash buckets per year partition
+_DB_CHUNK_ROWS = 500_000   # rows streamed from the DB per dataset write
+_ROWS_PER_GROUP = 128_000  # parquet row-group size (unit of predicate pushdown)
+_DATASET_MODELS = {
+    "daily_stock_data": DailyStockData,
+    "beta_calculation": BetaCalculation,
+}
+
+
 def _cache_path(name: str, ext: Optional[str] = None) -> Path:
     """Return path under data_cache with proper extension."""
     if ext is None:
@@ -64,17 +103,141 @@ def _cache_path(name: str, ext: Optional[str] = None) -> Path:
     return _CACHE_DIR / f"{name}.{ext}"
 
 
-def _save_to_cache(df: pd.DataFrame, name: str) -> None:
+def _meta_path(name: str) -> Path:
+    """Return path of the JSON metadata sidecar for cache *name*."""
+    return _CACHE_DIR / f"{name}.meta.json"
+
+
+def _cache_key(name: str, **query) -> str:
+    """
+    Deterministic cache name for *name* filtered by *query*.
+
+    Unlike ``hash()`` (salted per process) a SHA-1 digest of the normalised
+    query is stable across processes and machines.
+    """
+    query = {k: v for k, v in query.items() if v is not None}
+    if not query:
+        return name
+    if "tickers" in query:
+        query["tickers"] = sorted(set(query["tickers"]))
+    payload = json.dumps(query, sort_keys=True, default=str)
+    return f"{name}_{hashlib.sha1(payload.encode()).hexdigest()[:16]}"
+
+
+def _resolve_compact(compact: Optional[bool]) -> bool:
+    return COMPACT_DTYPES if compact is None else compact
+
+
+def _compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast *df* in place: ``symbol`` → category, floats → float32,
+    ``volume`` → uint32 (int64 when it overflows / has NULLs).
+    """
+    for c in df.columns:
+        col = df[c]
+        if c == "symbol":
+            if not isinstance(col.dtype, pd.CategoricalDtype):
+                df[c] = col.astype("category")
+            df[c] = df[c].cat.reorder_categories(sorted(df[c].cat.categories))
+        elif c == "volume":
+            if col.isna().any():
+                df[c] = col.astype("Int64")
+            elif len(col) and col.min() >= 0 and col.max() < 2**32:
+                df[c] = col.astype("uint32")
+            else:
+                df[c] = col.astype("int64")
+        elif pd.api.types.is_float_dtype(col):
+            df[c] = col.astype("float32")
+    return df
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """Deep in-memory size of *df* in MiB."""
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def _db_fingerprint(table: str) -> Optional[Dict]:
+    """
+    Cheap change-detector for *table*: max(date) plus the cumulative
+    insert/update/delete counters from ``pg_stat_user_tables``.
+
+    Returns None when the database is unreachable (cache is then trusted).
+    """
+    hit = _fingerprints.get(table)
+    if hit is not None and time.monotonic() - hit[0] < _FINGERPRINT_TTL:
+        return hit[1]
+    try:
+        with engine.connect() as conn:
+            max_date = conn.execute(text(f"SELECT MAX(date) FROM {table}")).scalar()
+            n_mod = conn.execute(text("""
+                SELECT COALESCE(n_tup_ins, 0) + COALESCE(n_tup_upd, 0) + COALESCE(n_tup_del, 0)
+                  FROM pg_stat_user_tables
+                 WHERE relname = :table
+            """), {"table": table}).scalar()
+    except Exception as e:  # pragma: no cover – offline use
+        logger.warning("⚠️ fingerprint for %s unavailable (%s) – trusting cache", table, e)
+        _fingerprints[table] = (time.monotonic(), None)
+        return None
+    fp = {"max_date": str(max_date) if max_date is not None else None,
+          "n_mod": int(n_mod) if n_mod is not None else None}
+    _fingerprints[table] = (time.monotonic(), fp)
+    return fp
+
+
+def data_fingerprint(
+    tables: Iterable[str] = ("sp500_index", "daily_stock_data", "beta_calculation"),
+    *,
+    check_db: bool = True,
+) -> str:
+    """
+    Short digest identifying the current contents of *tables* – a key part
+    for results derived from the data (e.g. the optimizers' evaluation cache).
+
+    Uses the DB fingerprint when reachable (and *check_db*), otherwise the
+    fingerprint / creation stamp recorded in the local cache's sidecar.
+    """
+    parts = {}
+    for table in tables:
+        fp = _db_fingerprint(table) if check_db else None
+        if fp is None and _meta_path(table).exists():
+            meta = json.loads(_meta_path(table).read_text())
+            fp = meta.get("fingerprint") or {k: meta.get(k) for k in ("rows", "max_date", "created")}
+        parts[table] = fp
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def _save_to_cache(df: pd.DataFrame, name: str, meta: Optional[Dict] = None) -> None:
     if _HAS_PARQUET:
         p = _cache_path(name, "parquet")
         df.to_parquet(p, index=False, engine=_PARQUET_ENGINE)
     else:
         p = _cache_path(name, "pkl")
         df.to_pickle(p)
+
+    meta = dict(meta or {})
+    meta["rows"] = int(len(df))
+    meta["max_date"] = str(df["date"].max()) if "date" in df.columns and len(df) else None
+    meta["created"] = pd.Timestamp.now().isoformat(timespec="seconds")
+    _meta_path(name).write_text(json.dumps(meta, indent=2, default=str))
     logger.info("✅ cached %s rows → %s", len(df), p.name)
 
 
-def _load_from_cache(name: str) -> Optional[pd.DataFrame]:
+def _load_from_cache(name: str, fingerprint: Optional[Dict] = None) -> Optional[pd.DataFrame]:
+    """
+    Return cached frame *name*, or None if missing or stale.
+
+    A cache is stale when *fingerprint* is given and differs from the one
+    recorded in its sidecar (or the sidecar is missing).
+    """
+    if fingerprint is not None:
+        meta_p = _meta_path(name)
+        meta = json.loads(meta_p.read_text()) if meta_p.exists() else {}
+        if meta.get("fingerprint") != fingerprint:
+            if meta_p.exists() or _cache_path(name).exists():
+                logger.info("♻️ %s is stale – refreshing from DB", name)
+            return None
+
     p_parquet = _cache_path(name, "parquet")
     p_pickle = _cache_path(name, "pkl")
     if _HAS_PARQUET and p_parquet.exists():
@@ -85,21 +248,195 @@ def _load_from_cache(name: str) -> Optional[pd.DataFrame]:
         return pd.read_pickle(p_pickle)
     return None
 
+
+# ---------------------------------------------------------------------------
+# Partitioned master datasets (pyarrow only)
+# ---------------------------------------------------------------------------
+
+def _symbol_bucket(symbols: pd.Series) -> np.ndarray:
+    """Stable symbol → bucket id (crc32, unlike the per-process salted ``hash``)."""
+    lut = {s: zlib.crc32(str(s).encode()) % _N_BUCKETS for s in pd.unique(symbols)}
+    return symbols.map(lut).to_numpy(dtype="int8")
+
+
+def _partitioning():
+    return _ds.partitioning(_pa.schema([("year", _pa.int16()), ("bucket", _pa.int8())]),
+                            flavor="hive")
+
+
+def _dataset_schema(name: str, columns: Iterable[str], compact: bool = False):
+    """Fixed Arrow schema so every written chunk (even all-NULL ones) agrees."""
+    model_cols = _DATASET_MODELS[name].__table__.columns
+    float_type = _pa.float32() if compact else _pa.float64()
+    fields = []
+    for c in columns:
+        if c == "date":
+            typ = _pa.timestamp("ns")
+        elif c in model_cols:
+            py_type = model_cols[c].type.python_type
+            typ = {float: float_type, int: _pa.int64()}.get(py_type, _pa.string())
+        else:  # columns added to the table outside the ORM model
+            typ = _pa.string()
+        fields.append(_pa.field(c, typ))
+    return _pa.schema(fields)
+
+
+def _build_dataset(name: str, fingerprint: Optional[Dict], compact: bool = False) -> None:
+    """
+    Stream table *name* from the DB into ``data_cache/<name>/year=/bucket=``
+    (``<name>_compact/`` with float32 columns when *compact*).
+
+    Chunks are written date-ordered so row-group statistics allow date
+    pushdown. The dataset is built in a temp dir and swapped in at the end,
+    so concurrent readers never see a half-written cache.
+    """
+    cache_name = f"{name}_compact" if compact else name
+    target = _CACHE_DIR / cache_name
+    tmp = _CACHE_DIR / f"{cache_name}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    sql = f"SELECT * FROM {name} ORDER BY date, symbol"
+    schema = None
+    rows, max_date = 0, None
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True)
+        for i, chunk in enumerate(pd.read_sql(text(sql), conn, chunksize=_DB_CHUNK_ROWS)):
+            chunk["date"] = pd.to_datetime(chunk["date"])
+            if schema is None:
+                schema = _dataset_schema(name, chunk.columns, compact)
+            table = _pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            table = table.append_column("year", _pa.array(chunk["date"].dt.year.to_numpy("int16")))
+            table = table.append_column("bucket", _pa.array(_symbol_bucket(chunk["symbol"])))
+            _ds.write_dataset(
+                table, tmp, format="parquet",
+                partitioning=_partitioning(),
+                basename_template=f"part-{i:05d}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                max_rows_per_group=_ROWS_PER_GROUP,
+            )
+            rows += len(chunk)
+            max_date = chunk["date"].max()
+            logger.info("   ↪️ %s: %s rows written", name, f"{rows:,}")
+
+    tmp.mkdir(parents=True, exist_ok=True)  # empty table → empty dataset
+    shutil.rmtree(target, ignore_errors=True)
+    tmp.rename(target)
+
+    meta = dict(query=dict(sql=sql, params={}), fingerprint=fingerprint,
+                rows=rows, max_date=str(max_date) if max_date is not None else None,
+                created=pd.Timestamp.now().isoformat(timespec="seconds"),
+                partitioning=dict(keys=["year", "bucket"], n_buckets=_N_BUCKETS),
+                compact=compact)
+    _meta_path(cache_name).write_text(json.dumps(meta, indent=2, default=str))
+    logger.info("✅ cached %s rows → %s/", f"{rows:,}", target.name)
+
+
+def _dataset_is_fresh(name: str, fingerprint: Optional[Dict]) -> bool:
+    meta_p = _meta_path(name)
+    if not (_CACHE_DIR / name).is_dir() or not meta_p.exists():
+        return False
+    if fingerprint is None:
+        return True
+    return json.loads(meta_p.read_text()).get("fingerprint") == fingerprint
+
+
+def _read_dataset(
+    name: str,
+    tickers: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    compact: bool = False,
+) -> pd.DataFrame:
+    """
+    Read a filtered slice of master dataset *name*.
+
+    Year / bucket predicates prune whole partitions; date / symbol predicates
+    are pushed down to parquet row-group statistics. Only *columns* are read.
+    """
+    dataset = _ds.dataset(_CACHE_DIR / name, format="parquet", partitioning=_partitioning())
+    if columns is None:
+        columns = [c for c in dataset.schema.names if c not in ("year", "bucket")]
+    elif missing := [c for c in columns if c not in dataset.schema.names]:
+        raise KeyError(f"{name} has no columns {missing}")
+
+    preds = []
+    if start:
+        start = pd.Timestamp(start)
+        preds += [_ds.field("year") >= start.year, _ds.field("date") >= start]
+    if end:
+        end = pd.Timestamp(end)
+        preds += [_ds.field("year") <= end.year, _ds.field("date") <= end]
+    if tickers is not None:
+        buckets = np.unique(_symbol_bucket(pd.Series(tickers, dtype=object))).tolist()
+        preds += [_ds.field("bucket").isin(buckets), _ds.field("symbol").isin(tickers)]
+    expr = reduce(operator.and_, preds) if preds else None
+
+    table = dataset.to_table(columns=columns, filter=expr)
+    sort_keys = [(c, "ascending") for c in ("date", "symbol") if c in columns]
+    if sort_keys:
+        table = table.sort_by(sort_keys)
+    logger.info("📄 loading %s/ (%s rows)", name, f"{table.num_rows:,}")
+    df = table.to_pandas(strings_to_categorical=compact)
+    return _compact_frame(df) if compact else df
+
+
+def _load_master(
+    name: str,
+    *,
+    tickers: Optional[Iterable[str]],
+    start: Optional[str],
+    end: Optional[str],
+    columns: Optional[List[str]],
+    force_reload: bool,
+    check_db: bool,
+    compact: bool,
+) -> pd.DataFrame:
+    """Serve a filtered read from the (re)built master dataset of *name*."""
+    cache_name = f"{name}_compact" if compact else name
+    fp = _db_fingerprint(name) if check_db else None
+    if force_reload or not _dataset_is_fresh(cache_name, fp):
+        _build_dataset(name, fp or _db_fingerprint(name), compact)
+    return _read_dataset(cache_name, list(tickers) if tickers is not None else None,
+                         start, end, columns, compact)
+
+
+def prune_cache() -> List[str]:
+    """Delete cache files that have no metadata sidecar (legacy / orphaned keys)."""
+    removed = []
+    for p in _CACHE_DIR.iterdir():
+        if p.suffix in (".parquet", ".pkl") and not _meta_path(p.stem).exists():
+            p.unlink()
+            removed.append(p.name)
+    logger.info("🧹 pruned %s orphaned cache files", len(removed))
+    return removed
+
 # ---------------------------------------------------------------------------
 # Public loader functions
 # ---------------------------------------------------------------------------
 
-def load_sp500(*, force_reload: bool = False) -> pd.DataFrame:
+def load_sp500(
+    *,
+    force_reload: bool = False,
+    check_db: bool = True,
+    compact: Optional[bool] = None,
+) -> pd.DataFrame:
     """Return full `sp500_index` table as DataFrame."""
     name = "sp500_index"
-    if not force_reload and (df := _load_from_cache(name)) is not None:
+    compact = _resolve_compact(compact)
+    cache_name = f"{name}_compact" if compact else name
+    fp = _db_fingerprint(name) if check_db and not force_reload else None
+    if not force_reload and (df := _load_from_cache(cache_name, fp)) is not None:
         return df
 
+    sql = "SELECT * FROM sp500_index ORDER BY date"
     with engine.connect() as conn:
-        sql = text("SELECT * FROM sp500_index ORDER BY date")
-        df = pd.read_sql(sql, conn).astype({"date": "datetime64[ns]"})
+        df = pd.read_sql(text(sql), conn).astype({"date": "datetime64[ns]"})
+    if compact:
+        df = _compact_frame(df)
 
-    _save_to_cache(df, name)
+    _save_to_cache(df, cache_name, dict(query=dict(sql=sql, params={}), compact=compact,
+                                        fingerprint=fp or _db_fingerprint(name)))
     return df
 
 
@@ -108,24 +445,32 @@ def load_stocks(
     tickers: Optional[Iterable[str]] = None,
     start: Optional[str] = None,
     end: Optional[str] = None,
+    columns: Optional[List[str]] = None,
     force_reload: bool = False,
+    check_db: bool = True,
+    compact: Optional[bool] = None,
 ) -> pd.DataFrame:
-    """Load daily_stock_data (optionally filtered) as DataFrame."""
+    """Load daily_stock_data (optionally filtered / column-projected) as DataFrame."""
     name = "daily_stock_data"
-    cache_key = name
+    compact = _resolve_compact(compact)
+    if _HAS_DATASET:
+        return _load_master(name, tickers=tickers, start=start, end=end, columns=columns,
+                            force_reload=force_reload, check_db=check_db, compact=compact)
+
     if tickers is not None:
-        cache_key += "_" + str(abs(hash(tuple(sorted(set(tickers))))))
-    if start or end:
-        cache_key += f"_{start or ''}_{end or ''}"
+        tickers = list(tickers)
+    cache_key = _cache_key(name, tickers=tickers, start=start, end=end,
+                           compact=compact or None)
 
-    if not force_reload and (df := _load_from_cache(cache_key)) is not None:
-        return df
+    fp = _db_fingerprint(name) if check_db and not force_reload else None
+    if not force_reload and (df := _load_from_cache(cache_key, fp)) is not None:
+        return df[columns] if columns is not None else df
 
     clauses: List[str] = []
     params: dict = {}
     if tickers is not None:
         clauses.append("symbol = ANY(:tickers)")
-        params["tickers"] = list(tickers)
+        params["tickers"] = tickers
     if start:
         clauses.append("date >= :start")
         params["start"] = start
@@ -134,37 +479,94 @@ def load_stocks(
         params["end"] = end
 
     where_clause = "WHERE " + " AND ".join(clauses) if clauses else ""
-    sql = text(
-        f"""
+    sql = f"""
         SELECT *
         FROM daily_stock_data
         {where_clause}
         ORDER BY date, symbol
         """
-    )
 
     with engine.connect() as conn:
-        df = pd.read_sql(sql, conn, params=params)
+        df = pd.read_sql(text(sql), conn, params=params)
     df["date"] = pd.to_datetime(df["date"])
+    if compact:
+        df = _compact_frame(df)
 
-    _save_to_cache(df, cache_key)
-    return df
-
+    _save_to_cache(df, cache_key, dict(query=dict(sql=" ".join(sql.split()), params=params),
+                                       compact=compact, fingerprint=fp or _db_fingerprint(name)))
+    return df[columns] if columns is not None else df
 
-def load_betas(*, force_reload: bool = False) -> pd.DataFrame:
-    """Return full beta_calculation table."""
-    name = "beta_calculation"
-    if not force_reload and (df := _load_from_cache(name)) is not None:
-        return df
 
+def _fetch_full_betas(name: str, fp: Optional[Dict], compact: bool) -> pd.DataFrame:
+    """Single-file fallback when pyarrow datasets are unavailable."""
+    sql = "SELECT * FROM beta_calculation ORDER BY date, symbol"
     with engine.connect() as conn:
-        sql = text("SELECT * FROM beta_calculation ORDER BY date, symbol")
-        df = pd.read_sql(sql, conn)
+        df = pd.read_sql(text(sql), conn)
     df["date"] = pd.to_datetime(df["date"])
+    if compact:
+        df = _compact_frame(df)
 
-    _save_to_cache(df, name)
+    cache_name = f"{name}_compact" if compact else name
+    _save_to_cache(df, cache_name, dict(query=dict(sql=sql, params={}), compact=compact,
+                                        fingerprint=fp or _db_fingerprint(name)))
     return df
 
+
+def load_betas(
+    *,
+    tickers: Optional[Iterable[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    force_reload: bool = False,
+    check_db: bool = True,
+    compact: Optional[bool] = None,
+) -> pd.DataFrame:
+    """Return beta_calculation (optionally filtered / column-projected)."""
+    name = "beta_calculation"
+    compact = _resolve_compact(compact)
+    if _HAS_DATASET:
+        return _load_master(name, tickers=tickers, start=start, end=end, columns=columns,
+                            force_reload=force_reload, check_db=check_db, compact=compact)
+
+    cache_name = f"{name}_compact" if compact else name
+    fp = _db_fingerprint(name) if check_db and not force_reload else None
+    if force_reload or (df := _load_from_cache(cache_name, fp)) is None:
+        df = _fetch_full_betas(name, fp, compact)
+
+    if tickers is not None:
+        df = df[df["symbol"].isin(list(tickers))]
+    if start:
+        df = df[df["date"] >= pd.Timestamp(start)]
+    if end:
+        df = df[df["date"] <= pd.Timestamp(end)]
+    return df[columns] if columns is not None else df
+
+
+def memory_report(*, compact: Optional[bool] = None, check_db: bool = True) -> pd.DataFrame:
+    """
+    Load every table and report its in-memory footprint – use it to size
+    optimizer workers (each worker holds its own copy).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per table: rows, columns, MiB and bytes per row.
+    """
+    compact = _resolve_compact(compact)
+    rows = []
+    for table, loader in (("sp500_index", load_sp500),
+                          ("daily_stock_data", load_stocks),
+                          ("beta_calculation", load_betas)):
+        df = loader(check_db=check_db, compact=compact)
+        mb = frame_memory_mb(df)
+        rows.append(dict(table=table, rows=len(df), columns=df.shape[1], mb=round(mb, 1),
+                         bytes_per_row=round(mb * 2**20 / max(len(df), 1), 1)))
+        del df
+    report = pd.DataFrame(rows)
+    logger.info("📐 memory footprint (compact=%s):\n%s", compact, report.to_string(index=False))
+    return report
+
 # ---------------------------------------------------------------------------
 # CLI helper for quick manual testing
 # ---------------------------------------------------------------------------
@@ -175,25 +577,38 @@ def _main():  # pragma: no cover – manual smoke‑test only
     parser = argparse.ArgumentParser(description="Quick loaders test")
     parser.add_argument("table", choices=["sp", "stocks", "betas"], help="Table to load")
     parser.add_argument("--force", action="store_true", help="Ignore cache")
+    parser.add_argument("--offline", action="store_true", help="Skip DB freshness check")
+    parser.add_argument("--compact", action="store_true", help="Compact dtypes")
     parser.add_argument("--ticker", action="append", help="Filter by ticker(s)")
     parser.add_argument("--start")
     parser.add_argument("--end")
     args = parser.parse_args()
 
     if args.table == "sp":
-        df = load_sp500(force_reload=args.force)
+        df = load_sp500(force_reload=args.force, check_db=not args.offline,
+                        compact=args.compact or None)
     elif args.table == "stocks":
         df = load_stocks(
             tickers=args.ticker,
             start=args.start,
             end=args.end,
             force_reload=args.force,
+            check_db=not args.offline,
+            compact=args.compact or None,
         )
     else:
-        df = load_betas(force_reload=args.force)
+        df = load_betas(
+            tickers=args.ticker,
+            start=args.start,
+            end=args.end,
+            force_reload=args.force,
+            check_db=not args.offline,
+            compact=args.compact or None,
+        )
 
     print(df.head())
     print("Rows:", len(df))
+    print(f"Memory: {frame_memory_mb(df):,.1f} MiB")
     sys.exit(0)
 
 
@@ -205,4 +620,8 @@ __all__ = [
     "load_sp500",
     "load_stocks",
     "load_betas",
+    "prune_cache",
+    "memory_report",
+    "frame_memory_mb",
+    "data_fingerprint",
 ]
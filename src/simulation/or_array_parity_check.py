@@ -0,0 +1,180 @@
+"""simulation/or_array_parity_check.py – dict vs. array portfolio core
+
+Runs each dict-based simulator and its array-backed counterpart on the same
+signal calendar and price panel, and checks that equity curves and trade
+logs are identical:
+
+    BacktestSimulator  ↔  ArrayBacktestSimulator
+    SL_Simulator       ↔  ArraySL_Simulator
+
+and, with ``--multi K``, K calendars run one by one vs. together in a
+``MultiConfigSimulator``.
+
+Usage (from ``src``):
+    python -m simulation.or_array_parity_check --synthetic          # no DB needed
+    python -m simulation.or_array_parity_check --synthetic --multi 8
+    python -m simulation.or_array_parity_check --start 2014-01-01 --end 2024-12-31
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from simulation.or_array_simulator import ArrayBacktestSimulator, ArraySL_Simulator
+from simulation.or_backtest_engine import generate_signal_calendar
+from simulation.or_backtest_simulator import BacktestSimulator
+from simulation.or_market_panel import MarketPanel
+from simulation.or_multi_simulator import MultiConfigSimulator
+from simulation.or_sl_simulator import SL_Simulator
+
+PAIRS = [
+    (BacktestSimulator, ArrayBacktestSimulator),
+    (SL_Simulator, ArraySL_Simulator),
+]
+
+
+def synthetic_case(
+    n_days: int = 500,
+    n_symbols: int = 200,
+    seed: int = 0,
+) -> Tuple[pd.DataFrame, MarketPanel]:
+    """
+    Random-walk prices with gaps (missing days, unknown symbols, weekends in
+    the calendar) and random long / short lists – exercises every branch.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=n_days)
+    symbols = [f"S{i:04d}" for i in range(n_symbols)]
+
+    walk = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, n_symbols)), axis=0))
+    stocks = pd.DataFrame({
+        "date": np.repeat(dates, n_symbols),
+        "symbol": np.tile(symbols, n_days),
+        "close": walk.ravel(),
+    }).sample(frac=0.9, random_state=seed)
+    panel = MarketPanel.from_frames(stocks, price_fields=("close",), ffill=True)
+
+    # persistent signals: each (symbol, side) flag flips with a small daily probability
+    calendar = pd.date_range(dates[0], dates[-1])
+    pool = np.array(symbols + ["UNKNOWN1", "UNKNOWN2"])
+    flips = rng.random((len(calendar), 2, len(pool))) < 0.03
+    state = np.logical_xor.accumulate(flips, axis=0)
+    signals = pd.DataFrame({
+        "date": calendar,
+        "long_symbols": [pool[state[t, 0] & ~state[t, 1]].tolist() for t in range(len(calendar))],
+        "short_symbols": [pool[state[t, 1] & ~state[t, 0]].tolist() for t in range(len(calendar))],
+        "regime_signal": np.repeat(rng.choice([-1, 0, 1], len(calendar) // 20 + 1), 20)[:len(calendar)],
+    })
+    return signals, panel
+
+
+def check_parity(
+    signals: pd.DataFrame,
+    panel: Optional[MarketPanel] = None,
+    max_positions: int = 10,
+) -> bool:
+    """
+    Run every simulator pair and report timing and parity.
+
+    Returns:
+        bool: True if all pairs produced identical equity curves and trades.
+    """
+    all_ok = True
+    for legacy_cls, array_cls in PAIRS:
+        runs = {}
+        for cls in (legacy_cls, array_cls):
+            sim = cls(signals, max_positions=max_positions, prices=panel)
+            panel = sim.prices
+            t0 = time.perf_counter()
+            sim.run()
+            runs[cls.__name__] = (sim, time.perf_counter() - t0)
+
+        (old, t_old), (new, t_new) = runs.values()
+        same_equity = old.results().equals(new.results())
+        same_trades = old.trades.to_frame().equals(new.trades.to_frame())
+        ok = same_equity and same_trades
+        all_ok &= ok
+        print(f"{'✅' if ok else '❌'} {legacy_cls.__name__} vs {array_cls.__name__}: "
+              f"equity {'=' if same_equity else '≠'}, trades {'=' if same_trades else '≠'} "
+              f"({len(old.trades)} records) | {t_old:.2f}s → {t_new:.2f}s")
+    return all_ok
+
+
+def check_multi_parity(
+    calendars: List[pd.DataFrame],
+    panel: Optional[MarketPanel] = None,
+    max_positions: int = 10,
+) -> bool:
+    """
+    Run K calendars through the single-config simulators and through one
+    MultiConfigSimulator; compare every equity curve and trade log.
+    """
+    all_ok = True
+    for single_cls, stop_loss in ((BacktestSimulator, False), (SL_Simulator, True)):
+        t0 = time.perf_counter()
+        multi = MultiConfigSimulator.from_calendars(calendars, max_positions=max_positions,
+                                                    stop_loss=stop_loss, prices=panel)
+        multi.run()
+        t_multi = time.perf_counter() - t0
+        panel = multi.prices
+
+        ok, t_single = True, 0.0
+        for k, (cal, curve, trades) in enumerate(zip(calendars, multi.results(),
+                                                     multi.trade_logs())):
+            t0 = time.perf_counter()
+            sim = single_cls(cal, max_positions=max_positions, prices=panel)
+            sim.run()
+            t_single += time.perf_counter() - t0
+
+            ref = sim.results()
+            same_equity = (np.array_equal(ref["equity"].to_numpy(float), curve["equity"].to_numpy())
+                           and np.array_equal(ref["cash"].to_numpy(float), curve["cash"].to_numpy()))
+            try:
+                pd.testing.assert_frame_equal(sim.trades.to_frame(), trades,
+                                              check_dtype=False, check_exact=True)
+                same_trades = True
+            except AssertionError:
+                same_trades = False
+            ok &= same_equity and same_trades
+        all_ok &= ok
+        print(f"{'✅' if ok else '❌'} {len(calendars)}× {single_cls.__name__} vs MultiConfigSimulator "
+              f"(max_positions={max_positions}) | {t_single:.2f}s → {t_multi:.2f}s")
+    return all_ok
+
+
+def _main():  # pragma: no cover – manual check only
+    ap = argparse.ArgumentParser(description="Parity check: dict vs. array simulators.")
+    ap.add_argument("--synthetic", action="store_true", help="use random data (no DB)")
+    ap.add_argument("--start", default="2014-01-01")
+    ap.add_argument("--end", default="2024-12-31")
+    ap.add_argument("--beta-window", type=int, default=60)
+    ap.add_argument("--max-positions", type=int, nargs="+", default=[1, 10, 50])
+    ap.add_argument("--multi", type=int, default=0, metavar="K",
+                    help="also check K synthetic calendars in one MultiConfigSimulator")
+    args = ap.parse_args()
+
+    if args.synthetic:
+        signals, panel = synthetic_case()
+    else:
+        signals, panel = generate_signal_calendar(args.start, args.end, args.beta_window,
+                                                  1.1, 1.05), None
+
+    ok = all([check_parity(signals, panel, n) for n in args.max_positions])
+    if args.multi:
+        # the multi simulator drops symbols without prices up front – keep them out
+        calendars = [synthetic_case(seed=k)[0] for k in range(args.multi)] if args.synthetic else [
+            generate_signal_calendar(args.start, args.end, args.beta_window, up, 1.05)
+            for up in np.linspace(1.05, 1.5, args.multi)]
+        for cal in calendars:
+            for col in ("long_symbols", "short_symbols"):
+                cal[col] = [[s for s in syms if not s.startswith("UNKNOWN")] for syms in cal[col]]
+        ok &= all([check_multi_parity(calendars, panel, n) for n in args.max_positions])
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    _main()
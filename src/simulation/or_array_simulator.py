@@ -0,0 +1,471 @@
+"""simulation/or_array_simulator.py – array-backed portfolio core
+
+Drop-in alternatives to ``BacktestSimulator`` / ``SL_Simulator`` whose open
+positions live in NumPy arrays indexed by *slot* (one slot per allowed
+position) instead of a dict of dicts:
+
+    sym[slot]          symbol id: panel column (MarketPanel.symbol_index), or an
+                       id past the panel for symbols known only from step()
+    side[slot]         +1 long / -1 short
+    qty, entry_price, peak, stop
+
+The opening order of the open slots is kept as a slot list (dict insertion
+order). Each day the prices of all open slots are read with one fancy-index
+into the forward-filled close panel; mark-to-market, trailing-stop updates,
+stop-hit detection and the day's opens / closes (cash, PnL, trade-ledger
+writes) are whole-array expressions, and days with an empty book skip them.
+
+``or_array_parity_check --synthetic`` (500 days, 200 symbols):
+
+    max_positions     3      10     50     200
+    dict classes     0.04s  0.10s  0.5s   0.9s
+    array classes    0.12s  0.09s  0.14s  0.2s
+
+From about 10 positions on the array classes are as fast or faster; for a
+handful of positions the fixed NumPy call cost per day dominates, so keep the
+dict classes there.
+
+Trades, equity curves and trade logs are identical to the dict-based
+classes (``python -m simulation.or_array_parity_check`` verifies this):
+equity is summed sequentially in opening order (a loop, or ``np.add.accumulate``
+for larger books), so even the floating-point rounding matches.
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from simulation.or_backtest_simulator import BacktestSimulator
+from simulation.or_trade_ledger import TradeLedger
+
+
+class ArrayPortfolio:
+    """
+    Fixed-capacity open-position book kept as parallel arrays.
+
+    Args:
+        capacity (int): Number of slots (= max simultaneous positions).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(int(capacity), 0)
+        n = self.capacity
+        self.active = np.zeros(n, dtype=bool)
+        self.sym = np.full(n, -1, dtype=np.int64)
+        self.side = np.zeros(n, dtype=np.int8)
+        self.qty = np.zeros(n)
+        self.entry_price = np.zeros(n)
+        self.peak = np.zeros(n)
+        self.stop = np.full(n, np.nan)
+        self.entry_date = np.empty(n, dtype="datetime64[ns]")
+        self.slot_of: Dict[int, int] = {}  # panel column → slot
+        self._free: List[int] = list(range(n - 1, -1, -1))
+        self._order: List[int] = []        # open slots in opening order
+        self._ordered: Optional[np.ndarray] = None  # cached np.array(_order)
+
+    def __len__(self) -> int:
+        return len(self.slot_of)
+
+    def ordered_slots(self) -> np.ndarray:
+        """Active slots in opening order."""
+        if self._ordered is None:
+            self._ordered = np.array(self._order, dtype=np.int64)
+        return self._ordered
+
+    def held(self) -> np.ndarray:
+        """Panel columns of the open positions (opening order)."""
+        return self.sym[self.ordered_slots()]
+
+    def open(self, sym: int, side: int, qty: float, price: float, date,
+             stop: float = np.nan) -> int:
+        """
+        Fill a free slot (or overwrite the symbol's slot, keeping its opening
+        order – like re-assigning an existing dict key).
+        """
+        slot = self.slot_of.get(sym)
+        if slot is None:
+            slot = self._free.pop()
+            self.slot_of[sym] = slot
+            self._order.append(slot)
+            self._ordered = None
+        self.active[slot] = True
+        self.sym[slot] = sym
+        self.side[slot] = side
+        self.qty[slot] = qty
+        self.entry_price[slot] = price
+        self.peak[slot] = price
+        self.stop[slot] = stop
+        self.entry_date[slot] = date
+        return slot
+
+    def open_many(self, syms: np.ndarray, sides: np.ndarray, qty: np.ndarray,
+                  prices: np.ndarray, date, stops: np.ndarray) -> None:
+        """``open()`` for several positions, in order; one array write when none is held yet."""
+        sym_list = syms.tolist()
+        fresh = set(sym_list)
+        if len(fresh) < len(sym_list) or not fresh.isdisjoint(self.slot_of):
+            for args in zip(sym_list, sides.tolist(), qty.tolist(), prices.tolist(), stops.tolist()):
+                self.open(*args[:4], date, args[4])
+            return
+        slots = [self._free.pop() for _ in sym_list]
+        self.slot_of.update(zip(sym_list, slots))
+        self._order.extend(slots)
+        self._ordered = None
+        s = np.array(slots, dtype=np.int64)
+        self.active[s] = True
+        self.sym[s] = syms
+        self.side[s] = sides
+        self.qty[s] = qty
+        self.entry_price[s] = prices
+        self.peak[s] = prices
+        self.stop[s] = stops
+        self.entry_date[s] = date
+
+    def close(self, slot: int) -> None:
+        self.close_many(np.array([slot], dtype=np.int64))
+
+    def close_many(self, slots: np.ndarray) -> None:
+        if not len(slots):
+            return
+        gone = slots.tolist()
+        for sym in self.sym[slots].tolist():
+            del self.slot_of[sym]
+        self.active[slots] = False
+        self.sym[slots] = -1
+        self._free.extend(gone)
+        gone = set(gone)
+        self._order = [s for s in self._order if s not in gone]
+        self._ordered = None
+
+
+def _side_name(side: int) -> str:
+    return "long" if side == 1 else "short"
+
+
+def _running_sum(start: float, values: np.ndarray) -> float:
+    """start + values[0] + values[1] + … added left to right (same rounding as a loop)."""
+    if len(values) < 32:  # a Python loop beats the NumPy call overhead for short books
+        for v in values.tolist():
+            start += v
+        return float(start)
+    return float(np.add.accumulate(np.concatenate(([start], values)))[-1])
+
+
+class ArrayBacktestSimulator(BacktestSimulator):
+    """
+    BacktestSimulator with an ArrayPortfolio instead of the positions dict.
+
+    Same constructor, ``run()`` / ``results()``, streaming API and trade records.
+    """
+
+    def reset(self):
+        """Clear all state before fresh run."""
+        self.cash = self.initial_cash
+        self.book = ArrayPortfolio(self.max_positions)
+        self.history = []
+        self.trades = TradeLedger()
+        self._extra: List[str] = []               # symbols outside the panel (ids N, N+1, …)
+        self._live_prices: Dict[str, tuple] = {}  # symbol → (date, close) fed via step()
+        self._live_px = np.zeros(0)               # the same, by symbol id
+        self._live_date = np.zeros(0, dtype="datetime64[ns]")
+        self._day = (None, None, None, None)  # (date, panel row, close row, date as datetime64[ns])
+        self._flag = None               # scratch membership mask over symbol ids
+
+    # ------------------------------------------------------------------ #
+    # symbol ids: panel columns, then symbols known only from step() / restore()
+    # ------------------------------------------------------------------ #
+    def _symbol_col(self, symbol: str, register: bool = False) -> int:
+        """Id of *symbol* (-1 if unknown and not *register*)."""
+        col = self.prices.symbol_index.get(symbol)
+        if col is not None:
+            return col
+        if symbol in self._extra:
+            return len(self.prices.symbols) + self._extra.index(symbol)
+        if not register:
+            return -1
+        self._extra.append(symbol)
+        return self._n_ids() - 1
+
+    def _symbol_name(self, col: int) -> str:
+        n = len(self.prices.symbols)
+        return self.prices.symbols[col] if col < n else self._extra[col - n]
+
+    def _symbol_names(self, cols: np.ndarray) -> List[str]:
+        if not self._extra:
+            return self.prices.symbols[cols].tolist()
+        return [self._symbol_name(c) for c in cols.tolist()]
+
+    def _n_ids(self) -> int:
+        return len(self.prices.symbols) + len(self._extra)
+
+    @property
+    def positions(self) -> Dict[str, Dict]:
+        """Dict view of the open positions (BacktestSimulator layout) – inspection only."""
+        book = self.book
+        return {
+            self._symbol_name(int(book.sym[s])): dict(
+                entry_price=float(book.entry_price[s]), entry_date=pd.Timestamp(book.entry_date[s]),
+                size=float(book.qty[s]), type=_side_name(book.side[s]),
+                **({} if np.isnan(book.stop[s]) else
+                   dict(stop_loss=float(book.stop[s]), peak_price=float(book.peak[s]))))
+            for s in book.ordered_slots()
+        }
+
+    def _load_positions(self, positions: Dict[str, Dict]) -> None:
+        """Rebuild the book from restored positions (dict order = opening order)."""
+        self.book = book = ArrayPortfolio(self.max_positions)
+        for symbol, pos in positions.items():
+            slot = book.open(self._symbol_col(symbol, register=True),
+                             1 if pos["type"] == "long" else -1, pos["size"],
+                             pos["entry_price"], pos["entry_date"],
+                             pos.get("stop_loss", np.nan))
+            book.peak[slot] = pos.get("peak_price", pos["entry_price"])
+
+    def _set_live_price(self, symbol: str, date, price: float) -> None:
+        super()._set_live_price(symbol, date, price)
+        col = self._symbol_col(symbol, register=True)
+        if col >= len(self._live_px):
+            n = self._n_ids()
+            self._live_px = np.concatenate((self._live_px, np.full(n - len(self._live_px), np.nan)))
+            self._live_date = np.concatenate(
+                (self._live_date, np.full(n - len(self._live_date), np.datetime64("NaT"), "datetime64[ns]")))
+        self._live_px[col] = price
+        self._live_date[col] = np.datetime64(pd.Timestamp(date), "ns")
+
+    def run(self,
+            after=None,
+            every: int = 0,
+            on_checkpoint: Optional[Callable[["BacktestSimulator"], None]] = None):
+        """
+        Run full simulation over signal calendar (arguments as BacktestSimulator.run).
+        """
+        sig = self.signals
+        code_cols = self._symbol_cols(sig.symbols)
+        start = 0 if after is None else sig.position_after(after)
+        for n, t in enumerate(range(start, len(sig.dates)), 1):
+            # symbol ids only – the *_symbols lists are what _signal_cols would rebuild them from
+            row = {"regime_signal": 0 if sig.regime is None else sig.regime[t],
+                   "long_cols": code_cols[sig.indices(t, "long")],
+                   "short_cols": code_cols[sig.indices(t, "short")]}
+            self._process_day(sig.dates[t], row)
+            if every and on_checkpoint is not None and n % every == 0:
+                on_checkpoint(self)
+
+    # ------------------------------------------------------------------ #
+    # array helpers
+    # ------------------------------------------------------------------ #
+    def _symbol_cols(self, symbols) -> np.ndarray:
+        """Symbol ids of a signal list (-1 for symbols without prices)."""
+        return np.fromiter((self._symbol_col(s) for s in symbols), dtype=np.int64,
+                           count=len(symbols))
+
+    def _signal_cols(self, signal_row, side: str) -> np.ndarray:
+        cols = signal_row.get(f"{side}_cols")
+        return self._symbol_cols(signal_row[f"{side}_symbols"]) if cols is None else cols
+
+    def _member(self, cols: np.ndarray, of: np.ndarray) -> np.ndarray:
+        """Boolean "cols[i] in of" via a scratch mask over the symbol ids."""
+        if not len(cols) or not len(of):
+            return np.zeros(len(cols), dtype=bool)
+        if self._flag is None or len(self._flag) <= self._n_ids():
+            self._flag = np.zeros(self._n_ids() + 1, dtype=bool)  # [-1] ↔ unknown
+        flag = self._flag
+        flag[of] = True
+        out = flag[cols]
+        flag[of] = False
+        flag[-1] = False
+        return out
+
+    def _price_day(self, date):
+        """(panel row, close row, date as datetime64[ns]) for *date* – computed once per day."""
+        if self._day[0] is not date and self._day[0] != date:
+            t = self.prices.asof_pos(date)
+            self._day = (date, t, None if t is None else self._close[t],
+                         np.datetime64(pd.Timestamp(date), "ns"))
+        return self._day[1:]
+
+    def _slot_prices(self, date, cols: np.ndarray) -> np.ndarray:
+        """Close on/before *date* per symbol id (step() prices included); NaN where unavailable."""
+        t, row, day = self._price_day(date)
+        if row is not None and not self._extra and not self._live_prices \
+                and (not len(cols) or cols.min() >= 0):
+            return row[cols]  # every id is a panel column
+        in_panel = (cols >= 0) & (cols < len(self.prices.symbols))
+        px = (np.full(len(cols), np.nan) if row is None
+              else np.where(in_panel, row[np.where(in_panel, cols, 0)], np.nan))
+        if not self._live_prices:
+            return px
+
+        # prices fed through step() win when they are at least as recent (as _get_price)
+        has = (cols >= 0) & (cols < len(self._live_px))
+        at = np.where(has, cols, 0)
+        live_date = np.where(has, self._live_date[at], np.datetime64("NaT"))
+        use = live_date <= day
+        if t is not None:
+            use &= np.isnan(px) | (live_date >= np.datetime64(self.prices.dates[t], "ns"))
+        return np.where(use, self._live_px[at], px)
+
+    def _initial_stop(self, prices: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        return np.full(len(prices), np.nan)
+
+    def _on_open(self, date, cols: np.ndarray, sides: np.ndarray,
+                 prices: np.ndarray, qty: np.ndarray) -> None:
+        """Hook for subclasses that log opening trades (one call per day, in opening order)."""
+
+    # ------------------------------------------------------------------ #
+    # daily steps
+    # ------------------------------------------------------------------ #
+    def _close_invalid_positions(self, date, signal_row):
+        """
+        Close positions that lost their signal or whose side the regime opposes.
+        """
+        book = self.book
+        slots = book.ordered_slots()
+        if not len(slots):
+            return
+
+        regime = signal_row.get("regime_signal", 0)
+        held, side = book.sym[slots], book.side[slots]
+        in_long = self._member(held, self._signal_cols(signal_row, "long"))
+        in_short = self._member(held, self._signal_cols(signal_row, "short"))
+        keep = np.where(side == 1, in_long & (regime in {1, 2, 0}),
+                        in_short & (regime in {-1, -2, 0}))
+        slots = slots[~keep]
+        if not len(slots):
+            return
+        prices = self._slot_prices(date, book.sym[slots])
+        priced = ~np.isnan(prices)
+        slots, exit_price = slots[priced], prices[priced]
+        if not len(slots):
+            return
+
+        qty, entry, side = book.qty[slots], book.entry_price[slots], book.side[slots]
+        pnl = np.where(side == 1, (exit_price - entry) * qty, (entry - exit_price) * qty)
+        self.cash = _running_sum(self.cash, qty * exit_price + pnl)
+
+        self.trades.extend({
+            "symbol": self._symbol_names(book.sym[slots]),
+            "side": side,
+            "entry_date": book.entry_date[slots],
+            "entry_price": entry,
+            "qty": qty,
+            "exit_date": self._price_day(date)[2],
+            "exit_price": exit_price,
+            "pnl": pnl,
+            "sl_hit": False,
+        })
+        book.close_many(slots)
+
+    def _open_new_positions(self, date, signal_row):
+        """
+        Open new positions for today's signals (if room exists).
+        """
+        book = self.book
+        available_slots = self.max_positions - len(book)
+        if available_slots <= 0:
+            return
+
+        held = book.held()
+        longs = self._signal_cols(signal_row, "long")
+        shorts = self._signal_cols(signal_row, "short")
+        longs = longs[~self._member(longs, held)][:available_slots]
+        shorts = shorts[~self._member(shorts, held)][:available_slots - len(longs)]
+        cols = np.concatenate((longs, shorts))
+        sides = np.concatenate((np.ones(len(longs), np.int8), -np.ones(len(shorts), np.int8)))
+        prices = self._slot_prices(date, cols)
+        ok = prices > 0  # False for NaN
+        cols, sides, prices = cols[ok], sides[ok], prices[ok]
+        if not len(cols):
+            return
+
+        qty = self.fixed_size / prices
+        book.open_many(cols, sides, qty, prices, self._price_day(date)[2],
+                       self._initial_stop(prices, sides))
+        self.cash = _running_sum(self.cash, -(qty * prices))
+        self._on_open(date, cols, sides, prices, qty)
+
+    def _mark_to_market(self, date, slots: np.ndarray, prices: np.ndarray) -> float:
+        """cash + position values, summed sequentially in opening order."""
+        book = self.book
+        valid = ~np.isnan(prices)
+        px, s = prices[valid], slots[valid]
+        values = np.where(book.side[s] == 1, px * book.qty[s],
+                          (2 * book.entry_price[s] - px) * book.qty[s])
+        return _running_sum(self.cash, values)
+
+    def _record_daily_state(self, date):
+        """
+        Store daily snapshot of portfolio state.
+        """
+        slots = self.book.ordered_slots()
+        equity = (self._mark_to_market(date, slots, self._slot_prices(date, self.book.sym[slots]))
+                  if len(slots) else self.cash)
+        self.history.append({
+            "date": date,
+            "cash": self.cash,
+            "positions": len(self.book),
+            "equity": equity
+        })
+
+
+class ArraySL_Simulator(ArrayBacktestSimulator):
+    """
+    SL_Simulator (hard stop + trailing stop) on the array portfolio core.
+    """
+    HARD_SL_PCT = 0.03
+    TSL_FACTOR = 0.8
+
+    def reset(self):
+        super().reset()
+        self._open_trade: Dict[str, int] = {}  # symbol → index of latest open record
+
+    def _initial_stop(self, prices: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        return prices * np.where(sides == 1, 1 - self.HARD_SL_PCT, 1 + self.HARD_SL_PCT)
+
+    def _on_open(self, date, cols, sides, prices, qty) -> None:
+        symbols = self._symbol_names(cols)
+        rows = self.trades.extend(dict(
+            symbol=symbols, side=sides, entry_date=date,
+            entry_price=prices, qty=qty
+        ))
+        self._open_trade.update(zip(symbols, rows.tolist()))
+
+    def _record_daily_state(self, date):
+        book = self.book
+        slots = book.ordered_slots()
+        if not len(slots):  # nothing to mark or stop out
+            self.history.append(dict(date=date, cash=self.cash, positions=0, equity=self.cash))
+            return
+        prices = self._slot_prices(date, book.sym[slots])
+        valid = ~np.isnan(prices)
+
+        # trailing-stop update and stop-hit detection for every slot at once; with
+        # sgn = ±1 the short rules are the long ones mirrored (x * ±1 is exact)
+        s, px = slots[valid], prices[valid]
+        sgn = book.side[s].astype(np.float64)
+        peak, stop = book.peak[s], book.stop[s]
+        up = sgn * (px - peak) > 0
+        trail = px - (px - peak) * self.TSL_FACTOR
+        stop = np.where(up, sgn * np.maximum(sgn * stop, sgn * trail), stop)
+        book.peak[s] = np.where(up, px, peak)
+        book.stop[s] = stop
+        hit = sgn * px <= sgn * stop
+
+        equity = self._mark_to_market(date, slots, prices)
+
+        s, px = s[hit], px[hit]
+        if len(s):
+            qty, en, long = book.qty[s], book.entry_price[s], sgn[hit] > 0
+            pnl = np.where(long, (px - en) * qty, (en - px) * qty)
+            self.cash = _running_sum(self.cash, np.where(long, px * qty, qty * (2 * en - px)))
+            rows = [self._open_trade.pop(sym) for sym in self._symbol_names(book.sym[s])]
+            self.trades.update_rows(rows, exit_date=self._price_day(date)[2], exit_price=px,
+                                    pnl=pnl, sl_hit=True)
+            book.close_many(s)
+
+        self.history.append(dict(date=date, cash=self.cash, positions=len(book), equity=equity))
+
+
+__all__: List[str] = ["ArrayPortfolio", "ArrayBacktestSimulator", "ArraySL_Simulator"]
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+from itertools import product
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
 import pandas as pd
 
 from simulation.data_loaders import load_sp500, load_betas
+from simulation.or_signal_calendar import SIDES, SignalCalendar
 
 
 def generate_signal_calendar(
@@ -30,9 +35,20 @@ def generate_signal_calendar(
             - short_symbols: List[str]
     """
 
-    # Load data once
+    # Extract beta columns dynamically
+    beta_up_col = f"beta_up_{beta_window}"
+    beta_down_col = f"beta_down_{beta_window}"
+
+    # Load data once – only the span and beta window we need
     sp500 = load_sp500()
-    betas = load_betas()
+    try:
+        betas = load_betas(
+            start=start_date,
+            end=end_date,
+            columns=["date", "symbol", beta_up_col, beta_down_col],
+        )
+    except KeyError:
+        raise ValueError(f"Missing beta columns for window {beta_window}")
 
     sp500["date"] = pd.to_datetime(sp500["date"])
     betas["date"] = pd.to_datetime(betas["date"])
@@ -54,10 +70,6 @@ def generate_signal_calendar(
     merged.loc[merged["score"] >= 1, "regime_signal"] = 1
     merged.loc[merged["score"] <= -1, "regime_signal"] = -1
 
-    # Extract beta columns dynamically
-    beta_up_col = f"beta_up_{beta_window}"
-    beta_down_col = f"beta_down_{beta_window}"
-
     if beta_up_col not in merged.columns or beta_down_col not in merged.columns:
         raise ValueError(f"Missing beta columns for window {beta_window}")
 
@@ -95,4 +107,268 @@ def generate_signal_calendar(
             "short_symbols": short_syms
         })
 
-    return pd.DataFrame(output_rows)
\ No newline at end of file
+    return pd.DataFrame(output_rows)
+
+class SignalCube:
+    """
+    Signal calendars of many (window, up, down) thresholds from one merge.
+
+    Built by ``generate_signal_cube``. Rows are the merged (date, symbol)
+    pairs of ``generate_signal_calendar``, grouped by date. For every window
+    and side, each day's rows are also kept sorted by beta, largest first.
+    The stocks with ``beta ≥ th`` are then a prefix of that day's order, so
+    one binary search per day finds them. Any threshold can be extracted,
+    not only the ones on the grid, in O(days · log symbols + signals).
+
+    Memory is about 12 bytes per merged row per (window, side). Build one
+    cube per window when the beta table is large.
+
+    Attributes:
+        dates (pd.DatetimeIndex): Signal days (SP500 score and beta rows present).
+        regime (np.ndarray): Per-day regime, +1 / -1 / 0.
+        windows (Tuple[int, ...]): Windows held by the cube.
+        up_thresholds / down_thresholds (Tuple[float, ...]): Grid of ``configs()``.
+    """
+
+    def __init__(
+        self,
+        dates: pd.DatetimeIndex,
+        regime: np.ndarray,
+        offsets: np.ndarray,
+        symbols: np.ndarray,
+        ranks: Dict[Tuple[int, str], Tuple[np.ndarray, np.ndarray]],
+        up_thresholds: Sequence[float] = (),
+        down_thresholds: Sequence[float] = (),
+    ):
+        self.dates = dates
+        self.regime = regime
+        self.symbols = symbols
+        self.windows = tuple(sorted({w for w, _ in ranks}))
+        self.up_thresholds = tuple(up_thresholds)
+        self.down_thresholds = tuple(down_thresholds)
+        self._offsets = offsets
+        self._ranks = ranks
+        self._universe: Tuple[np.ndarray, np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def from_frames(
+        cls,
+        sp500: pd.DataFrame,
+        betas: pd.DataFrame,
+        start_date: str,
+        end_date: str,
+        beta_windows: Iterable[int],
+        beta_up_thresholds: Sequence[float] = (),
+        beta_down_thresholds: Sequence[float] = (),
+    ) -> "SignalCube":
+        """Build from loaded ``sp500_index`` / ``beta_calculation`` frames (see ``generate_signal_cube``)."""
+        windows = sorted(set(beta_windows))
+        columns = [f"beta_{side}_{w}" for w in windows for side in ("up", "down")]
+        missing = [c for c in columns if c not in betas.columns]
+        if missing:
+            raise ValueError(f"Missing beta columns {missing}")
+
+        sp500 = sp500.assign(date=pd.to_datetime(sp500["date"]))
+        betas = betas.assign(date=pd.to_datetime(betas["date"]))
+        sp500 = sp500[(sp500["date"] >= start_date) & (sp500["date"] <= end_date)]
+        sp500 = sp500.dropna(subset=["score"])
+        merged = pd.merge(sp500[["date", "score"]], betas[["date", "symbol", *columns]],
+                          on="date", how="inner")
+
+        # rows grouped by date, original order inside a day (as groupby does)
+        row_dates = merged["date"].to_numpy(dtype="datetime64[ns]")
+        by_date = np.argsort(row_dates, kind="stable")
+        row_dates = row_dates[by_date]
+        day_values, starts = np.unique(row_dates, return_index=True)
+        offsets = np.append(starts, len(row_dates)).astype(np.int64)
+        day_of_row = np.repeat(np.arange(len(day_values)), np.diff(offsets))
+
+        score = merged["score"].to_numpy(dtype=np.float64)[by_date][starts]
+        symbols = merged["symbol"].to_numpy(dtype=object)[by_date]
+        values = {c: merged[c].to_numpy(dtype=np.float64, na_value=np.nan)[by_date] for c in columns}
+        return cls._from_rows(pd.DatetimeIndex(day_values), score, offsets, day_of_row, symbols,
+                              values, windows, beta_up_thresholds, beta_down_thresholds)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        dates: pd.DatetimeIndex,
+        scores: np.ndarray,
+        symbols: np.ndarray,
+        betas: Dict[str, np.ndarray],
+        beta_up_thresholds: Sequence[float] = (),
+        beta_down_thresholds: Sequence[float] = (),
+    ) -> "SignalCube":
+        """
+        Build from date × symbol beta matrices – e.g. the shared panel's
+        (``SharedMarketData.signal_cube``). *dates* are the signal days, *scores*
+        their SP500 score, *betas* maps ``beta_{up|down}_{w}`` to one matrix per
+        column; rows are the cells with at least one beta. Symbols should be
+        sorted, like the (date, symbol) order of ``load_betas``.
+        """
+        windows = sorted({int(c.rsplit("_", 1)[1]) for c in betas})
+        present = np.zeros((len(dates), len(symbols)), dtype=bool)
+        for arr in betas.values():
+            present |= ~np.isnan(arr)
+        day_of_row, col = np.nonzero(present)           # row-major: grouped by day
+        offsets = np.searchsorted(day_of_row, np.arange(len(dates) + 1)).astype(np.int64)
+        values = {c: np.asarray(arr, dtype=np.float64)[day_of_row, col] for c, arr in betas.items()}
+        return cls._from_rows(pd.DatetimeIndex(dates), np.asarray(scores, dtype=np.float64),
+                              offsets, day_of_row, np.asarray(symbols, dtype=object)[col],
+                              values, windows, beta_up_thresholds, beta_down_thresholds)
+
+    @classmethod
+    def _from_rows(cls, dates, score, offsets, day_of_row, symbols, values, windows,
+                   beta_up_thresholds, beta_down_thresholds) -> "SignalCube":
+        """Rank the day-grouped rows per (window, side) – shared by the builders."""
+        regime = np.where(score >= 1, 1, np.where(score <= -1, -1, 0)).astype(np.int8)
+        ranks = {}
+        for w in windows:
+            for side in ("up", "down"):
+                keys = -values[f"beta_{side}_{w}"]
+                keys[np.isnan(keys)] = np.inf          # NaN never passes a threshold
+                order = np.lexsort((keys, day_of_row))
+                ranks[(w, side)] = (order.astype(np.int32 if len(order) < 2**31 else np.int64),
+                                    keys[order])
+
+        return cls(dates, regime, offsets, symbols, ranks,
+                   beta_up_thresholds, beta_down_thresholds)
+
+    def configs(self) -> Iterator[Tuple[int, float, float]]:
+        """(window, up, down) combinations of the thresholds given at build time."""
+        return product(self.windows, self.up_thresholds, self.down_thresholds)
+
+    def _rank(self, window: int, side: str) -> Tuple[np.ndarray, np.ndarray]:
+        try:
+            return self._ranks[(window, side)]
+        except KeyError:
+            raise ValueError(f"Window {window} not in cube (have {self.windows})") from None
+
+    def _prefixes(self, window: int, side: str, threshold: float,
+                  days: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(order, start, n) – rows order[start[i]:start[i]+n[i]] have ``beta ≥ threshold`` on days[i]."""
+        order, keys = self._rank(window, side)
+        bound = -float(threshold)
+        lo, hi = self._offsets[days], self._offsets[days + 1]
+        n = np.fromiter((np.searchsorted(keys[a:b], bound, side="right") for a, b in zip(lo, hi)),
+                        dtype=np.int64, count=len(days))
+        return order, lo, n
+
+    def signal_lists(
+        self,
+        window: int,
+        beta_up_threshold: float,
+        beta_down_threshold: float,
+    ) -> Tuple[List[List[str]], List[List[str]]]:
+        """Per-day long / short symbol lists of one config."""
+        long_lists: List[List[str]] = [[] for _ in range(len(self))]
+        short_lists: List[List[str]] = [[] for _ in range(len(self))]
+        for side, regime, th, lists in (("up", 1, beta_up_threshold, long_lists),
+                                        ("down", -1, beta_down_threshold, short_lists)):
+            days = np.flatnonzero(self.regime == regime)
+            order, lo, n = self._prefixes(window, side, th, days)
+            for t, a, k in zip(days, lo, n):
+                if k:
+                    lists[t] = self.symbols[np.sort(order[a:a + k])].tolist()
+        return long_lists, short_lists
+
+    def counts(
+        self,
+        window: int,
+        beta_up_threshold: float,
+        beta_down_threshold: float,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-day number of long / short signals (no lists built)."""
+        out = []
+        for side, regime, th in (("up", 1, beta_up_threshold), ("down", -1, beta_down_threshold)):
+            n = np.zeros(len(self), dtype=np.int64)
+            days = np.flatnonzero(self.regime == regime)
+            n[days] = self._prefixes(window, side, th, days)[2]
+            out.append(n)
+        return out[0], out[1]
+
+    def calendar(
+        self,
+        window: int,
+        beta_up_threshold: float,
+        beta_down_threshold: float,
+    ) -> pd.DataFrame:
+        """Same frame as ``generate_signal_calendar`` for this config and the cube's span."""
+        if len(self) == 0:
+            return pd.DataFrame()
+        long_lists, short_lists = self.signal_lists(window, beta_up_threshold, beta_down_threshold)
+        return pd.DataFrame({"date": self.dates, "long_symbols": long_lists,
+                             "short_symbols": short_lists})
+
+    def signal_calendar(
+        self,
+        window: int,
+        beta_up_threshold: float,
+        beta_down_threshold: float,
+    ) -> SignalCalendar:
+        """
+        The config as a ``SignalCalendar`` (CSR over the cube's sorted symbols) –
+        no per-day lists are built; ``.to_frame()`` equals ``calendar()``.
+        """
+        if self._universe is None:
+            codes, found = pd.factorize(self.symbols)
+            order = np.argsort(np.asarray(found, dtype=str), kind="stable")
+            rank = np.empty(len(order), dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+            self._universe = (np.asarray(found, dtype=object)[order], rank[codes])
+        universe, row_codes = self._universe
+
+        csr = []
+        for side, (beta, regime, th) in zip(SIDES, (("up", 1, beta_up_threshold),
+                                                    ("down", -1, beta_down_threshold))):
+            days = np.flatnonzero(self.regime == regime)
+            order, lo, n = self._prefixes(window, beta, th, days)
+            ptr = np.zeros(len(self) + 1, dtype=np.int64)
+            ptr[days + 1] = n
+            np.cumsum(ptr, out=ptr)
+            rows = [np.sort(order[a:a + k]) for a, k in zip(lo, n) if k]
+            csr += [ptr, row_codes[np.concatenate(rows)] if rows else np.zeros(0, np.int32)]
+        return SignalCalendar(self.dates, universe, *csr)
+
+    def __repr__(self) -> str:
+        return (f"SignalCube({len(self)} days × {len(self.symbols)} rows, "
+                f"windows={list(self.windows)})")
+
+
+def generate_signal_cube(
+    start_date: str,
+    end_date: str,
+    beta_windows: Iterable[int],
+    beta_up_thresholds: Sequence[float] = (),
+    beta_down_thresholds: Sequence[float] = (),
+) -> SignalCube:
+    """
+    One load and merge for a whole threshold sweep.
+
+    ``cube.calendar(w, up, down)`` equals
+    ``generate_signal_calendar(start_date, end_date, w, up, down)``.
+
+    Args:
+        start_date (str): Backtest start date (YYYY-MM-DD).
+        end_date (str): Backtest end date (YYYY-MM-DD).
+        beta_windows (Iterable[int]): Rolling beta windows to include.
+        beta_up_thresholds (Sequence[float]): Long thresholds of the sweep (for ``configs()``).
+        beta_down_thresholds (Sequence[float]): Short thresholds of the sweep (for ``configs()``).
+
+    Returns:
+        SignalCube: Extract calendars with ``calendar()`` / ``signal_lists()``.
+
+    Raises:
+        ValueError: If a window's beta columns are missing.
+    """
+    windows = sorted(set(beta_windows))
+    columns = [f"beta_{side}_{w}" for w in windows for side in ("up", "down")]
+    try:
+        betas = load_betas(start=start_date, end=end_date, columns=["date", "symbol", *columns])
+    except KeyError:
+        raise ValueError(f"Missing beta columns for windows {windows}")
+    return SignalCube.from_frames(load_sp500(), betas, start_date, end_date, windows,
+                                  beta_up_thresholds, beta_down_thresholds)
@@ -1,8 +1,40 @@
 from __future__ import annotations
 
+import gzip
+import json
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Mapping, Optional, Sequence
 from simulation.data_loaders import load_stocks
+from simulation.or_data_context import get_data_context
+from simulation.or_market_panel import MarketPanel
+from simulation.or_signal_calendar import SignalCalendar, as_signal_calendar
+from simulation.or_trade_ledger import TradeLedger
+
+
+def load_close_panel() -> MarketPanel:
+    """
+    Full close history as a forward-filled date × symbol panel.
+
+    Built once per DataContext and shared by every simulator instance
+    (the optimizers construct thousands of them).
+    """
+    ctx = get_data_context()
+    return ctx.derived("close_panel", lambda: MarketPanel.from_frames(
+        load_stocks(columns=["date", "symbol", "close"], check_db=ctx.check_db),
+        price_fields=("close",), ffill=True))
+
+
+SNAPSHOT_VERSION = 1
+
+
+def _empty_close_panel() -> MarketPanel:
+    """Panel without history – streaming runs that get prices from step() only."""
+    return MarketPanel.from_frames(
+        pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"),
+                      "symbol": pd.Series(dtype=object),
+                      "close": pd.Series(dtype=float)}),
+        price_fields=("close",), ffill=True)
 
 
 class BacktestSimulator:
@@ -11,20 +43,25 @@ class BacktestSimulator:
     """
 
     def __init__(self,
-                 signal_calendar: pd.DataFrame,
+                 signal_calendar: pd.DataFrame | SignalCalendar,
                  initial_cash: float = 1_000_000,
                  max_positions: int = 10,
-                 fixed_size: float = 10_000):
+                 fixed_size: float = 10_000,
+                 prices: Optional[MarketPanel] = None):
         """
         Initialize simulator.
 
         Args:
-            signal_calendar (pd.DataFrame): Signal DataFrame produced by generate_signal_calendar().
+            signal_calendar (pd.DataFrame | SignalCalendar): Signals produced by
+                generate_signal_calendar(); list-column frames are converted to a
+                SignalCalendar (``self.signals``, ``.to_frame()`` gives the frame back).
             initial_cash (float): Starting cash balance.
             max_positions (int): Max open positions allowed simultaneously.
             fixed_size (float): Fixed amount to allocate per position.
+            prices (Optional[MarketPanel]): Close panel with forward-filled "close"
+                (default: the shared full-history panel, built once per process).
         """
-        self.signals = signal_calendar.sort_values("date").reset_index(drop=True)
+        self.signals = as_signal_calendar(signal_calendar)
         self.initial_cash = initial_cash
         self.max_positions = max_positions
         self.fixed_size = fixed_size
@@ -32,47 +69,194 @@ class BacktestSimulator:
         self.reset()
 
         # Load stock prices once
-        self.stock_prices = self._load_stock_prices()
+        self.prices = prices if prices is not None else self._load_stock_prices()
+        if "close" not in self.prices.ffilled:
+            raise ValueError("Price panel must forward-fill 'close'")
+        self._close = self.prices.fields["close"]
+        self._price_row = (None, None)  # (date, panel row) of the last lookup
 
     def reset(self):
         """Clear all state before fresh run."""
         self.cash = self.initial_cash
         self.positions: Dict[str, Dict] = {}  # symbol → {entry_price, size}
         self.history = []
-        self.trades = [] 
+        self.trades = TradeLedger()
+        self._live_prices: Dict[str, tuple] = {}  # symbol → (date, close) fed via step()
 
-    def _load_stock_prices(self) -> pd.DataFrame:
+    def _load_stock_prices(self) -> MarketPanel:
         """
         Load full stock price history from DB for price access.
         """
-        prices = load_stocks()
-        prices = prices[["date", "symbol", "close"]]
-        prices["date"] = pd.to_datetime(prices["date"])
-        return prices.set_index(["date", "symbol"])["close"]
+        return load_close_panel()
 
-    def run(self):
+    def run(self,
+            after=None,
+            every: int = 0,
+            on_checkpoint: Optional[Callable[["BacktestSimulator"], None]] = None):
         """
         Run full simulation over signal calendar.
+
+        Args:
+            after: Resume point – calendar days up to and including it are skipped
+                (e.g. the last date of a restored snapshot).
+            every (int): Call ``on_checkpoint(self)`` after every *every* processed
+                days (0 = never).
+            on_checkpoint (Optional[Callable]): Periodic checkpoint callback.
         """
-        for _, row in self.signals.iterrows():
-            current_date = pd.to_datetime(row["date"])
+        start = 0 if after is None else self.signals.position_after(after)
+        for n, (date, row) in enumerate(self.signals.days(start), 1):
+            self._process_day(date, row)
+            if every and on_checkpoint is not None and n % every == 0:
+                on_checkpoint(self)
 
-            # Sell positions if signal no longer valid
-            self._close_invalid_positions(current_date, row)
+    def _process_day(self, current_date, row):
+        # Sell positions if signal no longer valid
+        self._close_invalid_positions(current_date, row)
 
-            # Open new positions if room available
-            self._open_new_positions(current_date, row)
+        # Open new positions if room available
+        self._open_new_positions(current_date, row)
 
-            # Record account state
-            self._record_daily_state(current_date)
+        # Record account state
+        self._record_daily_state(current_date)
 
     def _get_price(self, date, symbol):
-        while date >= self.stock_prices.index.get_level_values(0).min():
-            try:
-                return self.stock_prices.loc[(date, symbol)]
-            except KeyError:
-                date -= pd.Timedelta(days=1)  # fallback ליום קודם
-        return None
+        """Last available close on or before *date* (None if there is none)."""
+        cached_date, t = self._price_row
+        if cached_date != date:
+            t = self.prices.asof_pos(date)  # fallback ליום קודם – via forward-fill
+            self._price_row = (date, t)
+        j = self.prices.symbol_index.get(symbol)
+        price = None if j is None or t is None else self._close[t, j]
+        if price is not None and np.isnan(price):
+            price = None
+
+        # prices fed through step() win when they are at least as recent
+        if self._live_prices and (live := self._live_prices.get(symbol)) is not None:
+            if live[0] <= date and (price is None or live[0] >= self.prices.dates[t]):
+                return live[1]
+        return None if price is None else float(price)
+
+    # ------------------------------------------------------------------ #
+    # Streaming API (paper trading)
+    # ------------------------------------------------------------------ #
+    def step(self,
+             date,
+             long_symbols: Sequence[str],
+             short_symbols: Sequence[str],
+             prices: Optional[Mapping[str, float]] = None,
+             regime_signal: int = 0) -> Dict:
+        """
+        Process one new trading day – the same logic run() applies per calendar row.
+
+        Args:
+            date: The new trading day (must be later than the last processed day).
+            long_symbols (Sequence[str]): Today's long signals.
+            short_symbols (Sequence[str]): Today's short signals.
+            prices (Optional[Mapping[str, float]]): Today's closes (dict or Series).
+                Symbols without a price here fall back to their last known close.
+            regime_signal (int): Today's regime direction (+1 / 0 / -1).
+
+        Returns:
+            Dict: The account state recorded for the day (date, cash, positions, equity).
+        """
+        date = pd.Timestamp(date)
+        if self.history and date <= self.history[-1]["date"]:
+            raise ValueError(f"step() dates must increase: {date.date()} after "
+                             f"{self.history[-1]['date'].date()}")
+        for symbol, px in (prices or {}).items():
+            if px is not None and not np.isnan(px):
+                self._set_live_price(symbol, date, float(px))
+
+        self._process_day(date, {"long_symbols": list(long_symbols),
+                                 "short_symbols": list(short_symbols),
+                                 "regime_signal": regime_signal})
+        return self.history[-1]
+
+    def snapshot(self) -> bytes:
+        """
+        Serialise the full simulator state (settings, cash, positions, trade
+        ledger, equity history, last known prices) as gzip-compressed JSON.
+        """
+        def enc(value):
+            return value.isoformat() if isinstance(value, pd.Timestamp) else value
+
+        held = set(self.positions)
+        hist = pd.DataFrame(self.history, columns=["date", "cash", "positions", "equity"])
+        state = dict(
+            version=SNAPSHOT_VERSION,
+            cls=type(self).__name__,
+            settings=dict(initial_cash=self.initial_cash, max_positions=self.max_positions,
+                          fixed_size=self.fixed_size),
+            cash=self.cash,
+            positions={s: {k: enc(v) for k, v in pos.items()} for s, pos in self.positions.items()},
+            open_trade=getattr(self, "_open_trade", None),
+            trades=self.trades.state(),
+            history=dict(date=pd.to_datetime(hist["date"]).astype("int64").tolist(),
+                         cash=hist["cash"].tolist(), positions=hist["positions"].tolist(),
+                         equity=hist["equity"].tolist()),
+            # last close of every held symbol, so a restored run needs no price history
+            live_prices={s: [d.isoformat(), px] for s, (d, px) in self._live_prices.items()},
+            held_prices={s: px for s in held
+                         if (px := self._get_price(self.history[-1]["date"], s)) is not None}
+            if self.history else {},
+        )
+        return gzip.compress(json.dumps(state, separators=(",", ":")).encode())
+
+    @classmethod
+    def restore(cls,
+                blob: bytes,
+                prices: Optional[MarketPanel] = None,
+                signal_calendar: Optional[pd.DataFrame] = None) -> "BacktestSimulator":
+        """
+        Rebuild a simulator from ``snapshot()`` output.
+
+        Args:
+            blob (bytes): Snapshot bytes.
+            prices (Optional[MarketPanel]): Close panel to use afterwards; by default
+                none is loaded and prices come from step() plus the snapshot.
+            signal_calendar (Optional[pd.DataFrame]): Calendar for a later run().
+
+        Raises:
+            ValueError: If the snapshot belongs to another simulator class or version.
+        """
+        state: Dict[str, Any] = json.loads(gzip.decompress(blob))
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {state.get('version')}")
+        if state["cls"] != cls.__name__:
+            raise ValueError(f"Snapshot of {state['cls']} cannot be restored as {cls.__name__}")
+
+        if signal_calendar is None:
+            signal_calendar = pd.DataFrame(columns=["date", "long_symbols", "short_symbols"])
+        sim = cls(signal_calendar, prices=prices if prices is not None else _empty_close_panel(),
+                  **state["settings"])
+
+        sim.cash = state["cash"]
+        sim._load_positions({
+            s: {k: pd.Timestamp(v) if k.endswith("_date") else v for k, v in pos.items()}
+            for s, pos in state["positions"].items()})
+        if state["open_trade"] is not None:
+            sim._open_trade = dict(state["open_trade"])
+        sim.trades = TradeLedger.from_state(state["trades"])
+        h = state["history"]
+        sim.history = [dict(date=pd.Timestamp(d), cash=c, positions=n, equity=e)
+                       for d, c, n, e in zip(h["date"], h["cash"], h["positions"], h["equity"])]
+
+        last = sim.history[-1]["date"] if sim.history else None
+        live = {s: (pd.Timestamp(d), px) for s, (d, px) in state["live_prices"].items()}
+        for s, px in state["held_prices"].items():
+            if s not in live or live[s][0] < last:
+                live[s] = (last, px)
+        for s, (d, px) in live.items():
+            sim._set_live_price(s, d, px)
+        return sim
+
+    def _set_live_price(self, symbol: str, date, price: float) -> None:
+        """Record a close fed through step() / a snapshot (see _get_price)."""
+        self._live_prices[symbol] = (date, price)
+
+    def _load_positions(self, positions: Dict[str, Dict]) -> None:
+        """Install restored open positions (dict layout of ``self.positions``)."""
+        self.positions = positions
 
         
     
@@ -0,0 +1,177 @@
+"""simulation/or_checkpoint.py – checkpoint / resume for long optimizer runs
+
+A ``CheckpointStore`` is one directory per run:
+
+    <root>/<run_name>/results.jsonl      one line per finished evaluation
+    <root>/<run_name>/sims/<key>.json.gz simulator snapshots (BacktestSimulator.snapshot)
+
+*  **Completed results** are appended by the *parent* process only (as
+   futures complete), flushed and fsync'ed line by line – workers of a
+   ``ProcessPoolExecutor`` never touch the file, and a torn last line from a
+   crash is ignored on reload.
+*  **Search drivers** (or_param_search) take a ``CheckpointedExecutor``:
+   evaluations already in the log are answered from it, new ones are
+   recorded as they finish.
+*  **Simulator snapshots** are written atomically (temp file + ``os.replace``)
+   every N simulated days; a resumed run restores the snapshot and continues
+   after its last recorded date.
+
+Keys are SHA-1 digests of the JSON-normalised parts (ParamSet, span …),
+stable across processes and machines.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import Executor, as_completed
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Type
+
+import pandas as pd
+
+from simulation.or_backtest_simulator import BacktestSimulator
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = Path("outputs/checkpoints")
+CHECKPOINT_EVERY = 250  # simulated days between snapshots
+
+
+def _plain(obj: Any) -> Any:
+    return asdict(obj) if is_dataclass(obj) else obj
+
+
+class CheckpointStore:
+    """
+    Results log and simulator snapshots of one (resumable) run.
+
+    Args:
+        run_name (str): Sub-directory name, e.g. the optimizer module.
+        root (str | Path): Parent directory of all checkpoints.
+        resume (bool): Keep existing checkpoints; otherwise they are cleared.
+    """
+
+    def __init__(self, run_name: str, root: str | Path = CHECKPOINT_DIR, resume: bool = False):
+        self.dir = Path(root) / run_name
+        self.sims_dir = self.dir / "sims"
+        self.results_path = self.dir / "results.jsonl"
+        if not resume and self.dir.exists():
+            logger.info("🧹 clearing previous checkpoints in %s", self.dir)
+            shutil.rmtree(self.dir)
+        self.sims_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        payload = json.dumps([_plain(p) for p in parts], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+    # ------------------------------------------------------------------ #
+    # completed evaluations (parent process only)
+    # ------------------------------------------------------------------ #
+    def done(self, phase: str) -> Dict[str, Dict]:
+        """Finished records of *phase*, keyed by their key (last write wins)."""
+        out: Dict[str, Dict] = {}
+        if not self.results_path.exists():
+            return out
+        with open(self.results_path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:  # torn line from an interrupted write
+                    continue
+                if rec.get("phase") == phase:
+                    out[rec["key"]] = rec
+        return out
+
+    def record(self, phase: str, key: str, params: Any, result: Optional[Dict]) -> None:
+        """Append one finished evaluation (result None = rejected) durably."""
+        line = json.dumps(dict(phase=phase, key=key, params=_plain(params), result=result),
+                          default=float)
+        with open(self.results_path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    # ------------------------------------------------------------------ #
+    # simulator snapshots
+    # ------------------------------------------------------------------ #
+    def _sim_path(self, key: str) -> Path:
+        return self.sims_dir / f"{key}.json.gz"
+
+    def save_sim(self, key: str, sim: BacktestSimulator) -> None:
+        path = self._sim_path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(sim.snapshot())
+        os.replace(tmp, path)
+
+    def load_sim(self, key: str, cls: Type[BacktestSimulator], **restore_kwargs) -> Optional[BacktestSimulator]:
+        path = self._sim_path(key)
+        if not path.exists():
+            return None
+        return cls.restore(path.read_bytes(), **restore_kwargs)
+
+    def run_sim(
+        self,
+        key: str,
+        factory: Callable[[], BacktestSimulator],
+        every: int = CHECKPOINT_EVERY,
+    ) -> BacktestSimulator:
+        """
+        Run ``factory()``'s simulator with periodic snapshots, or continue it
+        from the last snapshot under *key*.
+        """
+        fresh = factory()
+        sim = self.load_sim(key, type(fresh), prices=fresh.prices,
+                            signal_calendar=fresh.signals) or fresh
+        after = sim.history[-1]["date"] if sim.history else None
+        if after is not None:
+            print(f"↩️  resuming simulation {key} after {pd.Timestamp(after).date()}")
+        sim.run(after=after, every=every, on_checkpoint=lambda s: self.save_sim(key, s))
+        self.save_sim(key, sim)
+        return sim
+
+
+class CheckpointedExecutor:
+    """
+    ``map()`` facade over an executor for ``evaluate(params, span)`` calls.
+
+    Pairs already recorded under *phase* are answered from the log; the rest
+    run on *executor* and are recorded (in the parent process) as they finish,
+    so an interrupted search resumes where it stopped.
+
+    Args:
+        executor (Executor): Pool that runs the missing evaluations.
+        store (CheckpointStore): Results log of the run.
+        phase (str): Phase the evaluations are recorded under.
+    """
+
+    def __init__(self, executor: Executor, store: CheckpointStore, phase: str):
+        self.executor = executor
+        self.store = store
+        self.phase = phase
+        self.replayed = 0
+
+    def map(self, fn: Callable, params: Iterable, spans: Iterable) -> Iterator[Optional[Dict]]:
+        params, spans = list(params), list(spans)
+        keys = [self.store.key(p, s) for p, s in zip(params, spans)]
+        done = self.store.done(self.phase)
+        out: list = [None] * len(params)
+        fut = {}
+        for i, key in enumerate(keys):
+            if key in done:
+                out[i] = done[key]["result"]
+                self.replayed += 1
+            else:
+                fut[self.executor.submit(fn, params[i], spans[i])] = i
+        for f in as_completed(fut):
+            i = fut[f]
+            out[i] = f.result()
+            self.store.record(self.phase, keys[i], params[i], out[i])
+        return iter(out)
+
+
+__all__ = ["CheckpointStore", "CheckpointedExecutor", "CHECKPOINT_DIR", "CHECKPOINT_EVERY"]
@@ -1,22 +1,20 @@
 from __future__ import annotations
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 
-from simulation.data_loaders import load_sp500, load_stocks, load_betas
+from simulation.or_data_context import DataContext, get_data_context
 
 # ---------------------------------------------------------------------------
-# Load full data into memory once to avoid repeated DB queries
+# Tables are loaded lazily through the shared DataContext (see
+# or_data_context) – importing this module costs nothing.
 # ---------------------------------------------------------------------------
-_sp500_df = load_sp500()
-_stocks_df = load_stocks()
-_betas_df = load_betas()
 
-_sp500_df = _sp500_df.sort_values("date")
-_stocks_df = _stocks_df.sort_values(["date", "symbol"])
-_betas_df = _betas_df.sort_values(["date", "symbol"])
+BUNDLE_CACHE_SIZE = 64  # recently built bundles kept per context (LRU)
 
 # ---------------------------------------------------------------------------
 # DailyBundle: unified data object for a single trading day
@@ -32,12 +30,71 @@ class DailyBundle:
         regime_score (int): Market regime score for that day (-2 to +2).
         eligible_symbols (List[str]): List of symbols with valid beta data.
         betas (pd.DataFrame): DataFrame of beta values for all eligible stocks.
+            A zero-copy view into the shared beta table, sorted by symbol;
+            its arrays are flagged read-only, so writes raise ValueError.
     """
     date: datetime
     regime_score: int
     eligible_symbols: List[str]
     betas: pd.DataFrame
 
+# ---------------------------------------------------------------------------
+# Per-context lookup structures (built once, dropped on context reset)
+# ---------------------------------------------------------------------------
+
+def _build_date_index(dates: pd.Series) -> Dict[pd.Timestamp, Tuple[int, int]]:
+    """Map each date of a date-sorted column to its (start, stop) row offsets."""
+    values = dates.to_numpy()
+    if len(values) == 0:
+        return {}
+    starts = np.concatenate(([0], np.flatnonzero(values[1:] != values[:-1]) + 1))
+    stops = np.append(starts[1:], len(values))
+    return {pd.Timestamp(values[a]): (int(a), int(b)) for a, b in zip(starts, stops)}
+
+
+def _read_only(frame: pd.DataFrame) -> pd.DataFrame:
+    """Zero-copy DataFrame over *frame* whose column arrays reject writes."""
+    cols = {}
+    for c in frame.columns:
+        view = frame[c].to_numpy().view()
+        view.flags.writeable = False
+        cols[c] = view
+    return pd.DataFrame(cols, index=frame.index, copy=False)
+
+
+def _beta_date_index(ctx: DataContext) -> Dict[pd.Timestamp, Tuple[int, int]]:
+    return ctx.derived("beta_date_index", lambda: _build_date_index(ctx.betas["date"]))
+
+
+def _regime_scores(ctx: DataContext) -> Dict[pd.Timestamp, float]:
+    def build():
+        sp500 = ctx.sp500.drop_duplicates("date")
+        return dict(zip(pd.to_datetime(sp500["date"]), sp500["score"]))
+    return ctx.derived("regime_scores", build)
+
+# ---------------------------------------------------------------------------
+# Market regime lookup (touches the SP500 table only)
+# ---------------------------------------------------------------------------
+
+def get_regime_score(target_date: str | datetime) -> int:
+    """
+    Return the market regime score for a trading day.
+
+    Only the SP500 table is loaded, so score-only callers never pay for
+    the stocks or betas tables.
+
+    Raises:
+        ValueError: If SP500 data for the requested date is missing.
+    """
+    if isinstance(target_date, str):
+        target_date = pd.to_datetime(target_date).normalize()
+
+    score = _regime_scores(get_data_context()).get(target_date)
+    if score is None:
+        raise ValueError(f"No SP500 data for {target_date.date()}")
+
+    return int(score)
+
 # ---------------------------------------------------------------------------
 # Core builder function to construct DailyBundle
 # ---------------------------------------------------------------------------
@@ -46,6 +103,10 @@ def build_daily_bundle(target_date: str | datetime) -> DailyBundle:
     """
     Assemble a complete data bundle for a specific trading day.
 
+    The day's beta rows are located through a date → (start, stop) offset
+    index and returned as a read-only zero-copy slice; recently built bundles are
+    kept in a small LRU, so repeated calls for the same day are O(1).
+
     Args:
         target_date (str | datetime): Date to retrieve.
 
@@ -59,23 +120,31 @@ def build_daily_bundle(target_date: str | datetime) -> DailyBundle:
     if isinstance(target_date, str):
         target_date = pd.to_datetime(target_date).normalize()
 
-    # Retrieve market regime score for the date
-    sp_row = _sp500_df[_sp500_df["date"] == target_date]
-    if sp_row.empty:
-        raise ValueError(f"No SP500 data for {target_date.date()}")
+    ctx = get_data_context()
+    cache: OrderedDict = ctx.derived("bundle_lru", OrderedDict)
+    key = pd.Timestamp(target_date)
+    if (bundle := cache.get(key)) is not None:
+        cache.move_to_end(key)
+        return bundle
 
-    regime_score = int(sp_row.iloc[0]["score"])
+    # Retrieve market regime score for the date
+    regime_score = get_regime_score(target_date)
 
     # Retrieve beta data for the date
-    betas_today = _betas_df[_betas_df["date"] == target_date].copy()
-    if betas_today.empty:
+    span = _beta_date_index(ctx).get(key)
+    if span is None:
         raise ValueError(f"No beta data for {target_date.date()}")
+    betas_today = _read_only(ctx.betas.iloc[span[0]:span[1]])
 
     eligible_symbols = sorted(betas_today["symbol"].unique().tolist())
 
-    return DailyBundle(
+    bundle = DailyBundle(
         date=target_date,
         regime_score=regime_score,
         eligible_symbols=eligible_symbols,
         betas=betas_today
     )
+    cache[key] = bundle
+    if len(cache) > BUNDLE_CACHE_SIZE:
+        cache.popitem(last=False)
+    return bundle
@@ -0,0 +1,140 @@
+"""simulation/or_data_context.py – lazy, process-wide access to market tables
+
+Importing a module must not cost seconds and gigabytes. Instead of loading
+the SP500, stocks and betas tables at import time, callers ask the shared
+``DataContext`` for a table and it is loaded (from the loaders' cache) on
+first use only:
+
+    >>> from simulation.or_data_context import get_data_context
+    >>> ctx = get_data_context()
+    >>> ctx.sp500            # loads sp500_index only – stocks/betas untouched
+
+The context is shared by every caller in the process. It can be replaced
+(``set_data_context``, e.g. from a ProcessPool initializer or a test with
+synthetic frames) or dropped (``reset_data_context``) explicitly.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from simulation.data_loaders import load_betas, load_sp500, load_stocks
+
+
+class DataContext:
+    """
+    Lazily loaded, memoised market tables.
+
+    Args:
+        compact (Optional[bool]): Passed to the loaders (see data_loaders).
+        check_db (bool): Verify cache freshness against the DB on first load.
+        frames (Optional[Dict[str, pd.DataFrame]]): Pre-loaded tables keyed by
+            "sp500" / "stocks" / "betas" – skips the loaders for those.
+    """
+
+    def __init__(
+        self,
+        *,
+        compact: Optional[bool] = None,
+        check_db: bool = True,
+        frames: Optional[Dict[str, pd.DataFrame]] = None,
+    ):
+        self.compact = compact
+        self.check_db = check_db
+        self._frames: Dict[str, pd.DataFrame] = dict(frames or {})
+        self._derived: Dict[str, Any] = {}
+        self._lock = threading.RLock()  # derived factories may load tables
+
+    # ------------------------------------------------------------------ #
+    # tables
+    # ------------------------------------------------------------------ #
+    @property
+    def sp500(self) -> pd.DataFrame:
+        """`sp500_index` sorted by date."""
+        return self._get("sp500", lambda: load_sp500(
+            check_db=self.check_db, compact=self.compact).sort_values("date"))
+
+    @property
+    def stocks(self) -> pd.DataFrame:
+        """`daily_stock_data` sorted by (date, symbol)."""
+        return self._get("stocks", lambda: load_stocks(
+            check_db=self.check_db, compact=self.compact).sort_values(["date", "symbol"]))
+
+    @property
+    def betas(self) -> pd.DataFrame:
+        """`beta_calculation` sorted by (date, symbol)."""
+        return self._get("betas", lambda: load_betas(
+            check_db=self.check_db, compact=self.compact).sort_values(["date", "symbol"]))
+
+    # ------------------------------------------------------------------ #
+    # housekeeping
+    # ------------------------------------------------------------------ #
+    def loaded(self) -> List[str]:
+        """Names of the tables already in memory."""
+        return sorted(self._frames)
+
+    def derived(self, key: str, factory: Callable[[], Any]) -> Any:
+        """
+        Memoise an object derived from the tables (index, lookup cache …).
+
+        Derived objects live and die with the context: ``reset()`` drops them
+        together with the tables they were built from.
+        """
+        return self._get(key, factory, self._derived)
+
+    def reset(self) -> None:
+        """Drop every loaded table (and derived object); the next access reloads it."""
+        with self._lock:
+            self._frames.clear()
+            self._derived.clear()
+
+    def _get(self, key: str, loader: Callable[[], Any], store: Optional[Dict] = None) -> Any:
+        store = self._frames if store is None else store
+        obj = store.get(key)
+        if obj is None:
+            with self._lock:
+                obj = store.get(key)
+                if obj is None:
+                    obj = store[key] = loader()
+        return obj
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton
+# ---------------------------------------------------------------------------
+_context: Optional[DataContext] = None
+_context_lock = threading.Lock()
+
+
+def get_data_context() -> DataContext:
+    """Return the shared context, creating an empty (nothing loaded) one on first call."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = DataContext()
+    return _context
+
+
+def set_data_context(ctx: DataContext) -> None:
+    """Install *ctx* as the shared context (e.g. in a ProcessPool initializer)."""
+    global _context
+    with _context_lock:
+        _context = ctx
+
+
+def reset_data_context() -> None:
+    """Forget the shared context; the next ``get_data_context()`` starts empty."""
+    global _context
+    with _context_lock:
+        _context = None
+
+
+__all__ = [
+    "DataContext",
+    "get_data_context",
+    "set_data_context",
+    "reset_data_context",
+]
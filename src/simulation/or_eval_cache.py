@@ -0,0 +1,205 @@
+"""simulation/or_eval_cache.py – persistent store of optimizer evaluations
+
+Re-running a grid after changing only the reporting, or after adding one
+threshold, should not re-simulate what was already evaluated. ``EvalCache``
+keeps every ``_evaluate(ParamSet, span)`` result in a small SQLite file
+(``data_cache/eval_cache.sqlite``), keyed by a SHA-1 digest of
+
+    ParamSet · span · simulator class + settings · data fingerprint
+
+so a change of any of them (e.g. new rows in ``beta_calculation``) misses
+the cache instead of returning stale numbers. Quick-rejected configs are
+stored too (metrics ``None``). Equity curves are kept on request.
+
+SQLite runs in WAL mode with a busy timeout, so ProcessPool workers may read
+and write the same file concurrently.
+
+    >>> cache = EvalCache()
+    >>> key = cache.key(p, span, SL_Simulator, dict(max_positions=10))
+    >>> hit = cache.get(key)                 # None → not evaluated yet
+    >>> cache.put(key, metrics, params=p, span=span, equity=sim.results())
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import sqlite3
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from simulation.data_loaders import data_fingerprint
+
+EVAL_CACHE_PATH = Path(__file__).resolve().parent.parent / "data_cache" / "eval_cache.sqlite"
+EVAL_CACHE_VERSION = 1  # bump when simulator / metric logic changes results
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    key          TEXT PRIMARY KEY,
+    params       TEXT NOT NULL,
+    span         TEXT NOT NULL,
+    simulator    TEXT NOT NULL,
+    data_version TEXT NOT NULL,
+    metrics      TEXT,            -- JSON; NULL = quick-rejected
+    equity       BLOB,            -- gzip JSON columns, optional
+    created      TEXT NOT NULL
+)
+"""
+
+
+def _plain(obj: Any) -> Any:
+    return asdict(obj) if is_dataclass(obj) else obj
+
+
+def _class_name(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+class EvalCache:
+    """
+    SQLite-backed cache of evaluation metrics (and optionally equity curves).
+
+    Args:
+        path (str | Path): SQLite file (created on first use).
+        data_version (Optional[str]): Data fingerprint to key on; default
+            ``data_fingerprint()`` of the three market tables.
+        check_db (bool): Let the default fingerprint query the DB.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = EVAL_CACHE_PATH,
+        data_version: Optional[str] = None,
+        *,
+        check_db: bool = True,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.data_version = data_version or data_fingerprint(check_db=check_db)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=60)
+
+    # ------------------------------------------------------------------ #
+    # keys
+    # ------------------------------------------------------------------ #
+    def key(
+        self,
+        params: Any,
+        span: Tuple[str, str],
+        simulator: type,
+        settings: Optional[Mapping[str, Any]] = None,
+    ) -> str:
+        """
+        Digest of everything a result depends on.
+
+        Args:
+            params: ParamSet (any dataclass / JSON-able object).
+            span (Tuple[str, str]): (start, end) of the evaluation.
+            simulator (type): Simulator class whose logic produced the result.
+            settings (Optional[Mapping]): Simulator / evaluation settings
+                (cash, max positions, stop-loss factors, quick-reject limit …).
+        """
+        payload = json.dumps(dict(params=_plain(params), span=list(span),
+                                  simulator=_class_name(simulator), settings=dict(settings or {}),
+                                  data=self.data_version, version=EVAL_CACHE_VERSION),
+                             sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    # ------------------------------------------------------------------ #
+    # read / write
+    # ------------------------------------------------------------------ #
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Cached entry for *key*, or None on a miss.
+
+        Returns:
+            Optional[Dict]: ``{"metrics": dict | None}`` – metrics None means the
+            config was quick-rejected.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT metrics FROM evaluations WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {"metrics": None if row[0] is None else json.loads(row[0])}
+
+    def put(
+        self,
+        key: str,
+        metrics: Optional[Dict],
+        *,
+        params: Any,
+        span: Tuple[str, str],
+        simulator: type,
+        equity: Optional[pd.DataFrame] = None,
+    ) -> None:
+        """
+        Store one evaluation (replaces an existing entry with the same key).
+
+        Raises:
+            ValueError: If *key* is None.
+        """
+        if key is None:
+            raise ValueError("EvalCache.put needs a key (see EvalCache.key)")
+        blob = None
+        if equity is not None:
+            cols = {c: (pd.to_datetime(equity[c]).astype("int64") if c == "date" else equity[c]).tolist()
+                    for c in equity.columns}
+            blob = gzip.compress(json.dumps(cols).encode())
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(_plain(params), default=str), json.dumps(list(span)),
+                 _class_name(simulator), self.data_version,
+                 None if metrics is None else json.dumps(metrics, default=float), blob,
+                 pd.Timestamp.now().isoformat(timespec="seconds")))
+
+    def equity(self, key: str) -> Optional[pd.DataFrame]:
+        """Stored equity curve for *key* (None if missing or not stored)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT equity FROM evaluations WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        df = pd.DataFrame(json.loads(gzip.decompress(row[0])))
+        if "date" in df:
+            df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    # ------------------------------------------------------------------ #
+    # housekeeping
+    # ------------------------------------------------------------------ #
+    def __bool__(self) -> bool:
+        return True  # an empty cache is still a cache (``__len__`` would make it falsy)
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+    def prune(self) -> int:
+        """Delete entries computed on other data versions (or without a key); returns how many."""
+        with self._connect() as conn:
+            n = conn.execute("DELETE FROM evaluations WHERE data_version != ? OR key IS NULL",
+                             (self.data_version,)).rowcount
+        return n
+
+    def to_frame(self) -> pd.DataFrame:
+        """All entries of the current data version (without equity curves)."""
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT key, params, span, simulator, metrics, created FROM evaluations "
+                "WHERE data_version = ?", conn, params=(self.data_version,))
+        for c in ("params", "span", "metrics"):
+            df[c] = [None if v is None else json.loads(v) for v in df[c]]
+        return df
+
+    def __repr__(self) -> str:
+        return f"EvalCache({self.path.name}, data={self.data_version}, {len(self)} entries)"
+
+
+__all__ = ["EvalCache", "EVAL_CACHE_PATH", "EVAL_CACHE_VERSION"]
@@ -0,0 +1,306 @@
+"""simulation/or_market_panel.py – dense symbol × date market panel
+
+The simulator, the signal layer and the universe builder all look values
+up by ``(date, symbol)`` in long-format DataFrames. ``MarketPanel`` pivots
+those tables once into aligned 2-D NumPy arrays:
+
+    fields["close"][t, j]        close of symbols[j] on dates[t]
+    fields["beta_up_60"][t, j]   beta of the same cell
+    regime[t]                    SP500 regime score on dates[t]
+
+Missing cells are NaN. Lookups are O(1) through the date / symbol index
+maps, ``asof`` lookups are one ``searchsorted``, and entry masks for the
+whole panel are plain array expressions.
+
+The panel is an ordinary picklable object and can also be written to a
+directory of ``.npy`` files and re-opened memory-mapped, so worker
+processes share the pages instead of each holding a copy:
+
+    >>> panel = MarketPanel.build(start="2014-01-01", end="2024-12-31", ffill=True)
+    >>> panel.save("data_cache/panel_2014_2024")
+    >>> shared = MarketPanel.load("data_cache/panel_2014_2024")   # mmap_mode="r"
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from simulation.data_loaders import load_betas, load_sp500, load_stocks
+
+PRICE_FIELDS: Tuple[str, ...] = ("close", "high", "low")
+_META_FILE = "panel.json"
+
+
+def _ffill(a: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs down axis 0 (dates); leading NaNs stay NaN."""
+    if a.size == 0:
+        return a.copy()
+    rows = np.arange(a.shape[0])[:, None]
+    last = np.where(np.isnan(a), 0, rows)
+    np.maximum.accumulate(last, axis=0, out=last)
+    return a[last, np.arange(a.shape[1])]
+
+
+def _pivot(
+    df: pd.DataFrame,
+    columns: Sequence[str],
+    dates: np.ndarray,
+    symbols: np.ndarray,
+    dtype,
+) -> Dict[str, np.ndarray]:
+    """Scatter long-format rows into (n_dates, n_symbols) arrays; last row wins."""
+    di = np.searchsorted(dates, df["date"].to_numpy(dtype="datetime64[ns]"))
+    si = np.searchsorted(symbols, df["symbol"].astype(str).to_numpy(dtype=object))
+    out = {}
+    for col in columns:
+        arr = np.full((len(dates), len(symbols)), np.nan, dtype=dtype)
+        arr[di, si] = df[col].to_numpy(dtype=dtype, na_value=np.nan)
+        out[col] = arr
+    return out
+
+
+class MarketPanel:
+    """
+    Aligned symbol × date arrays for prices, betas and the market regime.
+
+    Args:
+        dates (np.ndarray): Sorted trading dates (datetime64[ns]).
+        symbols (np.ndarray): Sorted symbols.
+        fields (Dict[str, np.ndarray]): Column name → (n_dates, n_symbols) array.
+        regime (np.ndarray): SP500 regime score per date (NaN where missing).
+        ffilled (Iterable[str]): Names of the fields that were forward-filled.
+    """
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        symbols: np.ndarray,
+        fields: Dict[str, np.ndarray],
+        regime: np.ndarray,
+        ffilled: Iterable[str] = (),
+    ):
+        self.dates = np.asarray(dates, dtype="datetime64[ns]")
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.fields = dict(fields)
+        self.regime = regime
+        self.ffilled = tuple(ffilled)
+        self.date_index: Dict[pd.Timestamp, int] = {
+            pd.Timestamp(d): i for i, d in enumerate(self.dates)}
+        self.symbol_index: Dict[str, int] = {s: j for j, s in enumerate(self.symbols)}
+
+        shape = self.shape
+        for name, arr in self.fields.items():
+            if arr.shape != shape:
+                raise ValueError(f"Field {name!r} has shape {arr.shape}, expected {shape}")
+        if self.regime.shape != (shape[0],):
+            raise ValueError(f"Regime has shape {self.regime.shape}, expected ({shape[0]},)")
+
+    # ------------------------------------------------------------------ #
+    # construction
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def from_frames(
+        cls,
+        stocks: pd.DataFrame,
+        betas: Optional[pd.DataFrame] = None,
+        sp500: Optional[pd.DataFrame] = None,
+        *,
+        price_fields: Sequence[str] = PRICE_FIELDS,
+        beta_columns: Optional[Sequence[str]] = None,
+        ffill: bool | Sequence[str] = False,
+        dtype=np.float64,
+    ) -> "MarketPanel":
+        """
+        Pivot long-format tables into a panel.
+
+        The date axis is the union of the stock and beta dates; the symbol
+        axis is the union of their symbols.
+
+        Args:
+            stocks (pd.DataFrame): date, symbol and *price_fields* columns.
+            betas (Optional[pd.DataFrame]): date, symbol and beta columns.
+            sp500 (Optional[pd.DataFrame]): date and score columns.
+            price_fields (Sequence[str]): Stock columns to pivot.
+            beta_columns (Optional[Sequence[str]]): Beta columns to pivot
+                (default: every ``beta_*`` column of *betas*).
+            ffill (bool | Sequence[str]): True forward-fills the price fields
+                ("last available price"); a sequence names the fields to fill.
+                Betas are never filled unless named explicitly.
+            dtype: Float dtype of the arrays (np.float32 halves the footprint).
+
+        Returns:
+            MarketPanel: The aligned panel.
+        """
+        betas = betas if betas is not None else pd.DataFrame(columns=["date", "symbol"])
+        if beta_columns is None:
+            beta_columns = [c for c in betas.columns if c.startswith("beta_")]
+
+        dates = np.union1d(stocks["date"].to_numpy(dtype="datetime64[ns]"),
+                           betas["date"].to_numpy(dtype="datetime64[ns]"))
+        symbols = np.union1d(stocks["symbol"].astype(str).to_numpy(dtype=object),
+                             betas["symbol"].astype(str).to_numpy(dtype=object)).astype(object)
+
+        fields = _pivot(stocks, price_fields, dates, symbols, dtype)
+        fields.update(_pivot(betas, beta_columns, dates, symbols, dtype))
+
+        fill = list(price_fields) if ffill is True else list(ffill or [])
+        for name in fill:
+            if name not in fields:
+                raise KeyError(f"Cannot forward-fill unknown field {name!r}")
+            fields[name] = _ffill(fields[name])
+
+        regime = np.full(len(dates), np.nan, dtype=dtype)
+        if sp500 is not None and len(sp500):
+            sp500 = sp500.drop_duplicates("date")
+            scores = pd.Series(sp500["score"].to_numpy(), index=pd.to_datetime(sp500["date"]))
+            regime[:] = scores.reindex(pd.DatetimeIndex(dates)).to_numpy(dtype=dtype, na_value=np.nan)
+
+        return cls(dates, symbols, fields, regime, ffilled=fill)
+
+    @classmethod
+    def build(
+        cls,
+        *,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        tickers: Optional[Iterable[str]] = None,
+        price_fields: Sequence[str] = PRICE_FIELDS,
+        beta_columns: Optional[Sequence[str]] = None,
+        ffill: bool | Sequence[str] = False,
+        dtype=np.float64,
+        check_db: bool = True,
+    ) -> "MarketPanel":
+        """
+        Load the stocks / betas / SP500 tables (column and date pushdown) and pivot them.
+
+        Args:
+            beta_columns (Optional[Sequence[str]]): Beta columns to load; None
+                loads every beta window, [] skips the beta table.
+
+        See ``from_frames`` for the remaining arguments.
+        """
+        tickers = list(tickers) if tickers is not None else None
+        stocks = load_stocks(tickers=tickers, start=start, end=end,
+                             columns=["date", "symbol", *price_fields], check_db=check_db)
+        betas = None
+        if beta_columns is None or len(beta_columns):
+            betas = load_betas(tickers=tickers, start=start, end=end, check_db=check_db,
+                               columns=None if beta_columns is None
+                               else ["date", "symbol", *beta_columns])
+        sp500 = load_sp500(check_db=check_db)
+        return cls.from_frames(stocks, betas, sp500, price_fields=price_fields,
+                               beta_columns=beta_columns, ffill=ffill, dtype=dtype)
+
+    # ------------------------------------------------------------------ #
+    # lookups
+    # ------------------------------------------------------------------ #
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(n_dates, n_symbols)."""
+        return len(self.dates), len(self.symbols)
+
+    def date_pos(self, date) -> Optional[int]:
+        """Row of an exact trading date, or None."""
+        return self.date_index.get(pd.Timestamp(date))
+
+    def asof_pos(self, date) -> Optional[int]:
+        """Row of the last trading date <= *date*, or None if before the panel."""
+        pos = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date), "ns"), "right")) - 1
+        return pos if pos >= 0 else None
+
+    def symbol_pos(self, symbol: str) -> Optional[int]:
+        """Column of a symbol, or None."""
+        return self.symbol_index.get(symbol)
+
+    def value(self, field: str, date, symbol: str, *, asof: bool = False) -> Optional[float]:
+        """
+        Single cell lookup.
+
+        Args:
+            asof (bool): Use the last trading date <= *date* instead of an exact match.
+
+        Returns:
+            Optional[float]: The value, or None if the cell is missing / NaN.
+        """
+        t = self.asof_pos(date) if asof else self.date_pos(date)
+        j = self.symbol_index.get(symbol)
+        if t is None or j is None:
+            return None
+        v = self.fields[field][t, j]
+        return None if np.isnan(v) else float(v)
+
+    def regime_direction(self) -> np.ndarray:
+        """+1 / -1 / 0 per date (same mapping as or_signal_layer.get_regime_signal)."""
+        return np.where(self.regime >= 1, 1, np.where(self.regime <= -1, -1, 0)).astype(np.int8)
+
+    def entry_masks(
+        self,
+        beta_window: int,
+        beta_up_threshold: float,
+        beta_down_threshold: float,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Long / short entry flags for every (date, symbol) cell.
+
+        Same rule as or_signal_layer.is_entry_long / is_entry_short: regime
+        direction, both betas present, side's beta >= threshold.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Boolean (n_dates, n_symbols) arrays.
+        """
+        up = self.fields[f"beta_up_{beta_window}"]
+        down = self.fields[f"beta_down_{beta_window}"]
+        have = ~np.isnan(up) & ~np.isnan(down)
+        direction = self.regime_direction()[:, None]
+        with np.errstate(invalid="ignore"):
+            long_mask = (direction == 1) & have & (up >= beta_up_threshold)
+            short_mask = (direction == -1) & have & (down >= beta_down_threshold)
+        return long_mask, short_mask
+
+    def nbytes(self) -> int:
+        """Total size of the arrays in bytes."""
+        return sum(a.nbytes for a in self.fields.values()) + self.regime.nbytes
+
+    # ------------------------------------------------------------------ #
+    # persistence
+    # ------------------------------------------------------------------ #
+    def save(self, path: str | os.PathLike) -> Path:
+        """Write the panel as one ``.npy`` per array plus a JSON header."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "dates.npy", self.dates)
+        np.save(path / "regime.npy", self.regime)
+        for name, arr in self.fields.items():
+            np.save(path / f"field_{name}.npy", arr)
+        meta = dict(symbols=self.symbols.tolist(), fields=list(self.fields),
+                    ffilled=list(self.ffilled))
+        (path / _META_FILE).write_text(json.dumps(meta))
+        return path
+
+    @classmethod
+    def load(cls, path: str | os.PathLike, mmap_mode: Optional[str] = "r") -> "MarketPanel":
+        """
+        Re-open a saved panel; with ``mmap_mode="r"`` the arrays are
+        memory-mapped read-only and shared between processes by the OS.
+        """
+        path = Path(path)
+        meta = json.loads((path / _META_FILE).read_text())
+        fields = {name: np.load(path / f"field_{name}.npy", mmap_mode=mmap_mode)
+                  for name in meta["fields"]}
+        return cls(np.load(path / "dates.npy"), np.array(meta["symbols"], dtype=object),
+                   fields, np.load(path / "regime.npy", mmap_mode=mmap_mode),
+                   ffilled=meta["ffilled"])
+
+    def __repr__(self) -> str:
+        n_dates, n_symbols = self.shape
+        span = f"{pd.Timestamp(self.dates[0]).date()}→{pd.Timestamp(self.dates[-1]).date()}" if n_dates else "empty"
+        return (f"MarketPanel({n_dates} dates × {n_symbols} symbols, {span}, "
+                f"fields={list(self.fields)}, {self.nbytes() / 1024 ** 2:.1f} MiB)")
+
+
+__all__: List[str] = ["MarketPanel", "PRICE_FIELDS"]
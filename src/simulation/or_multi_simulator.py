@@ -0,0 +1,380 @@
+"""simulation/or_multi_simulator.py – K parameter sets in one simulation pass
+
+The optimizers evaluate a grid by running one ``SL_Simulator`` per
+``ParamSet``. ``MultiConfigSimulator`` advances K portfolios together over
+a shared date range instead: every state array carries a leading config
+dimension,
+
+    active[k, slot], sym[k, slot], side[k, slot], qty[k, slot] …   (K × max_positions)
+    cash[k]
+
+and each trading day is a handful of array operations over all K books
+(one close-row read, one gather, one trailing-stop update, one stop scan).
+Signals are kept sparse – per day, the (config, symbol) pairs of the long
+and short lists – so memory stays O(number of signals), not K × dates ×
+symbols.
+
+The rules are those of ``SL_Simulator`` (``stop_loss=True``, default) or
+``BacktestSimulator`` (``stop_loss=False``); cash updates and equity sums
+are accumulated in opening order per config, so each of the K curves
+matches the single-config simulator run on the same calendar.
+
+Only difference: signal symbols without any price history are dropped up
+front (the single-config classes let them take a candidate slot and then
+skip them for lack of a price).
+
+    >>> sim = MultiConfigSimulator.from_calendars([build_signals(s, e, p) for p in grid])
+    >>> sim.run()
+    >>> curves, trades = sim.results(), sim.trade_logs()     # K of each
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from simulation.or_backtest_simulator import load_close_panel
+from simulation.or_market_panel import MarketPanel
+from simulation.or_signal_calendar import SignalCalendar
+
+class _Ledger:
+    """Growable column arrays for the trade records of all K configs."""
+
+    _DTYPES = dict(k=np.int32, sym=np.int32, side=np.int8, entry_t=np.int32,
+                   entry_price=np.float64, qty=np.float64, exit_t=np.int32,
+                   exit_price=np.float64, pnl=np.float64, sl_hit=bool)
+    _FILL = dict(exit_t=-1, exit_price=np.nan, pnl=np.nan, sl_hit=False)
+
+    def __init__(self, capacity: int = 1024):
+        self.n = 0
+        self.cols = {c: np.empty(capacity, dtype=t) for c, t in self._DTYPES.items()}
+
+    def append(self, **values: np.ndarray) -> np.ndarray:
+        """Append a batch (missing columns get their fill value); returns the row ids."""
+        m = len(values["k"])
+        if self.n + m > len(self.cols["k"]):
+            cap = max(2 * len(self.cols["k"]), self.n + m)
+            for c, arr in self.cols.items():
+                grown = np.empty(cap, dtype=arr.dtype)
+                grown[:self.n] = arr[:self.n]
+                self.cols[c] = grown
+        rows = np.arange(self.n, self.n + m)
+        for c, arr in self.cols.items():
+            arr[rows] = values[c] if c in values else self._FILL[c]
+        self.n += m
+        return rows
+
+    def view(self) -> Dict[str, np.ndarray]:
+        return {c: arr[:self.n] for c, arr in self.cols.items()}
+
+
+class MultiConfigSimulator:
+    """
+    Run K signal calendars over the same dates in one pass.
+
+    Args:
+        dates (Sequence): Trading days (the common ``date`` column of the calendars).
+        long_symbols (Sequence[Sequence[List[str]]]): ``[k][t]`` → long list of config k on day t.
+        short_symbols (Sequence[Sequence[List[str]]]): Same for shorts.
+        regime (Optional[np.ndarray]): (K, T) regime_signal per config and day (default 0).
+        initial_cash (float): Starting cash balance of every config.
+        max_positions (int): Max open positions per config.
+        fixed_size (float): Amount allocated per position.
+        stop_loss (bool): SL_Simulator rules (hard + trailing stop) or plain BacktestSimulator.
+        prices (Optional[MarketPanel]): Forward-filled close panel (default: shared one).
+    """
+    HARD_SL_PCT = 0.03
+    TSL_FACTOR = 0.8
+
+    def __init__(
+        self,
+        dates: Sequence,
+        long_symbols: Sequence[Sequence[List[str]]],
+        short_symbols: Sequence[Sequence[List[str]]],
+        regime: Optional[np.ndarray] = None,
+        *,
+        initial_cash: float = 1_000_000,
+        max_positions: int = 10,
+        fixed_size: float = 10_000,
+        stop_loss: bool = True,
+        prices: Optional[MarketPanel] = None,
+    ):
+        self.dates = pd.DatetimeIndex(pd.to_datetime(list(dates)))
+        self.K, self.T = len(long_symbols), len(self.dates)
+        if len(short_symbols) != self.K:
+            raise ValueError("long_symbols and short_symbols must have the same number of configs")
+        for k in range(self.K):
+            if len(long_symbols[k]) != self.T or len(short_symbols[k]) != self.T:
+                raise ValueError(f"Config {k}: signal lists do not cover all {self.T} dates")
+
+        self.initial_cash = initial_cash
+        self.max_positions = max_positions
+        self.fixed_size = fixed_size
+        self.stop_loss = stop_loss
+        self.regime = (np.zeros((self.K, self.T)) if regime is None
+                       else np.asarray(regime, dtype=float).reshape(self.K, self.T))
+
+        self.prices = prices if prices is not None else load_close_panel()
+        if "close" not in self.prices.ffilled:
+            raise ValueError("Price panel must forward-fill 'close'")
+        self._close = self.prices.fields["close"]
+        self._rows = np.array([-1 if (t := self.prices.asof_pos(d)) is None else t
+                               for d in self.dates], dtype=np.int64)
+
+        self._long = self._sparse_signals(long_symbols)
+        self._short = self._sparse_signals(short_symbols)
+        self.reset()
+
+    @classmethod
+    def from_calendars(cls, calendars: Sequence[pd.DataFrame | SignalCalendar],
+                       **kwargs) -> "MultiConfigSimulator":
+        """
+        Build from K signal calendars (generate_signal_calendar / build_signals
+        output, frames or SignalCalendar) that share the same ``date`` column.
+        """
+        if not calendars:
+            raise ValueError("No signal calendars given")
+        cals = [c.to_frame() if isinstance(c, SignalCalendar) else
+                c.sort_values("date").reset_index(drop=True) for c in calendars]
+        dates = pd.to_datetime(cals[0]["date"])
+        for k, c in enumerate(cals[1:], 1):
+            if not pd.to_datetime(c["date"]).reset_index(drop=True).equals(dates.reset_index(drop=True)):
+                raise ValueError(f"Calendar {k} has different dates than calendar 0")
+        regime = np.array([c["regime_signal"].to_numpy(dtype=float) if "regime_signal" in c
+                           else np.zeros(len(c)) for c in cals])
+        return cls(dates, [c["long_symbols"].tolist() for c in cals],
+                   [c["short_symbols"].tolist() for c in cals], regime, **kwargs)
+
+    def _sparse_signals(self, lists) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Per day: (config ids, panel columns), grouped by config, list order kept."""
+        index = self.prices.symbol_index
+        out = []
+        for t in range(self.T):
+            ks, cols = [], []
+            for k in range(self.K):
+                c = [j for s in lists[k][t] if (j := index.get(s)) is not None]
+                ks.append(np.full(len(c), k, dtype=np.int64))
+                cols.append(np.asarray(c, dtype=np.int64))
+            out.append((np.concatenate(ks), np.concatenate(cols)))
+        return out
+
+    # ------------------------------------------------------------------ #
+    # state
+    # ------------------------------------------------------------------ #
+    def reset(self):
+        """Clear all state before fresh run."""
+        K, P = self.K, max(self.max_positions, 0)
+        self.cash = np.full(K, float(self.initial_cash))
+        self.active = np.zeros((K, P), dtype=bool)
+        self.sym = np.zeros((K, P), dtype=np.int64)
+        self.side = np.zeros((K, P), dtype=np.int8)
+        self.qty = np.zeros((K, P))
+        self.entry_price = np.zeros((K, P))
+        self.entry_t = np.zeros((K, P), dtype=np.int32)
+        self.peak = np.zeros((K, P))
+        self.stop = np.zeros((K, P))
+        self.seq = np.zeros((K, P), dtype=np.int64)
+        self.open_rec = np.full((K, P), -1, dtype=np.int64)
+        self.next_seq = np.zeros(K, dtype=np.int64)
+        self.held = np.zeros((K, len(self.prices.symbols)), dtype=bool)
+        self.ledger = _Ledger()
+        self.equity = np.full((K, self.T), np.nan)
+        self.cash_hist = np.full((K, self.T), np.nan)
+        self.n_pos = np.zeros((K, self.T), dtype=np.int64)
+        self._flag = np.zeros_like(self.held)
+
+    def _in_opening_order(self, ks: np.ndarray, slots: np.ndarray):
+        order = np.lexsort((self.seq[ks, slots], ks))
+        return ks[order], slots[order]
+
+    def _slot_prices(self, t: int) -> np.ndarray:
+        """(K, P) close of every slot on day t (NaN for empty slots / no price)."""
+        if self._rows[t] < 0:
+            return np.full(self.active.shape, np.nan)
+        px = self._close[self._rows[t]][self.sym]
+        return np.where(self.active, px, np.nan)
+
+    # ------------------------------------------------------------------ #
+    # daily steps
+    # ------------------------------------------------------------------ #
+    def run(self):
+        """
+        Run all K configurations over the shared calendar.
+        """
+        for t in range(self.T):
+            self._close_invalid_positions(t)
+            self._open_new_positions(t)
+            self._record_daily_state(t)
+
+    def _close_invalid_positions(self, t: int):
+        if not self.active.any():
+            return
+        flag, (lk, lc), (sk, sc) = self._flag, self._long[t], self._short[t]
+        flag[lk, lc] = True
+        in_long = flag[np.arange(self.K)[:, None], self.sym]
+        flag[lk, lc] = False
+        flag[sk, sc] = True
+        in_short = flag[np.arange(self.K)[:, None], self.sym]
+        flag[sk, sc] = False
+
+        regime = self.regime[:, t]
+        long_bad = ~np.isin(regime, (1, 2, 0))[:, None]
+        short_bad = ~np.isin(regime, (-1, -2, 0))[:, None]
+        invalid = self.active & (
+            ((self.side == 1) & (~in_long | long_bad)) |
+            ((self.side == -1) & (~in_short | short_bad))
+        )
+        px = self._slot_prices(t)
+        ks, slots = self._in_opening_order(*np.nonzero(invalid & ~np.isnan(px)))
+        if not len(ks):
+            return
+
+        exit_px, qty, entry = px[ks, slots], self.qty[ks, slots], self.entry_price[ks, slots]
+        side = self.side[ks, slots]
+        pnl = np.where(side == 1, (exit_px - entry) * qty, (entry - exit_px) * qty)
+        np.add.at(self.cash, ks, qty * exit_px + pnl)
+
+        self.ledger.append(k=ks, sym=self.sym[ks, slots], side=side,
+                           entry_t=self.entry_t[ks, slots], entry_price=entry, qty=qty,
+                           exit_t=np.full(len(ks), t), exit_price=exit_px, pnl=pnl)
+        self._release(ks, slots)
+
+    def _open_new_positions(self, t: int):
+        avail = self.max_positions - self.active.sum(axis=1)
+
+        def candidates(ks, cols, room):
+            keep = ~self.held[ks, cols]
+            ks, cols = ks[keep], cols[keep]
+            rank = np.arange(len(ks)) - np.searchsorted(ks, ks, "left")
+            take = rank < room[ks]
+            return ks[take], cols[take]
+
+        lk, lc = candidates(*self._long[t], avail)
+        sk, sc = candidates(*self._short[t], avail - np.bincount(lk, minlength=self.K))
+        ks = np.concatenate((lk, sk))
+        cols = np.concatenate((lc, sc))
+        side = np.concatenate((np.ones(len(lk), np.int8), -np.ones(len(sk), np.int8)))
+        order = np.argsort(ks, kind="stable")          # per config: longs, then shorts
+        ks, cols, side = ks[order], cols[order], side[order]
+        if not len(ks) or self._rows[t] < 0:
+            return
+
+        price = self._close[self._rows[t]][cols]
+        ok = ~np.isnan(price) & (price > 0)
+        ks, cols, side, price = ks[ok], cols[ok], side[ok], price[ok]
+        if not len(ks):
+            return
+
+        # j-th opening of config k goes to its j-th free slot
+        n_new = np.bincount(ks, minlength=self.K)
+        free = ~self.active
+        fk, slots = np.nonzero(free & (np.cumsum(free, axis=1) <= n_new[:, None]))
+        ordinal = np.arange(len(ks)) - np.searchsorted(ks, ks, "left")
+
+        qty = self.fixed_size / price
+        self.active[fk, slots] = True
+        self.sym[fk, slots] = cols
+        self.side[fk, slots] = side
+        self.qty[fk, slots] = qty
+        self.entry_price[fk, slots] = price
+        self.entry_t[fk, slots] = t
+        self.peak[fk, slots] = price
+        self.stop[fk, slots] = np.where(side == 1, price * (1 - self.HARD_SL_PCT),
+                                        price * (1 + self.HARD_SL_PCT))
+        self.seq[fk, slots] = self.next_seq[ks] + ordinal
+        self.next_seq += n_new
+        self.held[ks, cols] = True
+        np.add.at(self.cash, ks, -(qty * price))
+
+        if self.stop_loss:  # SL_Simulator logs the opening record up front
+            self.open_rec[fk, slots] = self.ledger.append(
+                k=ks, sym=cols, side=side, entry_t=np.full(len(ks), t),
+                entry_price=price, qty=qty)
+
+    def _record_daily_state(self, t: int):
+        px = self._slot_prices(t)
+        valid = ~np.isnan(px)
+        hit = np.zeros_like(valid)
+
+        if self.stop_loss:
+            long = self.side == 1
+            peak, stop = self.peak, self.stop
+            with np.errstate(invalid="ignore"):
+                up = valid & np.where(long, px > peak, px < peak)
+                trail = np.where(long, px - (px - peak) * self.TSL_FACTOR,
+                                 px + (peak - px) * self.TSL_FACTOR)
+                new_stop = np.where(long, np.maximum(stop, trail), np.minimum(stop, trail))
+                np.copyto(self.stop, new_stop, where=up)
+                np.copyto(self.peak, px, where=up)
+                hit = valid & np.where(long, px <= self.stop, px >= self.stop)
+
+        # equity: cash + position values, summed per config in opening order
+        values = np.where(self.side == 1, px * self.qty, (2 * self.entry_price - px) * self.qty)
+        values = np.where(valid, values, 0.0)
+        order = np.argsort(np.where(self.active, self.seq, np.iinfo(np.int64).max), axis=1)
+        values = np.take_along_axis(values, order, axis=1)
+        self.equity[:, t] = np.add.accumulate(
+            np.concatenate((self.cash[:, None], values), axis=1), axis=1)[:, -1]
+
+        ks, slots = self._in_opening_order(*np.nonzero(hit))
+        if len(ks):
+            exit_px, qty, entry = px[ks, slots], self.qty[ks, slots], self.entry_price[ks, slots]
+            long = self.side[ks, slots] == 1
+            pnl = np.where(long, (exit_px - entry) * qty, (entry - exit_px) * qty)
+            np.add.at(self.cash, ks, np.where(long, exit_px * qty, qty * (2 * entry - exit_px)))
+
+            rec = self.open_rec[ks, slots]
+            cols = self.ledger.cols
+            cols["exit_t"][rec] = t
+            cols["exit_price"][rec] = exit_px
+            cols["pnl"][rec] = pnl
+            cols["sl_hit"][rec] = True
+            self._release(ks, slots)
+
+        self.cash_hist[:, t] = self.cash
+        self.n_pos[:, t] = self.active.sum(axis=1)
+
+    def _release(self, ks: np.ndarray, slots: np.ndarray):
+        self.held[ks, self.sym[ks, slots]] = False
+        self.active[ks, slots] = False
+        self.open_rec[ks, slots] = -1
+
+    # ------------------------------------------------------------------ #
+    # results
+    # ------------------------------------------------------------------ #
+    def results(self) -> List[pd.DataFrame]:
+        """
+        K equity curves, each in the BacktestSimulator.results() layout.
+        """
+        out = []
+        for k in range(self.K):
+            df = pd.DataFrame({"date": self.dates, "cash": self.cash_hist[k],
+                               "positions": self.n_pos[k], "equity": self.equity[k]}).set_index("date")
+            df["daily_return"] = df["equity"].pct_change().fillna(0)
+            out.append(df)
+        return out
+
+    def trade_logs(self) -> List[pd.DataFrame]:
+        """
+        K trade logs with the columns (and record order) of ``pd.DataFrame(sim.trades)``.
+        Open records have NaT / NaN exit fields.
+        """
+        led = self.ledger.view()
+        exit_t = led["exit_t"]
+        frame = pd.DataFrame({
+            "symbol": self.prices.symbols[led["sym"]],
+            "side": np.where(led["side"] == 1, "long", "short"),
+            "entry_date": self.dates[led["entry_t"]],
+            "entry_price": led["entry_price"],
+            "qty": led["qty"],
+            "exit_date": pd.DatetimeIndex(np.where(exit_t >= 0, self.dates[np.maximum(exit_t, 0)],
+                                                   np.datetime64("NaT"))),
+            "exit_price": led["exit_price"],
+            "pnl": led["pnl"],
+            "sl_hit": led["sl_hit"],
+        })
+        return [frame[led["k"] == k].reset_index(drop=True) for k in range(self.K)]
+
+
+__all__: List[str] = ["MultiConfigSimulator"]
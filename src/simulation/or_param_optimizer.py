@@ -31,7 +31,7 @@ from typing import Dict, List, Tuple
 
 import pandas as pd
 
-from simulation.or_backtest_engine import generate_signal_calendar
+from simulation.or_backtest_engine import SignalCube, generate_signal_cube
 from simulation.or_backtest_simulator import BacktestSimulator
 from simulation.or_performance_analyzer import PerformanceAnalyzer
 
@@ -80,6 +80,7 @@ class ParamOptimizer:
 
         self.train_results: pd.DataFrame | None = None
         self.val_results: pd.DataFrame | None = None
+        self._cubes: Dict[Tuple[str, str], SignalCube] = {}
 
     # ------------------------------------------------------------------- #
     # public API
@@ -149,15 +150,16 @@ class ParamOptimizer:
     # ------------------------------------------------------------------- #
     # helper
     # ------------------------------------------------------------------- #
+    def _cube(self, span: Tuple[str, str]) -> SignalCube:
+        """One signal cube per span – every grid config is extracted from it."""
+        if span not in self._cubes:
+            self._cubes[span] = generate_signal_cube(
+                span[0], span[1], self.WINDOWS, self.BETA_UP_TH, self.BETA_DN_TH)
+        return self._cubes[span]
+
     def _backtest(self, p: ParamSet, span: Tuple[str, str]) -> Dict:
         """Run signals + simulation + analysis for a given ParamSet & span."""
-        sigs = generate_signal_calendar(
-            start_date=span[0],
-            end_date=span[1],
-            beta_window=p.beta_window,
-            beta_up_threshold=p.beta_up_th,
-            beta_down_threshold=p.beta_dn_th,
-        )
+        sigs = self._cube(span).signal_calendar(p.beta_window, p.beta_up_th, p.beta_dn_th)
 
         sim = BacktestSimulator(
             sigs,
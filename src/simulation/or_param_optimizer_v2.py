@@ -8,6 +8,7 @@ Param Optimizer v2  ––  *FULL grid, parallel*
     – דו-בטא              – Look-back 1-30
     – Hard-SL 3 %         – Trailing-SL 0.8
 • מדפיס TOP-N (Training)  ואז Validation.
+• תוצאות נשמרות ב-data_cache/eval_cache.sqlite – ריצה חוזרת מחזירה אותן מיד.
 
 הרצה:
 > python -m simulation.or_param_optimizer_v2_parallel
@@ -17,14 +18,16 @@ from __future__ import annotations
 import itertools, os
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import List, Dict, Tuple, DefaultDict
+from typing import List, Dict, Tuple
 
 import numpy as np
 import pandas as pd
 
-from simulation.or_backtest_engine import generate_signal_calendar
 from simulation.or_backtest_simulator import BacktestSimulator
+from simulation.or_eval_cache import EvalCache
 from simulation.or_performance_analyzer import PerformanceAnalyzer
+from simulation.or_shared_data import attach_market_data, publish_market_data
+from simulation.or_signal_persistence import dual_beta_calendar
 
 # ---------------------------------------------------------------------------#
 # CONFIG                                                                      #
@@ -42,6 +45,11 @@ TH_UP_LIST    = [1.05, 1.10, 1.20]
 TH_DN_LO_LIST = [0.90, 0.85]
 MIN_SIGNAL_DAYS = list(range(1, 31))          # 1-30
 
+USE_EVAL_CACHE = True   # data_cache/eval_cache.sqlite
+CACHE_EQUITY   = False
+USE_SHARED_DATA = True  # workers mmap one published panel instead of loading tables
+LOOKBACK = "calendar"   # min_days counted in calendar or "trading" days
+
 # ---------------------------------------------------------------------------#
 @dataclass(frozen=True)
 class ParamSet:
@@ -106,35 +114,36 @@ class SL_Simulator(BacktestSimulator):
 
 # ---------------------------------------------------------------------------#
 def build_signals(start:str,end:str,p:ParamSet)->pd.DataFrame:
-    raw=generate_signal_calendar(start,end,p.window,p.th_up,p.th_dn_lo)
-    # dual-beta + lookback (בדיוק כמו ב-v2 המקורית)
-    from pathlib import Path
-    betas=pd.read_parquet(Path("data_cache")/"beta_calculation.parquet")
-    betas=betas[(betas["date"]>=start)&(betas["date"]<=end)]
-    up, dn = f"beta_up_{p.window}", f"beta_down_{p.window}"
-    m_long,m_short=DefaultDict(list),DefaultDict(list)
-    for _,r in betas.iterrows():
-        if r[up]>=p.th_up and r[dn]<=p.th_dn_lo:
-            m_long[pd.Timestamp(r["date"])].append(r["symbol"])
-        if r[dn]>=p.th_up and r[up]<=p.th_dn_lo:
-            m_short[pd.Timestamp(r["date"])].append(r["symbol"])
-    longs,shorts=[],[]
-    for d in raw["date"]:
-        days=[d-pd.Timedelta(days=i) for i in range(p.min_days)]
-        l=set(m_long.get(d,[])); s=set(m_short.get(d,[]))
-        for past in days[1:]:
-            l&=set(m_long.get(past,[])); s&=set(m_short.get(past,[]))
-        longs.append(sorted(l)); shorts.append(sorted(s))
-    return pd.DataFrame(dict(date=raw["date"],long_symbols=longs,short_symbols=shorts))
+    # dual-beta + lookback (בדיוק כמו ב-v2 המקורית) – vectorised, see or_signal_persistence
+    return dual_beta_calendar(start,end,p.window,p.th_up,p.th_dn_lo,p.min_days,lookback=LOOKBACK)
 
 # ---------------------------------------------------------------------------#
+_eval_cache: EvalCache | None = None
+
+def _cache() -> EvalCache | None:
+    """Per-process EvalCache (None when USE_EVAL_CACHE is off)."""
+    global _eval_cache
+    if USE_EVAL_CACHE and _eval_cache is None:
+        _eval_cache = EvalCache()
+    return _eval_cache if USE_EVAL_CACHE else None
+
 def _evaluate(param:ParamSet,span:Tuple[str,str])->Dict:
+    cache=_cache()
+    if cache is not None:
+        key=cache.key(param,span,SL_Simulator,dict(
+            initial_cash=INITIAL_CASH,max_positions=MAX_POS,fixed_size=FIXED_SIZE,
+            hard_sl=SL_Simulator.HARD_SL_PCT,tsl=SL_Simulator.TSL_FACTOR,lookback=LOOKBACK))
+        if (hit:=cache.get(key)) is not None: return hit["metrics"]
     sigs=build_signals(span[0],span[1],param)
     sim=SL_Simulator(sigs,INITIAL_CASH,MAX_POS,FIXED_SIZE); sim.run()
     res=sim.results(); ana=PerformanceAnalyzer(res)
     sl_ratio=sum(t["sl_hit"] for t in sim.trades if t["exit_date"])/max(1,len(sim.trades))
-    return dict(Sharpe=ana.sharpe_ratio(),CAGR=ana.cagr(),
-                DD=ana.max_drawdown(),SL_ratio=sl_ratio)
+    metrics=dict(Sharpe=ana.sharpe_ratio(),CAGR=ana.cagr(),
+                 DD=ana.max_drawdown(),SL_ratio=sl_ratio)
+    if cache is not None:
+        cache.put(key,metrics,params=param,span=span,simulator=SL_Simulator,
+                  equity=res if CACHE_EQUITY else None)
+    return metrics
 
 # ---------------------------------------------------------------------------#
 def _worker(args):
@@ -153,8 +162,14 @@ def run_grid() -> None:
 
     print(f"💡 Running FULL grid ({len(grid)} combos) in parallel …")
 
+    pool_init = {}
+    if USE_SHARED_DATA:
+        shared_path = publish_market_data(BETA_WINDOWS)
+        attach_market_data(shared_path)
+        pool_init = dict(initializer=attach_market_data, initargs=(str(shared_path),))
+
     # Training phase
-    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), **pool_init) as ex:
         futures = [ex.submit(_worker, (p, TRAIN_SPAN)) for p in grid]
         train_rows = []
         for fut in as_completed(futures):
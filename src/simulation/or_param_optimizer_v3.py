@@ -7,22 +7,34 @@ Param Optimizer v3  ––  *Coarse grid + Quick-Reject, parallel*
 • רץ במקביל על כל הליבות
 • מדפיס TOP-N + Validation כמו v2.
 
+• Checkpoints: כל תוצאה נרשמת ל-outputs/checkpoints/v3; `--resume` מדלג על
+  ParamSets שהסתיימו וממשיך סימולציות חלקיות מהתאריך האחרון שנשמר
+  (גם ב-`--search halving|bayes` – הערכות שנרשמו לא רצות שוב).
+• Eval cache: תוצאות נשמרות ב-data_cache/eval_cache.sqlite (ParamSet, span,
+  סימולטור, גרסת דאטה) – ריצה חוזרת של אותו grid מחזירה אותן מיד.
+
 הרצה:
 > python -m simulation.or_param_optimizer_v3_parallel
+> python -m simulation.or_param_optimizer_v3 --resume
+> python -m simulation.or_param_optimizer_v3 --search halving --budget 120
 """
 from __future__ import annotations
-import itertools, os
+import argparse, itertools, os
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from typing import Dict, List, Tuple
 import pandas as pd
-from collections import defaultdict
 from pathlib import Path
 import numpy as np
 
-from simulation.or_backtest_engine import generate_signal_calendar
+from simulation.or_checkpoint import CHECKPOINT_DIR, CheckpointStore, CheckpointedExecutor
+from simulation.or_eval_cache import EvalCache
 from simulation.or_sl_simulator import SL_Simulator
+from simulation.or_multi_simulator import MultiConfigSimulator
+from simulation.or_param_search import SearchSpace, model_based_search, successive_halving
 from simulation.or_performance_analyzer import PerformanceAnalyzer
+from simulation.or_shared_data import attach_market_data, publish_market_data
+from simulation.or_signal_persistence import dual_beta_calendar
 
 # ---------- CONFIG ---------------------------------------------------------#
 TRAIN_SPAN=("2014-01-01","2019-12-31"); VAL_SPAN=("2020-01-01","2022-12-31")
@@ -31,6 +43,9 @@ INITIAL_CASH=1_000_000; MAX_POS,FIXED_SIZE=10,10_000; TOP_N=10
 # MIN_SIGNAL=[1,3,5,10,20,30]; MIN_TRADES=50
 BETA_WINDOWS=[30,60,90]; TH_UP=[1.3, 1.4, 1.5]; TH_DN_LO=[0.9, 0.8]
 MIN_SIGNAL=[3,5,10]; MIN_TRADES=50
+USE_EVAL_CACHE=True; CACHE_EQUITY=False   # data_cache/eval_cache.sqlite
+USE_SHARED_DATA=True                       # workers mmap one published panel
+LOOKBACK="calendar"                        # min_days counted in calendar or "trading" days
 
 
 @dataclass(frozen=True)
@@ -39,63 +54,130 @@ class ParamSet:
 
 # ---------- Signal builder (dual-beta + look-back) -------------------------#
 def build_signals(start:str,end:str,p:ParamSet)->pd.DataFrame:
-    raw=generate_signal_calendar(start,end,p.window,p.th_up,p.th_dn_lo)
-    betas=pd.read_parquet(Path("data_cache")/"beta_calculation.parquet")
-    betas=betas[(betas["date"]>=start)&(betas["date"]<=end)]
-    up,dn=f"beta_up_{p.window}",f"beta_down_{p.window}"
-    mL,mS=defaultdict(list),defaultdict(list)
-    for _,r in betas.iterrows():
-        if r[up]>=p.th_up and r[dn]<=p.th_dn_lo: mL[pd.Timestamp(r["date"])].append(r["symbol"])
-        if r[dn]>=p.th_up and r[up]<=p.th_dn_lo: mS[pd.Timestamp(r["date"])].append(r["symbol"])
-    L,S=[],[]
-    for d in raw["date"]:
-        dates=[d-pd.Timedelta(days=i) for i in range(p.min_days)]
-        ls=set(mL.get(d,[])); ss=set(mS.get(d,[]))
-        for past in dates[1:]:
-            ls&=set(mL.get(past,[])); ss&=set(mS.get(past,[]))
-        L.append(sorted(ls)); S.append(sorted(ss))
-    return pd.DataFrame(dict(date=raw["date"],long_symbols=L,short_symbols=S))
+    """Dual-beta signals that held for p.min_days days (vectorised, see or_signal_persistence)."""
+    return dual_beta_calendar(start,end,p.window,p.th_up,p.th_dn_lo,p.min_days,lookback=LOOKBACK)
+
+# ---------- evaluation cache ----------------------------------------------#
+_SIM_SETTINGS=dict(initial_cash=INITIAL_CASH,max_positions=MAX_POS,fixed_size=FIXED_SIZE,
+                   hard_sl=SL_Simulator.HARD_SL_PCT,tsl=SL_Simulator.TSL_FACTOR,min_trades=MIN_TRADES,
+                   lookback=LOOKBACK)
+_eval_cache:EvalCache|None=None
+
+def _cache()->EvalCache|None:
+    """Per-process EvalCache (None when USE_EVAL_CACHE is off)."""
+    global _eval_cache
+    if USE_EVAL_CACHE and _eval_cache is None: _eval_cache=EvalCache()
+    return _eval_cache if USE_EVAL_CACHE else None
+
+def _metrics(res:pd.DataFrame,trades:pd.DataFrame)->Dict:
+    ana=PerformanceAnalyzer(res)
+    sl_ratio=trades.loc[trades["exit_date"].notna(),"sl_hit"].sum()/max(1,len(trades))
+    return dict(Sharpe=ana.sharpe_ratio(),CAGR=ana.cagr(),DD=ana.max_drawdown(),SL_ratio=sl_ratio)
+
+def _too_few_trades(sigs:pd.DataFrame,span)->bool:
+    return span==TRAIN_SPAN and sigs["long_symbols"].str.len().sum()+sigs["short_symbols"].str.len().sum()<MIN_TRADES
 
 # ---------- evaluation helper ---------------------------------------------#
 def _evaluate(p:ParamSet,span)->Dict|None:
+    cache=_cache()
+    if cache is not None:
+        key=cache.key(p,span,SL_Simulator,_SIM_SETTINGS)
+        if (hit:=cache.get(key)) is not None: return hit["metrics"]
     sigs=build_signals(span[0],span[1],p)
-    if span==TRAIN_SPAN:
-        trades=sigs["long_symbols"].str.len().sum()+sigs["short_symbols"].str.len().sum()
-        if trades<MIN_TRADES: return None
-    sim=SL_Simulator(sigs,INITIAL_CASH,MAX_POS,FIXED_SIZE); sim.run()
-    res=sim.results(); ana=PerformanceAnalyzer(res)
-    sl_ratio=sum(t["sl_hit"]for t in sim.trades if t["exit_date"])/max(1,len(sim.trades))
-    return dict(Sharpe=ana.sharpe_ratio(),CAGR=ana.cagr(),DD=ana.max_drawdown(),SL_ratio=sl_ratio)
+    m=res=None
+    if not _too_few_trades(sigs,span):
+        sim=SL_Simulator(sigs,INITIAL_CASH,MAX_POS,FIXED_SIZE); sim.run()
+        res=sim.results(); m=_metrics(res,sim.trades.to_frame())
+    if cache is not None:
+        cache.put(key,m,params=p,span=span,simulator=SL_Simulator,equity=res if CACHE_EQUITY else None)
+    return m
+
+def _evaluate_batch(params:List[ParamSet],span)->List[Dict|None]:
+    """Same metrics as _evaluate for many ParamSets – one MultiConfigSimulator pass."""
+    cache=_cache()
+    out:List[Dict|None]=[None]*len(params)
+    keys=[cache.key(p,span,MultiConfigSimulator,_SIM_SETTINGS) if cache is not None else None for p in params]
+    todo=[]
+    for i,k in enumerate(keys):
+        hit=cache.get(k) if cache is not None else None
+        if hit is None: todo.append(i)
+        else: out[i]=hit["metrics"]
+    sigs={i:build_signals(span[0],span[1],params[i]) for i in todo}
+    keep=[i for i in todo if not _too_few_trades(sigs[i],span)]
+    curves={}
+    if keep:
+        sim=MultiConfigSimulator.from_calendars([sigs[i] for i in keep],initial_cash=INITIAL_CASH,
+                                                max_positions=MAX_POS,fixed_size=FIXED_SIZE)
+        sim.run()
+        for i,res,trades in zip(keep,sim.results(),sim.trade_logs()):
+            out[i]=_metrics(res,trades); curves[i]=res
+    if cache is not None:
+        for i in todo:
+            cache.put(keys[i],out[i],params=params[i],span=span,simulator=MultiConfigSimulator,
+                      equity=curves.get(i) if CACHE_EQUITY else None)
+    return out
 
 # ---------- Parallel grid --------------------------------------------------#
-def run_grid():
-    grid = [
-        ParamSet(w, u, 0.9, md)
-        for w, u, md in itertools.product(BETA_WINDOWS, TH_UP, MIN_SIGNAL)
-    ]
-    print(f"⚡ Running COARSE grid ({len(grid)} combos) w/ quick-reject …")
+def _from_record(rec:Dict)->Dict|None:
+    return None if rec["result"] is None else dict(params=ParamSet(**rec["params"]),**rec["result"])
 
-    # Training phase (parallel)
-    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
-        fut = [ex.submit(_evaluate, p, TRAIN_SPAN) for p in grid]
-        train = [
-            dict(params=p, **m)
-            for p, m in ((p, res.result()) for p, res in zip(grid, fut)) if m
-        ]
+def _train_search(search:str,budget:int,seed:int,store:CheckpointStore,pool_init:Dict)->pd.DataFrame:
+    """Training phase via a budgeted search driver instead of the full grid (checkpointed like it)."""
+    space=SearchSpace(ParamSet,window=BETA_WINDOWS,th_up=TH_UP,th_dn_lo=TH_DN_LO,min_days=MIN_SIGNAL)
+    print(f"🔎 {search} search over {space}, budget {budget}")
+    n_workers=os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=n_workers, **pool_init) as pool:
+        ex=CheckpointedExecutor(pool,store,"train")  # same seed + replayed results → same proposals
+        if search=="halving":
+            res=successive_halving(_evaluate,space,TRAIN_SPAN,budget=budget,executor=ex,seed=seed)
+        else:
+            res=model_based_search(_evaluate,space,TRAIN_SPAN,budget=budget,batch_size=n_workers,
+                                   executor=ex,seed=seed)
+    res.history.to_csv("search_history_v3.csv",index=False)
+    print(f"   {res.evaluations} evaluations spent ({ex.replayed} from checkpoints)")
+    return res.table
+
+def _train_grid(grid:List[ParamSet],store:CheckpointStore,resume:bool,pool_init:Dict)->pd.DataFrame:
+    print(f"⚡ Running COARSE grid ({len(grid)} combos) w/ quick-reject …")
+    # Training phase (parallel) – each worker simulates a chunk of the grid in one pass;
+    # only this (parent) process writes the checkpoint log, as chunks complete
+    done = store.done("train")
+    pending = [p for p in grid if store.key(p, TRAIN_SPAN) not in done]
+    if resume:
+        print(f"↩️  resume: {len(grid) - len(pending)} finished, {len(pending)} to go")
+    train = [r for p in grid if (rec := done.get(store.key(p, TRAIN_SPAN)))
+             and (r := _from_record(rec))]
+    if pending:
+        n_workers = min(len(pending), os.cpu_count() or 1)
+        n_chunks = min(len(pending), 2 * n_workers)  # smaller chunks → finer resume points
+        chunks = [pending[i::n_chunks] for i in range(n_chunks)]
+        with ProcessPoolExecutor(max_workers=n_workers, **pool_init) as ex:
+            fut = {ex.submit(_evaluate_batch, chunk, TRAIN_SPAN): chunk for chunk in chunks}
+            for f in as_completed(fut):
+                for p, m in zip(fut[f], f.result()):
+                    store.record("train", store.key(p, TRAIN_SPAN), p, m)
+                    if m: train.append(dict(params=p, **m))
 
-    df_tr = (
+    return (
         pd.DataFrame(train)
         .dropna(subset=["Sharpe"])
         .sort_values("Sharpe", ascending=False)
         .reset_index(drop=True)
     )
-    print(f"\n— Train top-{TOP_N} —")
-    print(df_tr.head(TOP_N)[["params", "Sharpe", "CAGR", "DD", "SL_ratio"]])
 
-    # Validation phase (parallel)
+def _validate_and_rerun(df_tr:pd.DataFrame,store:CheckpointStore)->None:
+    # Validation phase
     best = df_tr.head(TOP_N)["params"]
-    with ProcessPoolExecutor(max_workers=min(TOP_N, os.cpu_count())) as ex:
-        val = [dict(params=p, **_evaluate(p, VAL_SPAN)) for p in best]
+    done = store.done("val")
+    val = []
+    for p in best:
+        key = store.key(p, VAL_SPAN)
+        if key in done:
+            m = done[key]["result"]
+        else:
+            m = _evaluate(p, VAL_SPAN)
+            store.record("val", key, p, m)
+        val.append(dict(params=p, **m))
 
     df_val = (
         pd.DataFrame(val)
@@ -126,10 +208,10 @@ def run_grid():
 
         # Run on full span: 2014–2022
         sigs = build_signals("2014-01-01", "2022-12-31", p)
-        sim = SL_Simulator(sigs, INITIAL_CASH, MAX_POS, FIXED_SIZE)
-        sim.run()
+        sim = store.run_sim(store.key(p, ("2014-01-01", "2022-12-31")),
+                            lambda: SL_Simulator(sigs, INITIAL_CASH, MAX_POS, FIXED_SIZE))
 
-        trades = pd.DataFrame(sim.trades)
+        trades = sim.trades.to_frame()
         equity = sim.results()
         pa = PerformanceAnalyzer(equity)
 
@@ -137,14 +219,55 @@ def run_grid():
         path.mkdir(parents=True, exist_ok=True)
 
         trades.to_csv(path / "trades.csv", index=False)
+        trades.to_parquet(path / "trades.parquet", index=False)
         equity.to_csv(path / "equity.csv", index=False)
 
         print(pa.summarize())
 
+def run_grid(resume:bool=False,checkpoint_dir:str|Path=CHECKPOINT_DIR,
+             search:str="grid",budget:int=60,seed:int=0):
+    """
+    Train → validation → best-config re-runs.
+
+    Args:
+        resume (bool): Continue from the checkpoints of an interrupted run.
+        checkpoint_dir (str | Path): Where checkpoints are kept.
+        search (str): "grid" (full coarse grid), "halving" (successive halving) or
+            "bayes" (model-based) for the training phase.
+        budget (int): Evaluations for the "halving" / "bayes" searches.
+        seed (int): Random seed of the searches.
+    """
+    store = CheckpointStore("v3", checkpoint_dir, resume=resume)
+    pool_init = {}
+    if USE_SHARED_DATA:
+        shared_path = publish_market_data(BETA_WINDOWS)
+        attach_market_data(shared_path)  # parent too (validation / best-config re-runs)
+        pool_init = dict(initializer=attach_market_data, initargs=(str(shared_path),))
 
+    if search != "grid":
+        # searches replay finished evaluations from the checkpoint log on --resume
+        df_tr = _train_search(search, budget, seed, store, pool_init)
+    else:
+        grid = [
+            ParamSet(w, u, 0.9, md)
+            for w, u, md in itertools.product(BETA_WINDOWS, TH_UP, MIN_SIGNAL)
+        ]
+        df_tr = _train_grid(grid, store, resume, pool_init)
+    print(f"\n— Train top-{TOP_N} —")
+    print(df_tr.head(TOP_N)[["params", "Sharpe", "CAGR", "DD", "SL_ratio"]])
+    _validate_and_rerun(df_tr, store)
 
 
 # ---------- CLI ------------------------------------------------------------#
 if __name__=="__main__":
-    from concurrent.futures import ProcessPoolExecutor
-    run_grid()
+    ap=argparse.ArgumentParser(description="Coarse parallel grid search (v3).")
+    ap.add_argument("--resume",action="store_true",
+                    help="skip finished ParamSets and continue partial simulations")
+    ap.add_argument("--checkpoint-dir",default=str(CHECKPOINT_DIR))
+    ap.add_argument("--search",choices=["grid","halving","bayes"],default="grid",
+                    help="training-phase driver (halving / bayes spend --budget evaluations)")
+    ap.add_argument("--budget",type=int,default=60)
+    ap.add_argument("--seed",type=int,default=0)
+    args=ap.parse_args()
+    run_grid(resume=args.resume,checkpoint_dir=args.checkpoint_dir,
+             search=args.search,budget=args.budget,seed=args.seed)
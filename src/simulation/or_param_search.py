@@ -0,0 +1,327 @@
+"""simulation/or_param_search.py – budgeted search drivers for the optimizers
+
+The optimizers enumerate a full ``itertools.product`` grid. Two drivers
+here spend a fixed number of evaluations instead, on the same contract:
+
+    evaluate(ParamSet, (start, end)) -> Dict | None   # None = quick-rejected
+
+*  **successive_halving** – evaluate many random configs on a short prefix
+   of the span, keep the best 1/eta, re-evaluate them on a longer prefix …
+   until the survivors run on the full span.
+*  **model_based_search** – a small Tree-structured Parzen Estimator over
+   the discrete dimensions: after a random warm-up, sample candidates from
+   the value frequencies of the best configs and pick those most likely to
+   be good rather than bad.
+
+Both return a ``SearchResult`` whose ``table`` has the shape of the grid
+results (``params, Sharpe, CAGR, DD, SL_ratio`` sorted by the metric) for
+the full span only, plus the ``history`` of every evaluation.
+
+    >>> space = SearchSpace(ParamSet, window=[30, 60, 90], th_up=[1.3, 1.4], ...)
+    >>> res = successive_halving(_evaluate, space, TRAIN_SPAN, budget=60, executor=ex)
+    >>> res.table.head(10)
+"""
+from __future__ import annotations
+
+import itertools
+import math
+from concurrent.futures import Executor
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+Span = Tuple[str, str]
+Evaluate = Callable[[Any, Span], Optional[Dict]]
+
+
+class SearchSpace:
+    """
+    Discrete values per field of a ParamSet dataclass.
+
+    Args:
+        param_cls (type): The ParamSet dataclass to instantiate.
+        **dims: Field name → candidate values (every field must be given).
+
+    Raises:
+        ValueError: If the dimensions do not match the dataclass fields.
+    """
+
+    def __init__(self, param_cls: type, **dims: Sequence):
+        names = [f.name for f in fields(param_cls)]
+        if sorted(dims) != sorted(names):
+            raise ValueError(f"Search dimensions {sorted(dims)} do not match "
+                             f"{param_cls.__name__} fields {sorted(names)}")
+        if any(len(v) == 0 for v in dims.values()):
+            raise ValueError("Every search dimension needs at least one value")
+        self.param_cls = param_cls
+        self.names = names
+        self.values: Dict[str, List] = {n: list(dims[n]) for n in names}
+
+    @property
+    def size(self) -> int:
+        return math.prod(len(v) for v in self.values.values())
+
+    def make(self, index: Sequence[int]) -> Any:
+        """ParamSet from one value index per dimension."""
+        return self.param_cls(**{n: self.values[n][i] for n, i in zip(self.names, index)})
+
+    def index(self, params: Any) -> Tuple[int, ...]:
+        return tuple(self.values[n].index(getattr(params, n)) for n in self.names)
+
+    def grid(self) -> List[Any]:
+        """Every combination (what the grid optimizers evaluate)."""
+        return [self.make(ix) for ix in itertools.product(*(range(len(self.values[n]))
+                                                            for n in self.names))]
+
+    def sample(self, rng: np.random.Generator, n: int, exclude=()) -> List[Any]:
+        """Up to *n* distinct random configs not in *exclude*."""
+        seen = set(exclude)
+        free = self.size - len(seen)
+        if n >= free:  # small space – enumerate the rest
+            rest = [p for p in self.grid() if p not in seen]
+            return [rest[i] for i in rng.permutation(len(rest))[:n]]
+        out = []
+        while len(out) < n:
+            p = self.make([rng.integers(len(self.values[name])) for name in self.names])
+            if p not in seen:
+                seen.add(p)
+                out.append(p)
+        return out
+
+    def __repr__(self) -> str:
+        dims = ", ".join(f"{n}={len(v)}" for n, v in self.values.items())
+        return f"SearchSpace({self.param_cls.__name__}: {dims}; {self.size} configs)"
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """
+    Outcome of a search.
+
+    Attributes:
+        table (pd.DataFrame): Full-span results, same columns as the grid tables.
+        history (pd.DataFrame): Every evaluation (adds rung / start / end columns).
+        evaluations (int): Number of evaluate() calls spent.
+    """
+
+    table: pd.DataFrame
+    history: pd.DataFrame
+    evaluations: int
+
+
+# ---------------------------------------------------------------------------
+# helpers
+# ---------------------------------------------------------------------------
+
+def _score(metrics: Optional[Dict], metric: str) -> float:
+    value = None if metrics is None else metrics.get(metric)
+    return -np.inf if value is None or np.isnan(value) else float(value)
+
+
+def _evaluate_all(evaluate: Evaluate, params: List, span: Span,
+                  executor: Optional[Executor]) -> List[Optional[Dict]]:
+    if executor is None:
+        return [evaluate(p, span) for p in params]
+    return list(executor.map(evaluate, params, [span] * len(params)))
+
+
+def _table(rows: List[Dict], metric: str) -> pd.DataFrame:
+    rows = [r for r in rows if r["metrics"] is not None]
+    df = pd.DataFrame([dict(params=r["params"], **r["metrics"]) for r in rows])
+    if df.empty:
+        return pd.DataFrame(columns=["params", "Sharpe", "CAGR", "DD", "SL_ratio"])
+    return (df.dropna(subset=[metric])
+              .sort_values(metric, ascending=False)
+              .reset_index(drop=True))
+
+
+def _history(rows: List[Dict]) -> pd.DataFrame:
+    return pd.DataFrame([dict(rung=r["rung"], start=r["span"][0], end=r["span"][1],
+                              params=r["params"], **(r["metrics"] or {})) for r in rows])
+
+
+def _rung_sizes(n0: int, eta: int, n_rungs: int) -> List[int]:
+    sizes = [n0]
+    for _ in range(n_rungs - 1):
+        sizes.append(max(1, math.ceil(sizes[-1] / eta)))
+    return sizes
+
+
+def rung_spans(span: Span, n_rungs: int, eta: float = 3) -> List[Span]:
+    """
+    Nested prefixes of *span*: rung i covers 1/eta**(n_rungs-1-i) of it,
+    the last rung is *span* itself.
+    """
+    start, end = pd.Timestamp(span[0]), pd.Timestamp(span[1])
+    out = []
+    for i in range(n_rungs - 1):
+        cut = start + (end - start) / eta ** (n_rungs - 1 - i)
+        out.append((span[0], cut.strftime("%Y-%m-%d")))
+    return out + [tuple(span)]
+
+
+# ---------------------------------------------------------------------------
+# drivers
+# ---------------------------------------------------------------------------
+
+def successive_halving(
+    evaluate: Evaluate,
+    space: SearchSpace,
+    span: Span,
+    *,
+    budget: int,
+    eta: int = 3,
+    n_rungs: int = 3,
+    metric: str = "Sharpe",
+    executor: Optional[Executor] = None,
+    seed: int = 0,
+) -> SearchResult:
+    """
+    Successive halving over nested prefixes of *span*.
+
+    Args:
+        evaluate (Callable): ``evaluate(params, span) -> metrics | None``.
+        space (SearchSpace): Candidate configurations.
+        span (Span): Full (start, end); the last rung runs on exactly this span.
+        budget (int): Total number of evaluate() calls (all rungs together;
+            at least one config runs per rung).
+        eta (int): Keep the best 1/eta per rung; rung spans grow by eta.
+        n_rungs (int): Number of rungs (1 = random search on the full span).
+        metric (str): Metric to rank by (higher is better).
+        executor (Optional[Executor]): Runs each rung's evaluations in parallel.
+        seed (int): Random seed for the initial sample.
+
+    Returns:
+        SearchResult: Full-span table of the last rung plus the history.
+
+    Raises:
+        ValueError: If *budget*, *eta* or *n_rungs* are not positive.
+    """
+    if budget < 1 or eta < 2 or n_rungs < 1:
+        raise ValueError("budget >= 1, eta >= 2 and n_rungs >= 1 required")
+    rng = np.random.default_rng(seed)
+    n0 = max(1, int(budget / sum(eta ** -i for i in range(n_rungs))))
+    while n0 > 1 and sum(_rung_sizes(n0, eta, n_rungs)) > budget:
+        n0 -= 1
+    survivors = space.sample(rng, n0)
+    print(f"🪜 successive halving: {len(survivors)} configs, {n_rungs} rungs, eta={eta}")
+
+    rows: List[Dict] = []
+    spent = 0
+    for rung, sub in enumerate(rung_spans(span, n_rungs, eta)):
+        results = _evaluate_all(evaluate, survivors, sub, executor)
+        spent += len(survivors)
+        rung_rows = [dict(rung=rung, span=sub, params=p, metrics=m)
+                     for p, m in zip(survivors, results)]
+        rows += rung_rows
+        best = max((_score(r["metrics"], metric) for r in rung_rows), default=-np.inf)
+        print(f"   rung {rung}: {len(survivors):4d} configs on {sub[0]} → {sub[1]}, "
+              f"best {metric}={best:.3f}")
+        if rung == n_rungs - 1:
+            break
+        keep = _rung_sizes(len(survivors), eta, 2)[1]
+        ranked = sorted(rung_rows, key=lambda r: _score(r["metrics"], metric), reverse=True)
+        survivors = [r["params"] for r in ranked[:keep]]
+
+    final = [r for r in rows if r["rung"] == n_rungs - 1]
+    return SearchResult(_table(final, metric), _history(rows), spent)
+
+
+def model_based_search(
+    evaluate: Evaluate,
+    space: SearchSpace,
+    span: Span,
+    *,
+    budget: int,
+    n_initial: Optional[int] = None,
+    batch_size: int = 1,
+    gamma: float = 0.25,
+    n_candidates: int = 64,
+    metric: str = "Sharpe",
+    executor: Optional[Executor] = None,
+    seed: int = 0,
+) -> SearchResult:
+    """
+    Tree-structured Parzen Estimator over the discrete search space.
+
+    Args:
+        evaluate (Callable): ``evaluate(params, span) -> metrics | None``.
+        space (SearchSpace): Candidate configurations.
+        span (Span): (start, end) every config is evaluated on.
+        budget (int): Total number of evaluate() calls.
+        n_initial (Optional[int]): Random warm-up evaluations (default budget // 4, ≥ 5).
+        batch_size (int): Proposals per round (match the executor's workers).
+        gamma (float): Fraction of evaluated configs treated as "good".
+        n_candidates (int): Candidates drawn from the good model per proposal.
+        metric (str): Metric to maximise.
+        executor (Optional[Executor]): Runs each batch in parallel.
+        seed (int): Random seed.
+
+    Returns:
+        SearchResult: Table of all evaluations (one span, so one rung).
+
+    Raises:
+        ValueError: If *budget* or *batch_size* are not positive.
+    """
+    if budget < 1 or batch_size < 1:
+        raise ValueError("budget >= 1 and batch_size >= 1 required")
+    rng = np.random.default_rng(seed)
+    budget = min(budget, space.size)
+    n_initial = min(budget, n_initial if n_initial is not None else max(5, budget // 4))
+    print(f"🎯 model-based search: budget {budget}, warm-up {n_initial}, batch {batch_size}")
+
+    rows: List[Dict] = []
+    batch = space.sample(rng, n_initial)
+    while batch:
+        for p, m in zip(batch, _evaluate_all(evaluate, batch, span, executor)):
+            rows.append(dict(rung=0, span=tuple(span), params=p, metrics=m))
+        remaining = budget - len(rows)
+        batch = _tpe_propose(space, rows, rng, min(batch_size, remaining),
+                             gamma, n_candidates, metric) if remaining > 0 else []
+
+    best = max((_score(r["metrics"], metric) for r in rows), default=-np.inf)
+    print(f"   {len(rows)} evaluations, best {metric}={best:.3f}")
+    return SearchResult(_table(rows, metric), _history(rows), len(rows))
+
+
+def _tpe_propose(space: SearchSpace, rows: List[Dict], rng: np.random.Generator,
+                 n: int, gamma: float, n_candidates: int, metric: str) -> List:
+    """Pick *n* unseen configs maximising l(x) / g(x) (good vs. bad density)."""
+    seen = {r["params"] for r in rows}
+    ranked = sorted(rows, key=lambda r: _score(r["metrics"], metric), reverse=True)
+    n_good = max(1, int(math.ceil(gamma * len(ranked))))
+    good = np.array([space.index(r["params"]) for r in ranked[:n_good]])
+    bad = np.array([space.index(r["params"]) for r in ranked[n_good:]]).reshape(-1, len(space.names))
+
+    # per-dimension categorical densities with a +1 (uniform) prior
+    dens = []
+    for d, name in enumerate(space.names):
+        k = len(space.values[name])
+        l_x = np.bincount(good[:, d], minlength=k) + 1.0
+        g_x = np.bincount(bad[:, d], minlength=k) + 1.0
+        dens.append((l_x / l_x.sum(), g_x / g_x.sum()))
+
+    cands = np.column_stack([rng.choice(len(l), size=n_candidates * n, p=l) for l, _ in dens])
+    ratio = np.prod([l[cands[:, d]] / g[cands[:, d]] for d, (l, g) in enumerate(dens)], axis=0)
+    out = []
+    for i in np.argsort(-ratio, kind="stable"):
+        p = space.make(cands[i])
+        if p not in seen:
+            seen.add(p)
+            out.append(p)
+            if len(out) == n:
+                break
+    if len(out) < n:  # model keeps proposing seen configs – top up at random
+        out += space.sample(rng, n - len(out), exclude=seen)
+    return out
+
+
+__all__ = [
+    "SearchSpace",
+    "SearchResult",
+    "rung_spans",
+    "successive_halving",
+    "model_based_search",
+]
@@ -0,0 +1,119 @@
+"""simulation/or_price_lookup_benchmark.py – forward-filled panel vs. walk-back lookup
+
+Runs the same BacktestSimulator twice over one signal calendar:
+
+*  **legacy** – the original ``_get_price``: ``.loc[(date, symbol)]`` on a
+   (date, symbol) MultiIndex, stepping back one calendar day per KeyError;
+*  **panel**  – the current ``_get_price``: one read from the forward-filled
+   close panel.
+
+and reports wall time of both plus whether equity curves and trades match.
+
+Usage (from ``src``):
+    python -m simulation.or_price_lookup_benchmark --start 2014-01-01 --end 2024-12-31
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from simulation.data_loaders import load_stocks
+from simulation.or_backtest_engine import generate_signal_calendar
+from simulation.or_backtest_simulator import BacktestSimulator
+
+
+class _LegacyPriceSimulator(BacktestSimulator):
+    """BacktestSimulator with the pre-panel, exception-driven price lookup."""
+
+    def __init__(self, *args, legacy_prices: pd.Series, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stock_prices = legacy_prices
+
+    def _get_price(self, date, symbol):
+        while date >= self.stock_prices.index.get_level_values(0).min():
+            try:
+                return self.stock_prices.loc[(date, symbol)]
+            except KeyError:
+                date -= pd.Timedelta(days=1)
+        return None
+
+
+def _legacy_price_series() -> pd.Series:
+    prices = load_stocks(columns=["date", "symbol", "close"])
+    prices["date"] = pd.to_datetime(prices["date"])
+    return prices.set_index(["date", "symbol"])["close"]
+
+
+def _timed_run(sim: BacktestSimulator) -> float:
+    t0 = time.perf_counter()
+    sim.run()
+    return time.perf_counter() - t0
+
+
+def run_benchmark(
+    start: str = "2014-01-01",
+    end: str = "2024-12-31",
+    beta_window: int = 60,
+    beta_up_threshold: float = 1.1,
+    beta_down_threshold: float = 1.05,
+    max_positions: int = 10,
+) -> pd.DataFrame:
+    """
+    Time both price lookups on one full simulation and check they agree.
+
+    Returns:
+        pd.DataFrame: One row per implementation (seconds, final equity, trades).
+    """
+    signals = generate_signal_calendar(start, end, beta_window,
+                                       beta_up_threshold, beta_down_threshold)
+    print(f"📅 {len(signals)} signal days, {start} → {end}")
+
+    t0 = time.perf_counter()
+    panel_sim = BacktestSimulator(signals, max_positions=max_positions)
+    panel_setup = time.perf_counter() - t0
+    panel_secs = _timed_run(panel_sim)
+
+    t0 = time.perf_counter()
+    legacy_sim = _LegacyPriceSimulator(signals, max_positions=max_positions,
+                                       prices=panel_sim.prices,
+                                       legacy_prices=_legacy_price_series())
+    legacy_setup = time.perf_counter() - t0
+    legacy_secs = _timed_run(legacy_sim)
+
+    panel_eq = panel_sim.results()["equity"]
+    legacy_eq = legacy_sim.results()["equity"]
+    same_equity = np.allclose(panel_eq.to_numpy(), legacy_eq.to_numpy(), equal_nan=True)
+    same_trades = panel_sim.trades.to_frame().equals(legacy_sim.trades.to_frame())
+
+    report = pd.DataFrame([
+        dict(impl="legacy walk-back", setup_s=legacy_setup, run_s=legacy_secs,
+             final_equity=legacy_eq.iloc[-1], trades=len(legacy_sim.trades)),
+        dict(impl="ffill panel", setup_s=panel_setup, run_s=panel_secs,
+             final_equity=panel_eq.iloc[-1], trades=len(panel_sim.trades)),
+    ]).set_index("impl")
+
+    print(report.to_string(float_format=lambda v: f"{v:,.3f}"))
+    print(f"⚡ run speed-up: {legacy_secs / max(panel_secs, 1e-9):.1f}×")
+    print(("✅" if same_equity else "❌") + " equity curves match")
+    print(("✅" if same_trades else "❌") + " trade logs match")
+    return report
+
+
+def _main():  # pragma: no cover – manual benchmark only
+    ap = argparse.ArgumentParser(description="Benchmark simulator price lookup.")
+    ap.add_argument("--start", default="2014-01-01")
+    ap.add_argument("--end", default="2024-12-31")
+    ap.add_argument("--beta-window", type=int, default=60)
+    ap.add_argument("--up", type=float, default=1.1, help="beta_up threshold")
+    ap.add_argument("--down", type=float, default=1.05, help="beta_down threshold")
+    ap.add_argument("--max-positions", type=int, default=10)
+    args = ap.parse_args()
+    run_benchmark(args.start, args.end, args.beta_window, args.up, args.down,
+                  args.max_positions)
+
+
+if __name__ == "__main__":
+    _main()
@@ -69,7 +69,7 @@ print(pd.DataFrame(sim.positions).head(10))
 # ----------------------------------------------------------------------------
 # 4) inspect the trade-log
 # ----------------------------------------------------------------------------
-trades = pd.DataFrame(sim.trades)
+trades = sim.trades.to_frame()
 print("\n──── Trades (first 10) ────")
 print(trades.head(10))
 print("… total trades:", len(trades))
@@ -9,7 +9,6 @@ Usage
 from __future__ import annotations
 
 import pandas as pd
-from collections import defaultdict
 
 # ---- imports מהקוד הקיים שלך ---------------------------------------------
 from simulation.or_param_optimizer_v3 import (
@@ -52,28 +51,24 @@ def main() -> None:
     PerformanceAnalyzer(equity).summarize()
 
     # -------- Yearly trade analysis ---------------------------------------
-    yearly = defaultdict(lambda: dict(trades=0, winners=0, pnl=0.0, sl=0))
-    for tr in sim.trades:
-        if tr["exit_date"] is None:           # עסקה עדיין פתוחה
-            continue
-        yr = tr["exit_date"].year
-        yearly[yr]["trades"] += 1
-        yearly[yr]["pnl"]    += tr["pnl"]
-        if tr["pnl"] > 0:
-            yearly[yr]["winners"] += 1
-        if tr.get("sl_hit"):
-            yearly[yr]["sl"] += 1
+    trades = sim.trades.to_frame()
+    closed = trades[trades["exit_date"].notna()]          # בלי עסקאות פתוחות
+    yearly = closed.groupby(closed["exit_date"].dt.year).agg(
+        trades=("pnl", "size"),
+        winners=("pnl", lambda p: int((p > 0).sum())),
+        pnl=("pnl", "sum"),
+        sl=("sl_hit", "sum"),
+    )
 
     rows = []
-    for yr in sorted(yearly):
-        st = yearly[yr]
+    for yr, st in yearly.iterrows():
         win_rate = st["winners"] / st["trades"] if st["trades"] else 0
         rows.append(dict(
             Year        = yr,
-            Trades      = st["trades"],
-            Winners     = st["winners"],
+            Trades      = int(st["trades"]),
+            Winners     = int(st["winners"]),
             WinRate     = f"{win_rate*100:.1f}%",
-            SL_Hits     = st["sl"],
+            SL_Hits     = int(st["sl"]),
             Total_PnL   = f"${st['pnl']:,.0f}",
             Avg_PnL     = f"${st['pnl']/st['trades'] if st['trades'] else 0:,.2f}",
         ))
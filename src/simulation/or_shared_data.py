@@ -0,0 +1,177 @@
+"""simulation/or_shared_data.py – market data shared zero-copy by optimizer workers
+
+Without this every ProcessPool worker of the optimizers loads its own copy
+of the stock prices (``load_close_panel``) and re-reads the beta table on
+every ``build_signals`` call – N workers, N copies in RAM.
+
+Instead the parent *publishes* the data once as a ``MarketPanel`` directory
+of ``.npy`` files (forward-filled close, the requested beta windows, SP500
+score) and every worker *attaches* to it memory-mapped read-only, so the OS
+page cache holds one copy for all processes:
+
+    >>> path = publish_market_data([30, 60, 90])             # parent, once
+    >>> with ProcessPoolExecutor(initializer=attach_market_data,
+    ...                          initargs=(path,)) as ex: ...
+
+Inside an attached process ``load_close_panel()`` returns the shared panel
+and ``shared_market_data()`` gives the signal helpers below; elsewhere it is
+None and callers fall back to the regular loaders.
+
+Published directories are keyed by the data fingerprint and the windows,
+so re-runs on unchanged data reuse them.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from simulation.data_loaders import data_fingerprint, load_betas, load_sp500, load_stocks
+from simulation.or_backtest_engine import SignalCube
+from simulation.or_data_context import DataContext, get_data_context, set_data_context
+from simulation.or_market_panel import MarketPanel
+
+SHARED_DIR = Path(__file__).resolve().parent.parent / "data_cache" / "shared"
+_BETA_DATES_FILE = "beta_dates.npy"
+
+
+class SharedMarketData:
+    """
+    A published panel plus the dates present in ``beta_calculation``.
+
+    Args:
+        panel (MarketPanel): Close (forward-filled), beta and regime arrays.
+        beta_dates (np.ndarray): Sorted dates that have rows in the beta table.
+    """
+
+    def __init__(self, panel: MarketPanel, beta_dates: np.ndarray):
+        self.panel = panel
+        self.beta_dates = np.asarray(beta_dates, dtype="datetime64[ns]")
+        self._has_betas = np.isin(panel.dates, self.beta_dates)
+
+    def _rows(self, start, end) -> slice:
+        dates = self.panel.dates
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start), "ns"), "left")
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end), "ns"), "right")
+        return slice(int(lo), int(hi))
+
+    def signal_dates(self, start, end) -> pd.DatetimeIndex:
+        """
+        Dates of ``generate_signal_calendar(start, end, …)``: SP500 score
+        present and the beta table has rows for the day.
+        """
+        rows = self._rows(start, end)
+        keep = ~np.isnan(self.panel.regime[rows]) & self._has_betas[rows]
+        return pd.DatetimeIndex(self.panel.dates[rows][keep])
+
+    def beta_arrays(self, start, end, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (dates, beta_up, beta_down) of the days in [start, end] that have
+        beta rows (the panel also holds stock-only days) for one window;
+        columns follow ``panel.symbols``.
+        """
+        rows = self._rows(start, end)
+        keep = np.flatnonzero(self._has_betas[rows]) + rows.start
+        return (self.panel.dates[keep], self.panel.fields[f"beta_up_{window}"][keep],
+                self.panel.fields[f"beta_down_{window}"][keep])
+
+    def signal_cube(self, start, end, windows: Iterable[int]) -> SignalCube:
+        """
+        ``generate_signal_cube(start, end, windows)`` from the mapped arrays –
+        no beta table is loaded in this process.
+
+        Raises:
+            ValueError: If a window was not published.
+        """
+        rows = self._rows(start, end)
+        keep = np.flatnonzero(~np.isnan(self.panel.regime[rows]) & self._has_betas[rows]) + rows.start
+        columns = [f"beta_{side}_{w}" for w in sorted(set(windows)) for side in ("up", "down")]
+        missing = [c for c in columns if c not in self.panel.fields]
+        if missing:
+            raise ValueError(f"Beta columns {missing} not in the shared panel")
+        return SignalCube.from_arrays(pd.DatetimeIndex(self.panel.dates[keep]),
+                                      self.panel.regime[keep], self.panel.symbols,
+                                      {c: self.panel.fields[c][keep] for c in columns})
+
+    def __repr__(self) -> str:
+        return f"SharedMarketData({self.panel!r})"
+
+
+def publish_market_data(
+    beta_windows: Iterable[int],
+    *,
+    path: Optional[str | os.PathLike] = None,
+    dtype=np.float64,
+    check_db: bool = True,
+) -> Path:
+    """
+    Build the shared panel once and write it to disk (reused if present).
+
+    Args:
+        beta_windows (Iterable[int]): Windows whose beta_up / beta_down columns to include.
+        path (Optional[PathLike]): Target directory (default: keyed under data_cache/shared).
+        dtype: Float dtype of the arrays (float64 keeps results bit-identical).
+        check_db (bool): Verify loader caches / fingerprint against the DB.
+
+    Returns:
+        Path: Directory to pass to ``attach_market_data``.
+    """
+    windows = sorted(set(beta_windows))
+    beta_columns = [f"beta_{side}_{w}" for w in windows for side in ("up", "down")]
+    if path is None:
+        tag = hashlib.sha1(f"{windows}|{np.dtype(dtype).name}".encode()).hexdigest()[:8]
+        path = SHARED_DIR / f"panel_{data_fingerprint(check_db=check_db)}_{tag}"
+    path = Path(path)
+    if (path / _BETA_DATES_FILE).exists():
+        return path
+
+    betas = load_betas(columns=["date", "symbol", *beta_columns], check_db=check_db)
+    panel = MarketPanel.from_frames(
+        load_stocks(columns=["date", "symbol", "close"], check_db=check_db),
+        betas, load_sp500(check_db=check_db),
+        price_fields=("close",), beta_columns=beta_columns, ffill=("close",), dtype=dtype)
+    beta_dates = np.unique(betas["date"].to_numpy(dtype="datetime64[ns]"))
+    del betas
+
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    panel.save(tmp)
+    np.save(tmp / _BETA_DATES_FILE, beta_dates)  # written last – marks the directory complete
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    print(f"📦 published {panel!r} → {path}")
+    return path
+
+
+def attach_market_data(path: str | os.PathLike) -> SharedMarketData:
+    """
+    Memory-map a published panel and install it in this process's DataContext
+    (use as ProcessPool ``initializer``; the parent may call it too).
+    """
+    path = Path(path)
+    shared = SharedMarketData(MarketPanel.load(path, mmap_mode="r"),
+                              np.load(path / _BETA_DATES_FILE))
+    ctx = DataContext()
+    ctx.derived("close_panel", lambda: shared.panel)
+    ctx.derived("shared_market_data", lambda: shared)
+    set_data_context(ctx)
+    return shared
+
+
+def shared_market_data() -> Optional[SharedMarketData]:
+    """The attached data of this process, or None if nothing was attached."""
+    return get_data_context().derived("shared_market_data", lambda: None)
+
+
+__all__ = [
+    "SharedMarketData",
+    "publish_market_data",
+    "attach_market_data",
+    "shared_market_data",
+    "SHARED_DIR",
+]
@@ -0,0 +1,380 @@
+"""simulation/or_signal_calendar.py – compact signal calendar for the simulators
+
+A signal calendar used to be a DataFrame with Python ``list`` cells
+(``long_symbols`` / ``short_symbols``), walked with ``iterrows()`` and
+searched with ``symbol in list`` scans. ``SignalCalendar`` keeps the same
+information over a fixed, sorted symbol universe:
+
+*  CSR per side – ``ptr[t]:ptr[t+1]`` slices ``idx`` (int32 universe codes,
+   list order kept, so "longs first, in list order" priority is unchanged);
+*  a packed bitset per side (``np.packbits``, built on first use) for O(1)
+   ``calendar.contains(t, "AAPL", "long")`` and day-to-day differences;
+*  an optional ``regime_signal`` column.
+
+The simulators read a day as a ``SignalDay`` – the mapping interface of the
+former ``iterrows()`` rows, whose symbol lists test membership in O(1):
+
+    >>> cal = SignalCalendar.from_frame(generate_signal_calendar(...))
+    >>> row = cal.day(0); "AAPL" in row["long_symbols"]
+    >>> entered, exited = cal.changes(5, "long")
+    >>> cal.to_parquet("signals.parquet"); SignalCalendar.from_parquet("signals.parquet")
+    >>> cal.to_frame()                      # the list-column DataFrame, built once
+"""
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Mapping, Sequence as SequenceABC
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+SIDES = ("long", "short")
+
+
+class SymbolSet(SequenceABC):
+    """One day's long or short symbols – list order, O(1) ``in`` via the bitset."""
+
+    __slots__ = ("_cal", "_t", "_side")
+
+    def __init__(self, calendar: "SignalCalendar", t: int, side: str):
+        self._cal, self._t, self._side = calendar, t, side
+
+    def __len__(self) -> int:
+        ptr = self._cal._ptr[self._side]
+        return int(ptr[self._t + 1] - ptr[self._t])
+
+    def __getitem__(self, i):
+        return self._cal.symbols_on(self._t, self._side)[i]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._cal.symbols_on(self._t, self._side))
+
+    def __contains__(self, symbol) -> bool:
+        return self._cal.contains(self._t, symbol, self._side)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (SymbolSet, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self._cal.symbols_on(self._t, self._side))
+
+
+class SignalDay(Mapping):
+    """
+    Row *t* of a calendar with the keys of the former ``iterrows()`` rows:
+    date, long_symbols, short_symbols and regime_signal (when present).
+    """
+
+    __slots__ = ("_cal", "_t")
+
+    def __init__(self, calendar: "SignalCalendar", t: int):
+        self._cal, self._t = calendar, t
+
+    def _keys(self) -> List[str]:
+        keys = ["date", "long_symbols", "short_symbols"]
+        return keys + ["regime_signal"] if self._cal.regime is not None else keys
+
+    def __getitem__(self, key: str) -> Any:
+        cal, t = self._cal, self._t
+        if key == "date":
+            return cal.dates[t]
+        if key in ("long_symbols", "short_symbols"):
+            return SymbolSet(cal, t, key.split("_")[0])
+        if key == "regime_signal" and cal.regime is not None:
+            return cal.regime[t]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return f"SignalDay({ {k: self[k] for k in self} })"
+
+
+class SignalCalendar:
+    """
+    Per-day long / short signal sets over a fixed symbol universe.
+
+    Args:
+        dates (Sequence): Signal days, ascending.
+        symbols (Sequence[str]): Symbol universe; signals are codes into it.
+        long_ptr, long_idx (np.ndarray): CSR of the long signals (len(dates)+1 offsets, codes).
+        short_ptr, short_idx (np.ndarray): CSR of the short signals.
+        regime (Optional[np.ndarray]): Per-day ``regime_signal`` (None if the source had none).
+
+    Raises:
+        ValueError: If the CSR arrays do not match the dates / universe.
+    """
+
+    def __init__(
+        self,
+        dates: Sequence,
+        symbols: Sequence[str],
+        long_ptr: np.ndarray,
+        long_idx: np.ndarray,
+        short_ptr: np.ndarray,
+        short_idx: np.ndarray,
+        regime: Optional[np.ndarray] = None,
+    ):
+        self.dates = pd.DatetimeIndex(pd.to_datetime(dates))
+        self.symbols = np.asarray(symbols, dtype=object)
+        self._ptr = {"long": np.asarray(long_ptr, dtype=np.int64),
+                     "short": np.asarray(short_ptr, dtype=np.int64)}
+        self._idx = {"long": np.asarray(long_idx, dtype=np.int32),
+                     "short": np.asarray(short_idx, dtype=np.int32)}
+        self.regime = None if regime is None else np.asarray(regime, dtype=np.float64)
+        for side in SIDES:
+            ptr, idx = self._ptr[side], self._idx[side]
+            if len(ptr) != len(self.dates) + 1 or ptr[0] != 0 or ptr[-1] != len(idx):
+                raise ValueError(f"{side} offsets do not match {len(self.dates)} dates")
+            if len(idx) and (idx.min() < 0 or idx.max() >= len(self.symbols)):
+                raise ValueError(f"{side} signals reference symbols outside the universe")
+        if self.regime is not None and len(self.regime) != len(self.dates):
+            raise ValueError("regime must have one value per date")
+        self._symbol_index: Optional[Dict[str, int]] = None
+        self._bits: Dict[str, np.ndarray] = {}
+        self._lists: Dict[str, List[List[str]]] = {}
+        self._frame: Optional[pd.DataFrame] = None
+
+    # ------------------------------------------------------------------ #
+    # construction
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, symbols: Optional[Sequence[str]] = None) -> "SignalCalendar":
+        """
+        Build from a list-column calendar (generate_signal_calendar / build_signals).
+
+        Rows are sorted by date (stable); an empty frame – with or without
+        columns – gives an empty calendar.
+
+        Args:
+            frame (pd.DataFrame): Columns date, long_symbols, short_symbols [, regime_signal].
+            symbols (Optional[Sequence[str]]): Universe (default: the sorted symbols of *frame*).
+
+        Raises:
+            ValueError: If *symbols* misses a symbol of the calendar.
+        """
+        if frame.empty and "date" not in frame:
+            frame = pd.DataFrame(columns=["date", "long_symbols", "short_symbols"])
+        frame = frame.assign(date=pd.to_datetime(frame["date"])).sort_values(
+            "date", kind="stable")
+        lists = {side: frame[f"{side}_symbols"].tolist() for side in SIDES}
+        flat = {side: list(chain.from_iterable(lists[side])) for side in SIDES}
+
+        names = np.asarray(flat["long"] + flat["short"], dtype=object)
+        if symbols is None:
+            codes, found = pd.factorize(names)
+            order = np.argsort(found.astype(str), kind="stable")
+            universe = np.asarray(found, dtype=object)[order]
+            rank = np.empty(len(order), dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+            codes = rank[codes]
+        else:
+            universe = np.asarray(symbols, dtype=object)
+            codes = pd.Index(universe).get_indexer(names)
+            if (codes < 0).any():
+                raise ValueError(f"Symbol {names[np.argmax(codes < 0)]!r} is not in the universe")
+        n_long = len(flat["long"])
+
+        csr = []
+        for side, idx in (("long", codes[:n_long]), ("short", codes[n_long:])):
+            ptr = np.zeros(len(frame) + 1, dtype=np.int64)
+            np.cumsum([len(x) for x in lists[side]], out=ptr[1:])
+            csr += [ptr, idx]
+
+        regime = frame["regime_signal"].to_numpy(dtype=np.float64) if "regime_signal" in frame else None
+        return cls(frame["date"].to_numpy(), universe, *csr, regime=regime)
+
+    @classmethod
+    def from_masks(
+        cls,
+        dates: Sequence,
+        symbols: Sequence[str],
+        long_mask: np.ndarray,
+        short_mask: np.ndarray,
+        regime: Optional[np.ndarray] = None,
+    ) -> "SignalCalendar":
+        """Build from boolean (n_dates, n_symbols) masks (symbols of a day in universe order)."""
+        csr = []
+        for mask in (long_mask, short_mask):
+            mask = np.asarray(mask, dtype=bool)
+            ptr = np.zeros(mask.shape[0] + 1, dtype=np.int64)
+            np.cumsum(mask.sum(axis=1), out=ptr[1:])
+            csr += [ptr, np.nonzero(mask)[1].astype(np.int32)]
+        return cls(dates, symbols, *csr, regime=regime)
+
+    # ------------------------------------------------------------------ #
+    # access
+    # ------------------------------------------------------------------ #
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def symbol_index(self) -> Dict[str, int]:
+        """Symbol → universe code."""
+        if self._symbol_index is None:
+            self._symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        return self._symbol_index
+
+    @property
+    def n_signals(self) -> int:
+        return len(self._idx["long"]) + len(self._idx["short"])
+
+    def indices(self, t: int, side: str) -> np.ndarray:
+        """Universe codes of day *t*'s *side* signals, list order (a view)."""
+        ptr = self._ptr[side]
+        return self._idx[side][ptr[t]:ptr[t + 1]]
+
+    def symbols_on(self, t: int, side: str) -> List[str]:
+        """Day *t*'s *side* symbols as a list."""
+        lists = self._lists.get(side)
+        if lists is not None:
+            return lists[t]
+        return self.symbols[self.indices(t, side)].tolist()
+
+    def day(self, t: int) -> SignalDay:
+        return SignalDay(self, t)
+
+    def days(self, start: int = 0) -> Iterator[Tuple[pd.Timestamp, SignalDay]]:
+        """(date, row) pairs from position *start* on."""
+        for t in range(start, len(self)):
+            yield self.dates[t], SignalDay(self, t)
+
+    def position_after(self, date) -> int:
+        """Index of the first day strictly after *date*."""
+        return int(self.dates.searchsorted(pd.Timestamp(date), side="right"))
+
+    def bits(self, side: str) -> np.ndarray:
+        """Packed (n_dates, ceil(n_symbols / 8)) uint8 membership bitset of *side*."""
+        bits = self._bits.get(side)
+        if bits is None:
+            ptr = self._ptr[side]
+            mask = np.zeros((len(self), len(self.symbols)), dtype=bool)
+            mask[np.repeat(np.arange(len(self)), np.diff(ptr)), self._idx[side]] = True
+            bits = self._bits[side] = np.packbits(mask, axis=1)
+        return bits
+
+    def mask(self, side: str) -> np.ndarray:
+        """Unpacked boolean (n_dates, n_symbols) membership of *side*."""
+        return np.unpackbits(self.bits(side), axis=1, count=len(self.symbols)).astype(bool)
+
+    def contains(self, t: int, symbol: str, side: str) -> bool:
+        """O(1) – is *symbol* a *side* signal on day *t*?"""
+        j = self.symbol_index.get(symbol)
+        if j is None:
+            return False
+        return bool(self.bits(side)[t, j >> 3] & (0x80 >> (j & 7)))
+
+    def changes(self, t: int, side: str) -> Tuple[List[str], List[str]]:
+        """(entered, exited) *side* symbols of day *t* against day t-1 (universe order)."""
+        bits = self.bits(side)
+        prev = bits[t - 1] if t > 0 else np.zeros_like(bits[t])
+        n = len(self.symbols)
+        entered = np.flatnonzero(np.unpackbits(bits[t] & ~prev, count=n))
+        exited = np.flatnonzero(np.unpackbits(prev & ~bits[t], count=n))
+        return self.symbols[entered].tolist(), self.symbols[exited].tolist()
+
+    def between(self, start=None, end=None) -> "SignalCalendar":
+        """Days in [start, end] (either bound optional) as a new calendar."""
+        lo = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start), "left"))
+        hi = len(self) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), "right"))
+        hi = max(hi, lo)
+        csr = []
+        for side in SIDES:
+            ptr = self._ptr[side]
+            csr += [ptr[lo:hi + 1] - ptr[lo], self._idx[side][ptr[lo]:ptr[hi]]]
+        regime = None if self.regime is None else self.regime[lo:hi]
+        cal = SignalCalendar(self.dates[lo:hi], self.symbols, *csr, regime=regime)
+        cal._symbol_index = self._symbol_index
+        return cal
+
+    # ------------------------------------------------------------------ #
+    # conversion / serialisation
+    # ------------------------------------------------------------------ #
+    def to_frame(self) -> pd.DataFrame:
+        """
+        The former list-column DataFrame (built on first call, then reused –
+        treat it as read-only).
+        """
+        if self._frame is None:
+            for side in SIDES:
+                if side not in self._lists:
+                    names = self.symbols[self._idx[side]].tolist()
+                    ptr = self._ptr[side]
+                    self._lists[side] = [names[a:b] for a, b in zip(ptr[:-1], ptr[1:])]
+            data = {"date": self.dates, "long_symbols": self._lists["long"],
+                    "short_symbols": self._lists["short"]}
+            if self.regime is not None:
+                data["regime_signal"] = self.regime
+            self._frame = pd.DataFrame(data)
+        return self._frame
+
+    def to_arrow(self):
+        """
+        The calendar as a ``pyarrow.Table``: one row per day, long / short as
+        list<int32> codes, the universe in the schema metadata.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        import pyarrow as pa
+
+        columns = {"date": pa.array(self.dates.to_numpy(dtype="datetime64[ns]"))}
+        for side in SIDES:
+            columns[side] = pa.ListArray.from_arrays(pa.array(self._ptr[side].astype(np.int32)),
+                                                     pa.array(self._idx[side]))
+        if self.regime is not None:
+            columns["regime_signal"] = pa.array(self.regime)
+        table = pa.table(columns)
+        return table.replace_schema_metadata(
+            {b"signal_calendar.symbols": json.dumps(self.symbols.tolist()).encode()})
+
+    def to_parquet(self, path: str | os.PathLike) -> None:
+        """Write ``to_arrow()`` as parquet (requires pyarrow)."""
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), str(path))
+
+    @classmethod
+    def from_arrow(cls, table) -> "SignalCalendar":
+        """Rebuild a calendar written by ``to_arrow()``."""
+        meta = table.schema.metadata or {}
+        if b"signal_calendar.symbols" not in meta:
+            raise ValueError("Table has no signal_calendar.symbols metadata")
+        symbols = json.loads(meta[b"signal_calendar.symbols"])
+        csr = []
+        for side in SIDES:
+            lists = table.column(side).combine_chunks()
+            offsets = lists.offsets.to_numpy().astype(np.int64)
+            values = lists.flatten().to_numpy(zero_copy_only=False)
+            csr += [offsets - offsets[0], values]
+        regime = (table.column("regime_signal").to_numpy()
+                  if "regime_signal" in table.column_names else None)
+        return cls(table.column("date").to_numpy(), symbols, *csr, regime=regime)
+
+    @classmethod
+    def from_parquet(cls, path: str | os.PathLike) -> "SignalCalendar":
+        """Read a calendar written by ``to_parquet()`` (requires pyarrow)."""
+        import pyarrow.parquet as pq
+
+        return cls.from_arrow(pq.read_table(str(path)))
+
+    def __repr__(self) -> str:
+        return (f"SignalCalendar({len(self)} days, {len(self.symbols)} symbols, "
+                f"{self.n_signals} signals)")
+
+
+def as_signal_calendar(calendar) -> SignalCalendar:
+    """*calendar* itself if it is a SignalCalendar, else ``SignalCalendar.from_frame``."""
+    return calendar if isinstance(calendar, SignalCalendar) else SignalCalendar.from_frame(calendar)
+
+
+__all__: List[str] = ["SignalCalendar", "SignalDay", "SymbolSet", "as_signal_calendar", "SIDES"]
@@ -1,9 +1,34 @@
 from __future__ import annotations
 
-from typing import Optional
+from collections import OrderedDict
+from typing import FrozenSet, List, Optional
+import numpy as np
 import pandas as pd
 
-from simulation.or_data_bundle import build_daily_bundle
+from simulation.or_data_bundle import (
+    BUNDLE_CACHE_SIZE,
+    _beta_date_index,
+    _regime_scores,
+    build_daily_bundle,
+    get_regime_score,
+)
+from simulation.or_data_context import get_data_context
+
+
+def _as_timestamp(date: str | pd.Timestamp) -> pd.Timestamp:
+    """Normalise a date argument the same way build_daily_bundle does."""
+    if isinstance(date, str):
+        return pd.to_datetime(date).normalize()
+    return pd.Timestamp(date)
+
+
+def _regime_direction(score) -> int:
+    """Map a regime score to +1 / -1 / 0 (see get_regime_signal)."""
+    if score >= 1:
+        return 1
+    if score <= -1:
+        return -1
+    return 0
 
 
 # ---------------------------------------------------------------------------
@@ -23,15 +48,7 @@ def get_regime_signal(date: str | pd.Timestamp) -> int:
              -1 → Short bias (score <= -1)
               0 → No trade (neutral)
     """
-    bundle = build_daily_bundle(date)
-    score = bundle.regime_score
-
-    if score >= 1:
-        return 1  # Long bias
-    elif score <= -1:
-        return -1  # Short bias
-    else:
-        return 0  # Neutral zone
+    return _regime_direction(get_regime_score(date))
 
 
 # ---------------------------------------------------------------------------
@@ -57,15 +74,17 @@ def get_beta_values(
     bundle = build_daily_bundle(date)
     betas = bundle.betas
 
-    row = betas[(betas["symbol"] == symbol)]
-    if row.empty:
+    # the day's slice is sorted by symbol → binary search instead of a scan
+    symbols = betas["symbol"].to_numpy()
+    pos = int(np.searchsorted(symbols, symbol))
+    if pos >= len(symbols) or symbols[pos] != symbol:
         return None, None
 
     beta_up_col = f"beta_up_{beta_window}"
     beta_down_col = f"beta_down_{beta_window}"
 
-    beta_up = row.iloc[0].get(beta_up_col)
-    beta_down = row.iloc[0].get(beta_down_col)
+    beta_up = betas.iloc[pos].get(beta_up_col)
+    beta_down = betas.iloc[pos].get(beta_down_col)
 
     if pd.isna(beta_up) or pd.isna(beta_down):
         return None, None
@@ -74,7 +93,162 @@ def get_beta_values(
 
 
 # ---------------------------------------------------------------------------
-# Entry signal generator
+# Batch entry signals – every eligible symbol at once
+# ---------------------------------------------------------------------------
+
+def _entry_mask(
+    betas: pd.DataFrame,
+    direction: np.ndarray | int,
+    side: int,
+    beta_window: int,
+    threshold: float,
+) -> np.ndarray:
+    """
+    Vectorised entry rule shared by the per-date and per-range APIs.
+
+    A row qualifies when the regime points to *side* (+1 long / -1 short),
+    both betas of the window are present and the side's beta >= threshold.
+    """
+    up = betas[f"beta_up_{beta_window}"].to_numpy(dtype=float)
+    down = betas[f"beta_down_{beta_window}"].to_numpy(dtype=float)
+    beta = up if side == 1 else down
+    return (np.asarray(direction) == side) & ~np.isnan(up) & ~np.isnan(down) & (beta >= threshold)
+
+
+def entry_long_mask(
+    date: str | pd.Timestamp,
+    beta_window: int,
+    beta_up_threshold: float
+) -> pd.Series:
+    """
+    Long-entry flags for every eligible symbol on a date.
+
+    Same logic as is_entry_long, evaluated as one array operation.
+
+    Returns:
+        pd.Series: Boolean flags indexed by symbol (bundle.eligible_symbols).
+    """
+    bundle = build_daily_bundle(date)
+    mask = _entry_mask(bundle.betas, _regime_direction(bundle.regime_score), 1,
+                       beta_window, beta_up_threshold)
+    flags = pd.Series(mask, index=bundle.betas["symbol"].to_numpy())
+    return flags[~flags.index.duplicated()]
+
+
+def entry_short_mask(
+    date: str | pd.Timestamp,
+    beta_window: int,
+    beta_down_threshold: float
+) -> pd.Series:
+    """
+    Short-entry flags for every eligible symbol on a date.
+
+    Same logic as is_entry_short, evaluated as one array operation.
+
+    Returns:
+        pd.Series: Boolean flags indexed by symbol (bundle.eligible_symbols).
+    """
+    bundle = build_daily_bundle(date)
+    mask = _entry_mask(bundle.betas, _regime_direction(bundle.regime_score), -1,
+                       beta_window, beta_down_threshold)
+    flags = pd.Series(mask, index=bundle.betas["symbol"].to_numpy())
+    return flags[~flags.index.duplicated()]
+
+
+def entry_long_symbols(
+    date: str | pd.Timestamp,
+    beta_window: int,
+    beta_up_threshold: float
+) -> List[str]:
+    """Sorted list of symbols with a long entry signal on *date*."""
+    flags = entry_long_mask(date, beta_window, beta_up_threshold)
+    return flags.index[flags.to_numpy()].tolist()
+
+
+def entry_short_symbols(
+    date: str | pd.Timestamp,
+    beta_window: int,
+    beta_down_threshold: float
+) -> List[str]:
+    """Sorted list of symbols with a short entry signal on *date*."""
+    flags = entry_short_mask(date, beta_window, beta_down_threshold)
+    return flags.index[flags.to_numpy()].tolist()
+
+
+def entry_signals_range(
+    start_date: str | pd.Timestamp,
+    end_date: str | pd.Timestamp,
+    beta_window: int,
+    beta_up_threshold: float,
+    beta_down_threshold: float
+) -> pd.DataFrame:
+    """
+    Long / short entry symbols for every trading day in [start_date, end_date].
+
+    One vectorised pass over the beta rows of the span (located through the
+    date-offset index) instead of one call per (date, symbol). Days missing
+    from either the SP500 or the beta table are skipped.
+
+    Returns:
+        pd.DataFrame: Columns date, long_symbols (List[str]), short_symbols (List[str]).
+    """
+    start, end = _as_timestamp(start_date), _as_timestamp(end_date)
+    ctx = get_data_context()
+    scores = _regime_scores(ctx)
+    spans = [(d, span) for d, span in _beta_date_index(ctx).items()
+             if start <= d <= end and d in scores]
+    if not spans:
+        return pd.DataFrame(columns=["date", "long_symbols", "short_symbols"])
+
+    betas = ctx.betas
+    rows = np.concatenate([np.arange(a, b) for _, (a, b) in spans])
+    span_betas = betas.iloc[rows]
+    direction = np.repeat([_regime_direction(scores[d]) for d, _ in spans],
+                          [b - a for _, (a, b) in spans])
+
+    long_mask = _entry_mask(span_betas, direction, 1, beta_window, beta_up_threshold)
+    short_mask = _entry_mask(span_betas, direction, -1, beta_window, beta_down_threshold)
+    symbols = span_betas["symbol"].to_numpy()
+
+    out = []
+    offset = 0
+    for d, (a, b) in spans:
+        sl = slice(offset, offset + b - a)
+        out.append(dict(date=d,
+                        long_symbols=symbols[sl][long_mask[sl]].tolist(),
+                        short_symbols=symbols[sl][short_mask[sl]].tolist()))
+        offset += b - a
+    return pd.DataFrame(out)
+
+
+def _entry_set(side: int, date, beta_window: int, threshold: float) -> FrozenSet[str]:
+    """
+    LRU-cached set of entry symbols – backs the single-symbol wrappers.
+
+    An unknown *beta_window* gives an empty set (the wrappers have always
+    answered False for it), while the batch API raises KeyError.
+    """
+    ctx = get_data_context()
+    cache: OrderedDict = ctx.derived("entry_set_lru", OrderedDict)
+    key = (side, _as_timestamp(date), beta_window, threshold)
+    if (hit := cache.get(key)) is not None:
+        cache.move_to_end(key)
+        return hit
+
+    if not {f"beta_up_{beta_window}", f"beta_down_{beta_window}"} <= set(ctx.betas.columns):
+        return frozenset()
+
+    if side == 1:
+        hit = frozenset(entry_long_symbols(key[1], beta_window, threshold))
+    else:
+        hit = frozenset(entry_short_symbols(key[1], beta_window, threshold))
+    cache[key] = hit
+    if len(cache) > BUNDLE_CACHE_SIZE:
+        cache.popitem(last=False)
+    return hit
+
+# ---------------------------------------------------------------------------
+# Entry signal generator (single symbol – thin wrappers over the batch API)
 # ---------------------------------------------------------------------------
 
 def is_entry_long(
@@ -97,17 +271,13 @@ def is_entry_long(
         beta_up_threshold: Minimum required beta_up.
 
     Returns:
-        bool: True if long entry conditions are satisfied.
+        bool: True if long entry conditions are satisfied
+        (False for a beta window the table does not have).
     """
-    regime_signal = get_regime_signal(date)
-    if regime_signal != 1:
+    if get_regime_signal(date) != 1:
         return False
 
-    beta_up, _ = get_beta_values(date, symbol, beta_window)
-    if beta_up is None:
-        return False
-
-    return beta_up >= beta_up_threshold
+    return symbol in _entry_set(1, date, beta_window, beta_up_threshold)
 
 
 def is_entry_short(
@@ -130,14 +300,10 @@ def is_entry_short(
         beta_down_threshold: Minimum required beta_down.
 
     Returns:
-        bool: True if short entry conditions are satisfied.
+        bool: True if short entry conditions are satisfied
+        (False for a beta window the table does not have).
     """
-    regime_signal = get_regime_signal(date)
-    if regime_signal != -1:
-        return False
-
-    _, beta_down = get_beta_values(date, symbol, beta_window)
-    if beta_down is None:
+    if get_regime_signal(date) != -1:
         return False
 
-    return beta_down >= beta_down_threshold
+    return symbol in _entry_set(-1, date, beta_window, beta_down_threshold)
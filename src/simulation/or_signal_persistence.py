@@ -0,0 +1,247 @@
+"""simulation/or_signal_persistence.py – vectorised dual-beta persistence signals
+
+``build_signals`` of the v2 / v3 optimizers keeps a symbol on a day's long
+(short) list only when the dual-beta rule
+
+    long:  beta_up ≥ th_up  and beta_down ≤ th_dn_lo
+    short: beta_down ≥ th_up and beta_up ≤ th_dn_lo
+
+held on each of the last ``min_days`` days. It used to fill per-day dicts
+with ``iterrows()`` and intersect Python sets per date; here the rule is a
+boolean date × symbol matrix and persistence is one window sum over it:
+
+    held[t] = Σ mask[t-min_days+1 … t] == min_days
+
+``lookback="calendar"`` (default) reproduces the original behaviour – the
+window counts calendar days, so a weekend / holiday inside it clears the
+signal; ``lookback="trading"`` counts rows of the beta table instead.
+
+Usage (from ``src``) – parity and timing against the original loop:
+    python -m simulation.or_signal_persistence --synthetic
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from simulation.data_loaders import load_betas, load_sp500
+from simulation.or_shared_data import shared_market_data
+
+LOOKBACKS = ("calendar", "trading")
+
+
+def beta_matrix(
+    betas: pd.DataFrame,
+    up_col: str,
+    dn_col: str,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pivot long-format betas into (dates, symbols, up, dn) – sorted axes,
+    float64 arrays with NaN for missing cells.
+    """
+    d = betas["date"].to_numpy(dtype="datetime64[ns]")
+    s = betas["symbol"].astype(str).to_numpy(dtype=object)
+    dates, di = np.unique(d, return_inverse=True)
+    symbols, si = np.unique(s, return_inverse=True)
+    out = []
+    for col in (up_col, dn_col):
+        arr = np.full((len(dates), len(symbols)), np.nan)
+        arr[di, si] = betas[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        out.append(arr)
+    return dates, symbols.astype(object), out[0], out[1]
+
+
+def dual_beta_masks(
+    up: np.ndarray,
+    dn: np.ndarray,
+    th_up: float,
+    th_dn_lo: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Long / short flags of the dual-beta rule (NaN betas never qualify)."""
+    up = np.asarray(up, dtype=np.float64)
+    dn = np.asarray(dn, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        return (up >= th_up) & (dn <= th_dn_lo), (dn >= th_up) & (up <= th_dn_lo)
+
+
+def persistence_mask(
+    mask: np.ndarray,
+    dates: np.ndarray,
+    min_days: int,
+    *,
+    lookback: str = "calendar",
+) -> np.ndarray:
+    """
+    Cells whose flag held on each of the last *min_days* days.
+
+    Args:
+        mask (np.ndarray): Boolean (n_dates, n_symbols) flags.
+        dates (np.ndarray): Sorted row dates (datetime64).
+        min_days (int): Required run length (≤ 1 returns *mask* unchanged).
+        lookback (str): "calendar" – days missing from *dates* break the run;
+            "trading" – only rows of *mask* count.
+
+    Returns:
+        np.ndarray: Boolean array shaped like *mask*.
+
+    Raises:
+        ValueError: On an unknown *lookback*.
+    """
+    if lookback not in LOOKBACKS:
+        raise ValueError(f"Unknown lookback {lookback!r} (use one of {LOOKBACKS})")
+    if min_days <= 1 or mask.shape[0] == 0:
+        return mask.copy()
+
+    rows = None
+    if lookback == "calendar":
+        day = np.timedelta64(1, "D")
+        rows = ((dates - dates[0]) // day).astype(np.int64)
+        grid = np.zeros((int(rows[-1]) + 1, mask.shape[1]), dtype=bool)
+        grid[rows] = mask
+        mask = grid
+
+    counts = np.cumsum(mask, axis=0, dtype=np.int32)
+    held = counts >= min_days
+    held[min_days:] = counts[min_days:] - counts[:-min_days] == min_days
+    return held[rows] if rows is not None else held
+
+
+def _symbol_lists(mask: np.ndarray, symbols: np.ndarray, rows: np.ndarray) -> List[List[str]]:
+    """Symbols of *mask*'s row rows[i] per i (row -1 → empty list)."""
+    return [symbols[mask[r]].tolist() if r >= 0 else [] for r in rows]
+
+
+def dual_beta_calendar(
+    start: str,
+    end: str,
+    window: int,
+    th_up: float,
+    th_dn_lo: float,
+    min_days: int,
+    *,
+    lookback: str = "calendar",
+) -> pd.DataFrame:
+    """
+    Signal calendar of the optimizers' dual-beta + look-back rule.
+
+    Days are those of ``generate_signal_calendar`` (SP500 score and beta rows
+    present); betas come from the shared memory-mapped panel when this process
+    attached one (see or_shared_data), otherwise from ``load_betas``. Both
+    paths look back over the same axis – dates with beta rows.
+
+    Returns:
+        pd.DataFrame: Columns date, long_symbols, short_symbols (sorted lists).
+    """
+    shared = shared_market_data()
+    if shared is not None:
+        days = shared.signal_dates(start, end)
+        dates, up, dn = shared.beta_arrays(start, end, window)
+        symbols = shared.panel.symbols
+    else:
+        up_col, dn_col = f"beta_up_{window}", f"beta_down_{window}"
+        try:
+            betas = load_betas(start=start, end=end, columns=["date", "symbol", up_col, dn_col])
+        except KeyError:
+            raise ValueError(f"Missing beta columns for window {window}")
+        dates, symbols, up, dn = beta_matrix(betas, up_col, dn_col)
+
+        # the SP500 ⋈ betas merge of generate_signal_calendar, on dates only
+        sp500 = load_sp500()
+        sp500_dates = pd.to_datetime(sp500["date"])
+        scored = sp500_dates[(sp500_dates >= start) & (sp500_dates <= end) & sp500["score"].notna()]
+        days = pd.DatetimeIndex(np.intersect1d(scored.to_numpy(dtype="datetime64[ns]"), dates))
+
+    long_m, short_m = dual_beta_masks(up, dn, th_up, th_dn_lo)
+    long_m = persistence_mask(long_m, dates, min_days, lookback=lookback)
+    short_m = persistence_mask(short_m, dates, min_days, lookback=lookback)
+
+    day_values = days.to_numpy(dtype="datetime64[ns]")
+    rows = np.searchsorted(dates, day_values)
+    found = rows < len(dates)
+    found[found] = dates[rows[found]] == day_values[found]
+    rows = np.where(found, rows, -1)
+    return pd.DataFrame(dict(date=list(days),
+                             long_symbols=_symbol_lists(long_m, symbols, rows),
+                             short_symbols=_symbol_lists(short_m, symbols, rows)))
+
+
+# ---------------------------------------------------------------------------
+# parity / timing against the original loop
+# ---------------------------------------------------------------------------
+
+def _reference_lists(days, betas: pd.DataFrame, window: int, th_up: float,
+                     th_dn_lo: float, min_days: int) -> Tuple[List, List]:
+    """The original iterrows + set-intersection build_signals body."""
+    up, dn = f"beta_up_{window}", f"beta_down_{window}"
+    mL, mS = defaultdict(list), defaultdict(list)
+    for _, r in betas.iterrows():
+        if r[up] >= th_up and r[dn] <= th_dn_lo: mL[pd.Timestamp(r["date"])].append(r["symbol"])
+        if r[dn] >= th_up and r[up] <= th_dn_lo: mS[pd.Timestamp(r["date"])].append(r["symbol"])
+    L, S = [], []
+    for d in days:
+        back = [d - pd.Timedelta(days=i) for i in range(min_days)]
+        ls = set(mL.get(d, [])); ss = set(mS.get(d, []))
+        for past in back[1:]:
+            ls &= set(mL.get(past, [])); ss &= set(mS.get(past, []))
+        L.append(sorted(ls)); S.append(sorted(ss))
+    return L, S
+
+
+def _synthetic_betas(n_days: int = 250, n_symbols: int = 300, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=n_days)
+    df = pd.DataFrame({"date": np.repeat(dates, n_symbols),
+                       "symbol": np.tile([f"S{i:04d}" for i in range(n_symbols)], n_days)})
+    # slowly drifting betas so runs of several days occur
+    walk = 1 + np.cumsum(rng.normal(0, 0.05, (2, n_days, n_symbols)), axis=1) * 0.3
+    df["beta_up_60"], df["beta_down_60"] = walk[0].ravel(), walk[1].ravel()
+    df = df.sample(frac=0.95, random_state=seed)
+    df.loc[df.sample(frac=0.02, random_state=seed + 1).index, "beta_up_60"] = np.nan
+    return df.sort_values(["date", "symbol"]).reset_index(drop=True)
+
+
+def check_parity(betas: Optional[pd.DataFrame] = None,
+                 min_days_list=(1, 2, 3, 5, 10)) -> bool:
+    """Compare the vectorised lists with the original loop on one beta frame."""
+    betas = _synthetic_betas() if betas is None else betas
+    days = pd.DatetimeIndex(np.unique(betas["date"]))
+    dates, symbols, up, dn = beta_matrix(betas, "beta_up_60", "beta_down_60")
+    ok = True
+    for min_days in min_days_list:
+        t0 = time.perf_counter()
+        ref = _reference_lists(days, betas, 60, 1.05, 0.95, min_days)
+        t_ref = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        long_m, short_m = dual_beta_masks(up, dn, 1.05, 0.95)
+        rows = np.searchsorted(dates, days.to_numpy(dtype="datetime64[ns]"))
+        new = tuple(_symbol_lists(persistence_mask(m, dates, min_days), symbols, rows)
+                    for m in (long_m, short_m))
+        t_new = time.perf_counter() - t0
+
+        same = ref[0] == new[0] and ref[1] == new[1]
+        ok &= same
+        n = sum(map(len, ref[0])) + sum(map(len, ref[1]))
+        print(f"{'✅' if same else '❌'} min_days={min_days:2d}: {n} signals | "
+              f"loop {t_ref:.2f}s → vectorised {t_new * 1000:.1f}ms")
+    return ok
+
+
+def _main():  # pragma: no cover – manual check only
+    ap = argparse.ArgumentParser(description="Parity / timing of the vectorised build_signals.")
+    ap.add_argument("--synthetic", action="store_true", help="use random betas (no DB)")
+    ap.add_argument("--start", default="2014-01-01")
+    ap.add_argument("--end", default="2019-12-31")
+    args = ap.parse_args()
+    betas = None if args.synthetic else load_betas(
+        start=args.start, end=args.end, columns=["date", "symbol", "beta_up_60", "beta_down_60"])
+    raise SystemExit(0 if check_parity(betas) else 1)
+
+
+if __name__ == "__main__":
+    _main()
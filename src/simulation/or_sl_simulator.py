@@ -1,4 +1,5 @@
 from simulation.or_backtest_simulator import BacktestSimulator
+from simulation.or_trade_ledger import TradeLedger
 
 class SL_Simulator(BacktestSimulator):
     HARD_SL_PCT = 0.03
@@ -6,7 +7,8 @@ class SL_Simulator(BacktestSimulator):
 
     def reset(self):
         super().reset()
-        self.trades = []
+        self.trades = TradeLedger()
+        self._open_trade = {}  # symbol → ledger row of its latest opening record
 
     def _open_new_positions(self, d, r):
         avail = self.max_positions - len(self.positions)
@@ -25,7 +27,7 @@ class SL_Simulator(BacktestSimulator):
                 entry_date=d, stop_loss=sl, peak_price=px
             )
             self.cash -= qty * px
-            self.trades.append(dict(
+            self._open_trade[sym] = self.trades.append(dict(
                 symbol=sym, side=side, entry_date=d,
                 entry_price=px, qty=qty,
                 exit_date=None, exit_price=None,
@@ -70,9 +72,7 @@ class SL_Simulator(BacktestSimulator):
                 pnl = (en - px) * qty
                 self.cash += qty * (2 * en - px)
 
-            for rec in self.trades[::-1]:
-                if rec["symbol"] == sym and rec["exit_date"] is None:
-                    rec.update(exit_date=d, exit_price=px, pnl=pnl, sl_hit=sl)
-                    break
+            self.trades.update(self._open_trade.pop(sym),
+                               exit_date=d, exit_price=px, pnl=pnl, sl_hit=sl)
 
         self.history.append(dict(date=d, cash=self.cash, positions=len(self.positions), equity=eq))
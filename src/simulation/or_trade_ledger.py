@@ -0,0 +1,300 @@
+"""simulation/or_trade_ledger.py – columnar trade log for the simulators
+
+``TradeLedger`` replaces the list-of-dicts ``sim.trades``. Records are kept
+column-wise in growable typed arrays (symbols as integer codes, dates as
+datetime64[ns], sides as int8), so
+
+*  appending / updating a record is O(1) and allocation-free most of the time;
+   ``extend()`` / ``update_rows()`` write a whole day's records column-wise;
+*  ``to_frame()`` / ``to_arrow()`` hand the whole log to pandas / Arrow
+   without building one dict per trade.
+
+The list interface the existing code relies on still works:
+
+    >>> sim.trades.append(dict(symbol="AAPL", side="long", entry_date=d, ...))
+    >>> len(sim.trades), sim.trades[-1]["pnl"]
+    >>> for t in sim.trades: ...            # dicts; missing exit fields are None
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["symbol", "side", "entry_date", "entry_price", "qty",
+           "exit_date", "exit_price", "pnl", "sl_hit"]
+
+_SIDES = {"long": 1, "short": -1}
+_SIDE_NAMES = {1: "long", -1: "short"}
+_DTYPES = dict(symbol=np.int32, side=np.int8, entry_date="datetime64[ns]",
+               entry_price=np.float64, qty=np.float64, exit_date="datetime64[ns]",
+               exit_price=np.float64, pnl=np.float64, sl_hit=bool)
+_NAT = np.datetime64("NaT", "ns")
+
+
+def _to_ns(value) -> np.datetime64:
+    if value is None:
+        return _NAT
+    if isinstance(value, np.datetime64):
+        return value.astype("datetime64[ns]")
+    return np.datetime64(pd.Timestamp(value), "ns")
+
+
+def _to_ns_array(values):
+    """``_to_ns`` for a scalar date or an array / sequence of dates."""
+    if values is None or np.ndim(values) == 0:
+        return _to_ns(values)
+    return np.asarray(values, dtype="datetime64[ns]")
+
+
+def _to_float(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+class TradeLedger:
+    """
+    Append-only (plus in-place exit updates) trade log stored column-wise.
+
+    Args:
+        capacity (int): Initial number of rows to allocate; grows by doubling.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._n = 0
+        self._cols: Dict[str, np.ndarray] = {
+            c: np.empty(max(capacity, 1), dtype=t) for c, t in _DTYPES.items()}
+        self._symbols: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------ #
+    # writing
+    # ------------------------------------------------------------------ #
+    def append(self, record: Dict[str, Any]) -> int:
+        """
+        Add one trade record (same keys as the former dict records).
+
+        Returns:
+            int: Row number of the new record.
+        """
+        unknown = set(record) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown trade fields: {sorted(unknown)}")
+
+        self._reserve(1)
+        i = self._n
+        self._n += 1
+
+        cols = self._cols
+        cols["symbol"][i] = self._code(record["symbol"])
+        cols["side"][i] = _SIDES[record["side"]]
+        cols["entry_date"][i] = _to_ns(record["entry_date"])
+        cols["entry_price"][i] = record["entry_price"]
+        cols["qty"][i] = record["qty"]
+        cols["exit_date"][i] = _NAT
+        cols["exit_price"][i] = cols["pnl"][i] = np.nan
+        cols["sl_hit"][i] = False
+        self.update(i, **{k: v for k, v in record.items()
+                          if k in ("exit_date", "exit_price", "pnl", "sl_hit")})
+        return i
+
+    def extend(self, records: Dict[str, Any]) -> np.ndarray:
+        """
+        Add several records given column-wise: each field is a sequence / array
+        (one value per record) or a scalar shared by all of them. ``side`` may
+        also be given as +1 / -1 codes.
+
+        Returns:
+            np.ndarray: Row numbers of the new records.
+        """
+        unknown = set(records) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown trade fields: {sorted(unknown)}")
+
+        n = len(records["symbol"])
+        self._reserve(n)
+        rows = slice(self._n, self._n + n)
+        self._n += n
+
+        cols = self._cols
+        cols["symbol"][rows] = [self._code(s) for s in records["symbol"]]
+        side = np.asarray(records["side"])
+        cols["side"][rows] = side if side.dtype.kind in "iu" else np.where(side == "long", 1, -1)
+        cols["entry_date"][rows] = _to_ns_array(records["entry_date"])
+        cols["entry_price"][rows] = records["entry_price"]
+        cols["qty"][rows] = records["qty"]
+        cols["exit_date"][rows] = _NAT
+        cols["exit_price"][rows] = cols["pnl"][rows] = np.nan
+        cols["sl_hit"][rows] = False
+        self._fill_exits(rows, **{k: v for k, v in records.items()
+                                  if k in ("exit_date", "exit_price", "pnl", "sl_hit")})
+        return np.arange(rows.start, rows.stop)
+
+    def update(self, i: int, *, exit_date=None, exit_price=None, pnl=None,
+               sl_hit: Optional[bool] = None) -> None:
+        """Fill the exit fields of record *i* (None leaves a field unchanged)."""
+        i = self._row(i)
+        cols = self._cols
+        if exit_date is not None:
+            cols["exit_date"][i] = _to_ns(exit_date)
+        if exit_price is not None:
+            cols["exit_price"][i] = _to_float(exit_price)
+        if pnl is not None:
+            cols["pnl"][i] = _to_float(pnl)
+        if sl_hit is not None:
+            cols["sl_hit"][i] = sl_hit
+
+    def update_rows(self, rows, *, exit_date=None, exit_price=None, pnl=None,
+                    sl_hit: Optional[bool] = None) -> None:
+        """Column-wise ``update()``: fill the exit fields of several records at once."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows):
+            lo = rows.min()
+            if not (-self._n <= lo and rows.max() < self._n):
+                raise IndexError(f"Trade records out of range ({self._n} records)")
+            if lo < 0:
+                rows = np.where(rows < 0, rows + self._n, rows)
+        self._fill_exits(rows, exit_date=exit_date, exit_price=exit_price, pnl=pnl, sl_hit=sl_hit)
+
+    def _fill_exits(self, rows, *, exit_date=None, exit_price=None, pnl=None,
+                    sl_hit: Optional[bool] = None) -> None:
+        """Write the exit fields at *rows* (index array or slice, already validated)."""
+        cols = self._cols
+        if exit_date is not None:
+            cols["exit_date"][rows] = _to_ns_array(exit_date)
+        if exit_price is not None:
+            cols["exit_price"][rows] = exit_price
+        if pnl is not None:
+            cols["pnl"][rows] = pnl
+        if sl_hit is not None:
+            cols["sl_hit"][rows] = sl_hit
+
+    def _reserve(self, n: int) -> None:
+        """Grow the columns (by doubling) until *n* more records fit."""
+        size = len(self._cols["qty"])
+        if self._n + n <= size:
+            return
+        while size < self._n + n:
+            size *= 2
+        for c, arr in self._cols.items():
+            grown = np.empty(size, dtype=arr.dtype)
+            grown[:self._n] = arr[:self._n]
+            self._cols[c] = grown
+
+    def _code(self, symbol: str) -> int:
+        code = self._codes.get(symbol)
+        if code is None:
+            code = self._codes[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+        return code
+
+    def _row(self, i: int) -> int:
+        if not -self._n <= i < self._n:
+            raise IndexError(f"Trade record {i} out of range ({self._n} records)")
+        return i + self._n if i < 0 else i
+
+    # ------------------------------------------------------------------ #
+    # list-style reading (compatibility with the former list of dicts)
+    # ------------------------------------------------------------------ #
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        """One record as a dict; missing exit fields are None."""
+        i = self._row(i)
+        c = self._cols
+        exit_date = c["exit_date"][i]
+        return dict(
+            symbol=self._symbols[c["symbol"][i]],
+            side=_SIDE_NAMES[int(c["side"][i])],
+            entry_date=pd.Timestamp(c["entry_date"][i]),
+            entry_price=float(c["entry_price"][i]),
+            qty=float(c["qty"][i]),
+            exit_date=None if np.isnat(exit_date) else pd.Timestamp(exit_date),
+            exit_price=None if np.isnan(c["exit_price"][i]) else float(c["exit_price"][i]),
+            pnl=None if np.isnan(c["pnl"][i]) else float(c["pnl"][i]),
+            sl_hit=bool(c["sl_hit"][i]),
+        )
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[i] for i in range(self._n))
+
+    # ------------------------------------------------------------------ #
+    # columnar views
+    # ------------------------------------------------------------------ #
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Raw column arrays (views, no copy); symbol / side are integer codes."""
+        return {c: arr[:self._n] for c, arr in self._cols.items()}
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serialisable copy of the ledger (dates as int64 ns) – see from_state."""
+        cols = self.columns()
+        out: Dict[str, Any] = {c: arr.tolist() for c, arr in cols.items()
+                               if c not in ("entry_date", "exit_date")}
+        for c in ("entry_date", "exit_date"):
+            out[c] = cols[c].view(np.int64).tolist()
+        out["symbols"] = list(self._symbols)
+        return out
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "TradeLedger":
+        """Rebuild a ledger written by ``state()``."""
+        n = len(state["qty"])
+        ledger = cls(capacity=max(n, 1024))
+        for c, arr in ledger._cols.items():
+            values = np.asarray(state[c], dtype=np.int64 if c.endswith("_date") else arr.dtype)
+            arr[:n] = values.view(arr.dtype) if c.endswith("_date") else values
+        ledger._n = n
+        ledger._symbols = list(state["symbols"])
+        ledger._codes = {s: i for i, s in enumerate(ledger._symbols)}
+        return ledger
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        The ledger as a DataFrame (columns of the former ``pd.DataFrame(sim.trades)``;
+        open trades have NaT / NaN exit fields).
+        """
+        c = self.columns()
+        symbols = np.asarray(self._symbols, dtype=object)
+        return pd.DataFrame({
+            "symbol": symbols[c["symbol"]] if self._n else np.array([], dtype=object),
+            "side": np.where(c["side"] == 1, "long", "short").astype(object),
+            "entry_date": c["entry_date"].copy(),
+            "entry_price": c["entry_price"].copy(),
+            "qty": c["qty"].copy(),
+            "exit_date": c["exit_date"].copy(),
+            "exit_price": c["exit_price"].copy(),
+            "pnl": c["pnl"].copy(),
+            "sl_hit": c["sl_hit"].copy(),
+        }, columns=COLUMNS)
+
+    def to_arrow(self):
+        """
+        The ledger as a ``pyarrow.Table`` (symbol / side dictionary-encoded).
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        import pyarrow as pa
+
+        c = self.columns()
+        symbols = pa.array(self._symbols, type=pa.string())
+        sides = pa.array(["short", "long"], type=pa.string())
+        return pa.table({
+            "symbol": pa.DictionaryArray.from_arrays(pa.array(c["symbol"]), symbols),
+            "side": pa.DictionaryArray.from_arrays(pa.array((c["side"] == 1).astype(np.int8)), sides),
+            "entry_date": pa.array(c["entry_date"]),
+            "entry_price": pa.array(c["entry_price"]),
+            "qty": pa.array(c["qty"]),
+            "exit_date": pa.array(c["exit_date"], from_pandas=True),
+            "exit_price": pa.array(c["exit_price"], from_pandas=True),
+            "pnl": pa.array(c["pnl"], from_pandas=True),
+            "sl_hit": pa.array(c["sl_hit"]),
+        })
+
+    def __repr__(self) -> str:
+        n_open = int(np.isnat(self._cols["exit_date"][:self._n]).sum())
+        return f"TradeLedger({self._n} records, {n_open} without exit)"
+
+
+__all__: List[str] = ["TradeLedger", "COLUMNS"]
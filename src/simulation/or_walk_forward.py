@@ -0,0 +1,350 @@
+"""simulation/or_walk_forward.py – parallel walk-forward optimisation
+
+``ParamOptimizer`` and the v2/v3 scripts pick parameters on one fixed train
+span and check them on one validation span. Walk-forward repeats that over
+rolling (or expanding) windows:
+
+    fold 0:  train 2014-01 → 2016-12 | test 2017
+    fold 1:  train 2015-01 → 2017-12 | test 2018
+    ...
+
+For every fold the grid configuration with the best train metric is run on
+the following test window; the test equity curves are stitched (returns
+compounded) into one out-of-sample curve.
+
+Work is split by *configuration*, not by fold, so overlapping periods are
+computed once:
+
+*  each worker extracts a config's signal calendar once over the whole span
+   from a per-process ``SignalCube`` of its window (one cube serves every
+   threshold pair) and slices it per fold – the calendar of a day does not
+   depend on the span it was generated for;
+*  with ``shared_data`` (default) the parent publishes one memory-mapped panel
+   (``or_shared_data``) holding the forward-filled closes, the SP500 scores
+   and beta_up / beta_down of every grid window. Workers build their cubes
+   from it (``SharedMarketData.signal_cube``) and price trades from it, so no
+   worker loads the beta or stock table – all processes share one copy.
+   Without it every worker loads its own tables.
+
+Usage (from ``src``):
+    python -m simulation.or_walk_forward --start 2014-01-01 --end 2024-12-31 \\
+        --train-months 36 --test-months 12 --mode rolling
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from simulation.or_backtest_engine import generate_signal_cube
+from simulation.or_data_context import get_data_context
+from simulation.or_param_optimizer import ParamOptimizer, ParamSet
+from simulation.or_performance_analyzer import PerformanceAnalyzer
+from simulation.or_shared_data import attach_market_data, publish_market_data, shared_market_data
+from simulation.or_sl_simulator import SL_Simulator
+
+Span = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class Fold:
+    """One walk-forward step: optimise on *train*, trade on *test*."""
+
+    index: int
+    train: Span
+    test: Span
+
+
+def make_folds(
+    start: str,
+    end: str,
+    *,
+    train_months: int = 36,
+    test_months: int = 12,
+    mode: str = "rolling",
+    step_months: Optional[int] = None,
+) -> List[Fold]:
+    """
+    Consecutive train / test windows covering [start, end].
+
+    Args:
+        start (str): First train day (YYYY-MM-DD).
+        end (str): Last test day; the final test window is cut at *end*.
+        train_months (int): Train window length (first window for "expanding").
+        test_months (int): Test window length.
+        mode (str): "rolling" (fixed-length train window) or "expanding"
+            (train always starts at *start*).
+        step_months (Optional[int]): Shift between folds (default test_months,
+            i.e. back-to-back test windows).
+
+    Returns:
+        List[Fold]: The folds in time order.
+
+    Raises:
+        ValueError: On an unknown mode, non-positive lengths, or a span too
+            short for a single fold.
+    """
+    if mode not in ("rolling", "expanding"):
+        raise ValueError(f"Unknown walk-forward mode {mode!r} (use 'rolling' or 'expanding')")
+    step_months = step_months or test_months
+    if min(train_months, test_months, step_months) <= 0:
+        raise ValueError("train_months, test_months and step_months must be positive")
+
+    t0, t_end = pd.Timestamp(start), pd.Timestamp(end)
+    day = pd.Timedelta(days=1)
+    folds: List[Fold] = []
+    k = 0
+    while True:
+        offset = pd.DateOffset(months=k * step_months)
+        train_start = t0 if mode == "expanding" else t0 + offset
+        test_start = t0 + pd.DateOffset(months=train_months) + offset
+        if test_start > t_end:
+            break
+        test_end = min(test_start + pd.DateOffset(months=test_months) - day, t_end)
+        folds.append(Fold(k, (train_start.strftime("%Y-%m-%d"), (test_start - day).strftime("%Y-%m-%d")),
+                          (test_start.strftime("%Y-%m-%d"), test_end.strftime("%Y-%m-%d"))))
+        k += 1
+    if not folds:
+        raise ValueError(f"Span {start} → {end} is shorter than one train + test window")
+    return folds
+
+
+# ---------------------------------------------------------------------------
+# worker side (module level – picklable)
+# ---------------------------------------------------------------------------
+
+def _signal_cube(span: Span, window: int):
+    """One window's cube over *span* – from the shared panel when one is attached."""
+    shared = shared_market_data()
+    if shared is not None:
+        return shared.signal_cube(span[0], span[1], [window])
+    return generate_signal_cube(span[0], span[1], [window])
+
+
+def _calendar(p: ParamSet, span: Span) -> pd.DataFrame:
+    cube = get_data_context().derived(f"signal_cube|{span[0]}|{span[1]}|{p.beta_window}",
+                                      lambda: _signal_cube(span, p.beta_window))
+    cal = cube.calendar(p.beta_window, p.beta_up_th, p.beta_dn_th)
+    if "date" in cal:
+        cal["date"] = pd.to_datetime(cal["date"])
+    return cal
+
+
+def _simulate(cal: pd.DataFrame, span: Span, settings: Dict) -> Optional[pd.DataFrame]:
+    """Equity curve of *cal* restricted to *span* (None when no signal days)."""
+    if cal.empty:
+        return None
+    part = cal[(cal["date"] >= pd.Timestamp(span[0])) & (cal["date"] <= pd.Timestamp(span[1]))]
+    if part.empty:
+        return None
+    sim = SL_Simulator(part, **settings)
+    sim.run()
+    return sim.results()
+
+
+def _metrics(res: Optional[pd.DataFrame]) -> Optional[Dict]:
+    if res is None or len(res) < 2:
+        return None
+    ana = PerformanceAnalyzer(res)
+    return dict(Sharpe=ana.sharpe_ratio(), CAGR=ana.cagr(), DD=ana.max_drawdown(),
+                TotRet=ana.total_return())
+
+
+def _train_task(p: ParamSet, span: Span, train_spans: List[Span], settings: Dict) -> List[Optional[Dict]]:
+    """Metrics of one config on every fold's train span – one calendar for all."""
+    cal = _calendar(p, span)
+    return [_metrics(_simulate(cal, s, settings)) for s in train_spans]
+
+
+def _test_task(p: ParamSet, span: Span, test_spans: List[Span], settings: Dict) -> List[Optional[pd.DataFrame]]:
+    """Equity curves of one config on the test spans of the folds that chose it."""
+    cal = _calendar(p, span)
+    return [_simulate(cal, s, settings) for s in test_spans]
+
+
+# ---------------------------------------------------------------------------
+# driver
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class WalkForwardResult:
+    """
+    Outcome of a walk-forward run.
+
+    Attributes:
+        folds (pd.DataFrame): Per fold: spans, chosen params, train and test metrics.
+        equity (pd.DataFrame): Stitched out-of-sample curve indexed by date
+            (equity, daily_return, fold) – accepted by PerformanceAnalyzer.
+        train (pd.DataFrame): Every (fold, config) train evaluation.
+    """
+
+    folds: pd.DataFrame
+    equity: pd.DataFrame
+    train: pd.DataFrame
+
+    def summary(self) -> Dict:
+        """Out-of-sample metrics of the stitched curve."""
+        return _metrics(self.equity) or {}
+
+
+class WalkForwardOptimizer:
+    """
+    Walk-forward grid search over ``or_param_optimizer.ParamSet``.
+
+    Args:
+        start (str): First train day.
+        end (str): Last test day.
+        train_months (int): Train window length.
+        test_months (int): Test window length.
+        mode (str): "rolling" or "expanding" train windows.
+        windows, up_thresholds, down_thresholds (Sequence): Grid dimensions
+            (default: ParamOptimizer's grid).
+        metric (str): Train metric used to choose each fold's config.
+        initial_cash, max_positions, fixed_size: SL_Simulator settings.
+        n_workers (Optional[int]): Process count (default: all cores).
+        shared_data (bool): Publish the close / score / beta panel once and
+            memory-map it in every worker (signals and prices both read it).
+    """
+
+    def __init__(
+        self,
+        start: str = "2014-01-01",
+        end: str = "2024-12-31",
+        *,
+        train_months: int = 36,
+        test_months: int = 12,
+        mode: str = "rolling",
+        windows: Sequence[int] = tuple(ParamOptimizer.WINDOWS),
+        up_thresholds: Sequence[float] = tuple(ParamOptimizer.BETA_UP_TH),
+        down_thresholds: Sequence[float] = tuple(ParamOptimizer.BETA_DN_TH),
+        metric: str = "Sharpe",
+        initial_cash: float = 1_000_000,
+        max_positions: int = 10,
+        fixed_size: float = 10_000,
+        n_workers: Optional[int] = None,
+        shared_data: bool = True,
+    ):
+        self.span: Span = (start, end)
+        self.folds = make_folds(start, end, train_months=train_months,
+                                test_months=test_months, mode=mode)
+        self.grid = [ParamSet(w, u, d) for w, u, d in product(windows, up_thresholds, down_thresholds)]
+        self.metric = metric
+        self.initial_cash = initial_cash
+        self.settings = dict(initial_cash=initial_cash, max_positions=max_positions,
+                             fixed_size=fixed_size)
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.shared_data = shared_data
+        self.windows = sorted(set(windows))
+
+    def _executor(self) -> ProcessPoolExecutor:
+        init = {}
+        if self.shared_data:
+            path = publish_market_data(self.windows)
+            init = dict(initializer=attach_market_data, initargs=(str(path),))
+        return ProcessPoolExecutor(max_workers=min(self.n_workers, len(self.grid)), **init)
+
+    def run(self) -> WalkForwardResult:
+        """
+        Grid-search every fold (in parallel across configs), trade each fold's
+        best config out of sample and stitch the test curves.
+        """
+        print(f"🚶 walk-forward: {len(self.folds)} folds × {len(self.grid)} configs, "
+              f"{self.span[0]} → {self.span[1]}")
+        train_spans = [f.train for f in self.folds]
+        test_spans = [f.test for f in self.folds]
+
+        with self._executor() as ex:
+            # 1) train metrics – one task per config covers all folds
+            fut = {ex.submit(_train_task, p, self.span, train_spans, self.settings): p
+                   for p in self.grid}
+            train_rows = []
+            for f in as_completed(fut):
+                for fold, m in zip(self.folds, f.result()):
+                    train_rows.append(dict(fold=fold.index, params=fut[f], **(m or {})))
+            train = pd.DataFrame(train_rows)
+
+            # 2) pick the best config per fold
+            chosen: Dict[int, ParamSet] = {}
+            for fold in self.folds:
+                rows = train[(train["fold"] == fold.index)]
+                rows = rows.dropna(subset=[self.metric]) if self.metric in rows else rows.iloc[:0]
+                if not rows.empty:
+                    chosen[fold.index] = rows.loc[rows[self.metric].idxmax(), "params"]
+
+            # 3) out-of-sample runs – one task per chosen config
+            by_config: Dict[ParamSet, List[int]] = {}
+            for k, p in chosen.items():
+                by_config.setdefault(p, []).append(k)
+            fut = {ex.submit(_test_task, p, self.span, [test_spans[k] for k in ks], self.settings): ks
+                   for p, ks in by_config.items()}
+            curves: Dict[int, pd.DataFrame] = {}
+            for f in as_completed(fut):
+                curves.update({k: c for k, c in zip(fut[f], f.result()) if c is not None})
+
+        folds = self._fold_table(train, chosen, curves)
+        equity = self._stitch(curves)
+        result = WalkForwardResult(folds, equity, train)
+        print(folds.to_string(index=False))
+        oos = result.summary()
+        if oos:
+            print(f"📈 out-of-sample: Sharpe {oos['Sharpe']:.2f}, CAGR {oos['CAGR'] * 100:.2f}%, "
+                  f"MaxDD {oos['DD'] * 100:.2f}%")
+        return result
+
+    def _fold_table(self, train: pd.DataFrame, chosen: Dict[int, ParamSet],
+                    curves: Dict[int, pd.DataFrame]) -> pd.DataFrame:
+        rows = []
+        for fold in self.folds:
+            p = chosen.get(fold.index)
+            row = dict(fold=fold.index, train_start=fold.train[0], train_end=fold.train[1],
+                       test_start=fold.test[0], test_end=fold.test[1], params=p)
+            if p is not None:
+                tr = train[(train["fold"] == fold.index) & (train["params"] == p)].iloc[0]
+                row[f"train_{self.metric}"] = tr[self.metric]
+            test = _metrics(curves.get(fold.index)) or {}
+            row.update({f"test_{k}": v for k, v in test.items()})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def _stitch(self, curves: Dict[int, pd.DataFrame]) -> pd.DataFrame:
+        """Compound the folds' daily returns into one curve starting at initial_cash."""
+        parts = []
+        for k in sorted(curves):
+            eq = curves[k]["equity"].astype(float)
+            ret = eq.pct_change()
+            ret.iloc[0] = eq.iloc[0] / self.initial_cash - 1  # first day vs. the fold's start cash
+            parts.append(pd.DataFrame({"daily_return": ret, "fold": k}))
+        if not parts:
+            return pd.DataFrame(columns=["equity", "daily_return", "fold"])
+        oos = pd.concat(parts)
+        oos["equity"] = self.initial_cash * np.cumprod(1 + oos["daily_return"].to_numpy())
+        return oos[["equity", "daily_return", "fold"]]
+
+
+def _main():  # pragma: no cover – manual run only
+    ap = argparse.ArgumentParser(description="Parallel walk-forward optimisation.")
+    ap.add_argument("--start", default="2014-01-01")
+    ap.add_argument("--end", default="2024-12-31")
+    ap.add_argument("--train-months", type=int, default=36)
+    ap.add_argument("--test-months", type=int, default=12)
+    ap.add_argument("--mode", choices=["rolling", "expanding"], default="rolling")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", default="walk_forward", help="output file prefix")
+    args = ap.parse_args()
+
+    result = WalkForwardOptimizer(args.start, args.end, train_months=args.train_months,
+                                  test_months=args.test_months, mode=args.mode,
+                                  n_workers=args.workers).run()
+    result.folds.to_csv(f"{args.out}_folds.csv", index=False)
+    result.equity.to_csv(f"{args.out}_equity.csv")
+    result.train.to_csv(f"{args.out}_train.csv", index=False)
+
+
+if __name__ == "__main__":
+    _main()